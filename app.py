@@ -3,20 +3,23 @@
 # ===============================
 
 # 1. PAGE CONFIGURATION
+import time
+run_started = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
-from decimal import Decimal, ROUND_HALF_UP, getcontext
-import io
-import os
-from config import PBS_CONSTANTS
-from helpers_section100_EFC import run_section100_efc_forward, run_section100_efc_inverse
-from ui_helpers import display_cost_breakdown, generate_cost_breakdown_df
+from decimal import Decimal
+from ui_helpers import render_diagnostics_panel
+from pbs_calc.diagnostics import env_enabled, start_run
+from pbs_calc.errors import InvalidInputError
+from pbs_calc.export import missing_packages
+from pbs_calc.section85 import to_decimal, validate_dpmq_covers_fees, validate_quantities
+from streamlit_cache import render_cache_debug_panel, warm_inverse_table
+from results_panel import render_results
+# Batch, Sweep and EFC modules (pandas, NumPy, Altair) are imported in their branches below
 
-# Optional: Ensures Excel export works (can be removed if handled in requirements.txt)
-os.system("pip install xlsxwriter")
+imports_seconds = time.perf_counter() - run_started
 
-# Set decimal precision for PBS calculations
-getcontext().prec = 12
+# Decimal precision is fixed per calculation by the calculators (pbs_calc.precision)
 
 # Configure Streamlit layout and metadata
 st.set_page_config(
@@ -24,16 +27,22 @@ st.set_page_config(
     layout="wide"
 )
 
+# Per-stage timers and counters for this run (toggle in the debug panel, or PBS_DIAGNOSTICS=1)
+diagnostics = start_run(st.session_state.get("show_diagnostics", env_enabled()))
+
+# Memory-map the precomputed DPMQ → AEMP table in the background, once per server process
+warm_inverse_table()
+
+# Optional packages are checked once per server process; the app never installs anything
+if missing_packages():
+    st.warning("⚠️ Not installed: " + ", ".join(f"`{name}` ({use})" for name, use in missing_packages().items())
+               + ". Run `pip install -r requirements.txt`.")
+
 # ===============================
 # 2. GLOBAL CONSTANTS – SECTION 85
 # ===============================
 
-# Pricing constants (easy to update in future)
-DISPENSING_FEE = Decimal("8.88")
-AHI_BASE = Decimal("4.91")
-DANGEROUS_FEE = Decimal("5.50")
-WHOLESALE_MARKUP_RATE = Decimal("0.0752")
-WHOLESALE_FLAT_FEE = Decimal("54.14")
+# Fees and thresholds come from the dated schedules in config.FEE_SCHEDULES (pbs_calc.schedule)
 
 # Currently implemented section
 SECTION_OPTIONS = ["Section 85", "Section 100 – EFC"]
@@ -41,6 +50,9 @@ SECTION_OPTIONS = ["Section 85", "Section 100 – EFC"]
 # Pricing logic options
 PRICE_TYPE_OPTIONS = ["AEMP", "DPMQ"]
 
+# Single item entry, bulk file upload or a price-sensitivity sweep
+MODE_OPTIONS = ["Single item", "Batch", "Sweep"]
+
 # ===============================
 # 3. 📥 SECTION 85 – INPUT SECTION (LEFT SIDE)
 # ===============================
@@ -55,11 +67,30 @@ with left_col:
     st.markdown("### PBS Price Calculator")
 
     selected_section = st.selectbox("Section", SECTION_OPTIONS)
+    calculation_mode = st.radio("Mode:", MODE_OPTIONS, horizontal=True)
+
+    # ------------------------------
+    # 🔹 BATCH UPLOAD INPUTS
+    # ------------------------------
+    if calculation_mode == "Batch":
+        from batch_upload import UPLOAD_TYPES, render_batch_help, run_batch_upload
+
+        price_type = st.radio("Price type:", PRICE_TYPE_OPTIONS, horizontal=True)
+        uploaded_file = st.file_uploader("Items file (CSV, XLSX, Parquet or Arrow):", type=UPLOAD_TYPES)
+        render_batch_help(selected_section)
+
+    # ------------------------------
+    # 🔹 PRICE SWEEP INPUTS
+    # ------------------------------
+    elif calculation_mode == "Sweep":
+        from price_sweep import render_sweep_inputs, run_price_sweep
+
+        sweep_params = render_sweep_inputs(selected_section)
 
     # ------------------------------
     # 🔹 SECTION 100 – EFC INPUTS
     # ------------------------------
-    if selected_section == "Section 100 – EFC":
+    elif selected_section == "Section 100 – EFC":
         price_type = st.radio("Price type:", PRICE_TYPE_OPTIONS, horizontal=True)
         price_label = "AEMP price:" if price_type == "AEMP" else "DPMQ price:"
         input_price = st.number_input(price_label, min_value=0.0, step=0.01, format="%.2f")
@@ -88,10 +119,12 @@ with left_col:
         # ------------------------------
         # 🔹 Input Validations
         # ------------------------------
-        MIN_DPMQ = DISPENSING_FEE + AHI_BASE + (DANGEROUS_FEE if include_dangerous_fee else Decimal("0.00"))
-        if price_type == "DPMQ" and Decimal(input_price) < MIN_DPMQ:
-            st.error("❌ DPMQ too low to cover PBS fees.")
-            st.stop()
+        if price_type == "DPMQ":
+            try:
+                validate_dpmq_covers_fees(input_price, include_dangerous_fee)
+            except InvalidInputError as exc:
+                st.error(f"❌ {exc}")
+                st.stop()
 
         # ------------------------------
         # 🔹 Quantities (stacked vertically)
@@ -100,8 +133,10 @@ with left_col:
         max_qty = st.number_input("Maximum quantity:", min_value=1, step=1, format="%d")
 
         # 🔒 Defensive check (Step 1 – v15)
-        if pricing_qty == 0 or max_qty == 0:
-            st.error("❌ Pricing quantity and maximum quantity must be greater than zero.")
+        try:
+            validate_quantities(pricing_qty, max_qty)
+        except InvalidInputError as exc:
+            st.error(f"❌ {exc}")
             st.stop()
 
         # ------------------------------
@@ -128,13 +163,7 @@ with left_col:
 
 # 4. 📦 SECTION 85 – CALCULATION FUNCTIONS
 
-# ----------------------
-# 🔹 PRECISION HELPERS
-# ----------------------
-
-def to_decimal(value):
-    """Convert any numeric value to Decimal with proper precision"""
-    return Decimal(str(value))
+# Calculators live in pbs_calc.section85 (Streamlit-free, imported above).
 
 def validate_calculation_precision(original_dpmq, reconstructed_dpmq, tolerance=Decimal("0.01")):
     """Validate that inverse calculation is accurate"""
@@ -144,354 +173,48 @@ def validate_calculation_precision(original_dpmq, reconstructed_dpmq, tolerance=
         return False
     return True
 
-def validate_calculation_precision_enhanced(original_dpmq, reconstructed_dpmq, tolerance=Decimal("0.005")):
-    """
-    Enhanced validation with better error reporting
-    """
-    original_dpmq = to_decimal(original_dpmq)
-    reconstructed_dpmq = to_decimal(reconstructed_dpmq)
-    diff = abs(original_dpmq - reconstructed_dpmq)
-    
-    if diff <= tolerance:
-        return True, f"✅ Precision validated: difference ${diff:.4f}"
-    else:
-        return False, f"❌ Precision warning: difference ${diff:.4f} exceeds tolerance ${tolerance:.4f}"
-
-# ----------------------
-# 🔹 FORWARD LOGIC
-# ----------------------
-
-# Forward: AEMP (unit) → AEMP (max quantity)
-def calculate_aemp_max_qty(input_price, pricing_qty, max_qty):
-    if pricing_qty == 0:
-        return Decimal("0.00")
-    return (to_decimal(input_price) * to_decimal(max_qty)) / to_decimal(pricing_qty)
-
-# Forward: AHI Fee – FORWARD PBS LOGIC
-def calculate_ahi_fee(price_to_pharmacist):
-    price_to_pharmacist = to_decimal(price_to_pharmacist)
-    ahi_base = PBS_CONSTANTS["AHI_BASE"]
-
-    if price_to_pharmacist < Decimal("100.00"):
-        return ahi_base
-    elif price_to_pharmacist <= Decimal("2000.00"):
-        return ahi_base + (price_to_pharmacist - Decimal("100.00")) * Decimal("0.05")
-    else:
-        return Decimal("99.79")
-
-# Forward: DPMQ = PtP + AHI + Dispensing + [Dangerous]
-def calculate_dpmq(price_to_pharmacist, ahi_fee, include_dangerous=False):
-    dispensing_fee = PBS_CONSTANTS["DISPENSING_FEE"]
-    dangerous_fee = PBS_CONSTANTS["DANGEROUS_FEE"] if include_dangerous else Decimal("0.00")
-    return to_decimal(price_to_pharmacist) + to_decimal(ahi_fee) + dispensing_fee + dangerous_fee
-
-# ----------------------
-# 🔹 INVERSE TIER LOGIC
-# ----------------------
-
-def get_wholesale_tier(dpmq):
-    dpmq = to_decimal(dpmq)
-    tier1_cap = PBS_CONSTANTS["WHOLESALE_TIER_THRESHOLDS"]["TIER1"]
-    tier2_cap = PBS_CONSTANTS["WHOLESALE_TIER_THRESHOLDS"]["TIER2"]
-
-    if dpmq <= tier1_cap:
-        return "Tier1"
-    elif dpmq <= tier2_cap:
-        return "Tier2"
-    else:
-        return "Tier3"
-
-def get_inverse_tier_type(dpmq):
-    return get_wholesale_tier(dpmq)
-
-# ----------------------
-# 🔹 INVERSE CALCULATOR – PRECISION AEMP LOGIC
-# ----------------------
-
-def precise_inverse_aemp_fixed(dpmq, dispensing_fee):
-    """
-    Mathematically precise inverse AEMP calculation using binary search + fine-tuning
-    """
-    dpmq = to_decimal(dpmq)
-    dispensing_fee = to_decimal(dispensing_fee)
-
-    ahi_base = PBS_CONSTANTS["AHI_BASE"]
-    tier1_cap = PBS_CONSTANTS["WHOLESALE_TIER_THRESHOLDS"]["TIER1"]
-    wholesale_fixed = PBS_CONSTANTS["WHOLESALE_FIXED_FEE_TIER1"]
-    aemp_threshold = PBS_CONSTANTS["WHOLESALE_AEMP_THRESHOLD"]
-    markup_rate = PBS_CONSTANTS["WHOLESALE_MARKUP_RATE"]
-    flat_fee = PBS_CONSTANTS["WHOLESALE_FLAT_FEE"]
-    tier2_cap = PBS_CONSTANTS["WHOLESALE_TIER2_CAP"]
-
-    if dpmq <= tier1_cap:
-        result = dpmq - dispensing_fee - ahi_base - wholesale_fixed
-        return result.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-    def calculate_reconstructed_dpmq(aemp):
-        if aemp <= aemp_threshold:
-            wholesale = wholesale_fixed
-        elif aemp <= tier2_cap:
-            wholesale = aemp * markup_rate
-        else:
-            wholesale = flat_fee
-
-        ptp = aemp + wholesale
-
-        if ptp <= PBS_CONSTANTS["AHI_TIER1_CAP"]:
-            ahi = ahi_base
-        elif ptp <= PBS_CONSTANTS["AHI_TIER2_CAP"]:
-            ahi = ahi_base + (ptp - PBS_CONSTANTS["AHI_TIER1_CAP"]) * Decimal("0.05")
-        else:
-            ahi = PBS_CONSTANTS["AHI_MAX_FEE"]
-
-        return ptp + ahi + dispensing_fee
-
-    low = Decimal("0.01")
-    high = Decimal("1000000.00")
-    tolerance = Decimal("0.00001")
-    max_iterations = 1000
-
-    best_aemp = Decimal("0.00")
-    best_diff = Decimal("999999")
-
-    for _ in range(max_iterations):
-        mid = (low + high) / 2
-        reconstructed_dpmq = calculate_reconstructed_dpmq(mid)
-        diff = abs(reconstructed_dpmq - dpmq)
-
-        if diff < best_diff:
-            best_diff = diff
-            best_aemp = mid
-
-        if diff <= tolerance:
-            break
-
-        if reconstructed_dpmq < dpmq:
-            low = mid + Decimal("0.000001")
-        elif reconstructed_dpmq > dpmq:
-            high = mid - Decimal("0.000001")
-        else:
-            break
-
-    best_aemp = fine_tune_aemp(best_aemp, dpmq, dispensing_fee)
-    return best_aemp
-
-
-def fine_tune_aemp(initial_aemp, target_dpmq, dispensing_fee):
-    target_dpmq = to_decimal(target_dpmq)
-    dispensing_fee = to_decimal(dispensing_fee)
-
-    ahi_base = PBS_CONSTANTS["AHI_BASE"]
-    aemp_threshold = PBS_CONSTANTS["WHOLESALE_AEMP_THRESHOLD"]
-    flat_fee = PBS_CONSTANTS["WHOLESALE_FLAT_FEE"]
-    markup_rate = PBS_CONSTANTS["WHOLESALE_MARKUP_RATE"]
-    wholesale_fixed = PBS_CONSTANTS["WHOLESALE_FIXED_FEE_TIER1"]
-    tier2_cap = PBS_CONSTANTS["WHOLESALE_TIER2_CAP"]
-
-    def calculate_reconstructed_dpmq(aemp):
-        if aemp <= aemp_threshold:
-            wholesale = wholesale_fixed
-        elif aemp <= tier2_cap:
-            wholesale = aemp * markup_rate
-        else:
-            wholesale = flat_fee
-
-        ptp = aemp + wholesale
-
-        if ptp <= PBS_CONSTANTS["AHI_TIER1_CAP"]:
-            ahi = ahi_base
-        elif ptp <= PBS_CONSTANTS["AHI_TIER2_CAP"]:
-            ahi = ahi_base + (ptp - PBS_CONSTANTS["AHI_TIER1_CAP"]) * Decimal("0.05")
-        else:
-            ahi = PBS_CONSTANTS["AHI_MAX_FEE"]
-
-        return ptp + ahi + dispensing_fee
-
-    best_aemp = initial_aemp
-    best_diff = abs(calculate_reconstructed_dpmq(initial_aemp) - target_dpmq)
-    step = Decimal("0.000005")
-    range_limit = 40000
-
-    for i in range(-range_limit, range_limit + 1):
-        test_aemp = initial_aemp + (Decimal(i) * step)
-        reconstructed_dpmq = calculate_reconstructed_dpmq(test_aemp)
-        diff = abs(reconstructed_dpmq - target_dpmq)
-
-        if diff < best_diff:
-            best_diff = diff
-            best_aemp = test_aemp
-
-    return best_aemp
-
-# Inverse controller (Tier-aware)
-def calculate_inverse_aemp_max(dpmq, dispensing_fee, tier):
-    dpmq = to_decimal(dpmq)
-    dispensing_fee = to_decimal(dispensing_fee)
-    ahi_base = PBS_CONSTANTS["AHI_BASE"]
-    wholesale_fixed = PBS_CONSTANTS["WHOLESALE_FIXED_FEE_TIER1"]
-    tier1_cap = PBS_CONSTANTS["WHOLESALE_TIER_THRESHOLDS"]["TIER1"]
-
-    if tier == "Tier1":
-        result = dpmq - dispensing_fee - ahi_base - wholesale_fixed
-        return result.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    elif tier in ("Tier2", "Tier3"):
-        return precise_inverse_aemp_fixed(dpmq, dispensing_fee)
-
-    return Decimal("0.00")
-
-# ----------------------
-# 🔹 HELPER CALCULATIONS
-# ----------------------
-
-# AEMP (max qty) → Unit AEMP
-def calculate_unit_aemp(aemp_max_qty, pricing_qty, max_qty):
-    if max_qty == 0:
-        return Decimal("0.00")
-    result = (to_decimal(aemp_max_qty) * to_decimal(pricing_qty)) / to_decimal(max_qty)
-    return result.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-# Forward: Wholesale markup from AEMP
-def calculate_wholesale_markup(aemp_max_qty):
-    aemp_max_qty = to_decimal(aemp_max_qty)
-    threshold = PBS_CONSTANTS["WHOLESALE_AEMP_THRESHOLD"]
-    fixed_fee = PBS_CONSTANTS["WHOLESALE_FIXED_FEE_TIER1"]
-    tier2_cap = PBS_CONSTANTS["WHOLESALE_TIER2_CAP"]
-    markup_rate = PBS_CONSTANTS["WHOLESALE_MARKUP_RATE"]
-    flat_fee = PBS_CONSTANTS["WHOLESALE_FLAT_FEE"]
-
-    if aemp_max_qty <= threshold:
-        return fixed_fee
-    elif aemp_max_qty <= tier2_cap:
-        return (aemp_max_qty * markup_rate).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    else:
-        return flat_fee
-
-# Inverse: Wholesale markup from AEMP (delayed rounding)
-def calculate_inverse_wholesale_markup(aemp_max_qty):
-    aemp_max_qty = to_decimal(aemp_max_qty)
-    threshold = PBS_CONSTANTS["WHOLESALE_AEMP_THRESHOLD"]
-    fixed_fee = PBS_CONSTANTS["WHOLESALE_FIXED_FEE_TIER1"]
-    tier2_cap = PBS_CONSTANTS["WHOLESALE_TIER2_CAP"]
-    markup_rate = PBS_CONSTANTS["WHOLESALE_MARKUP_RATE"]
-    flat_fee = PBS_CONSTANTS["WHOLESALE_FLAT_FEE"]
-
-    if aemp_max_qty <= threshold:
-        return fixed_fee
-    elif aemp_max_qty <= tier2_cap:
-        return aemp_max_qty * markup_rate  # full precision, no rounding
-    else:
-        return flat_fee
-
-# AEMP + markup = PTP (delayed rounding)
-def calculate_price_to_pharmacist(aemp_max_qty, wholesale_markup):
-    result = to_decimal(aemp_max_qty) + to_decimal(wholesale_markup)
-    return result  # Delay quantization until final DPMQ
-
-# Inverse: AHI Fee – based on PtP (delayed rounding)
-def calculate_inverse_ahi_fee(price_to_pharmacist):
-    price_to_pharmacist = to_decimal(price_to_pharmacist)
-    ahi_base = PBS_CONSTANTS["AHI_BASE"]
-    tier1_cap = PBS_CONSTANTS["AHI_TIER1_CAP"]
-    tier2_cap = PBS_CONSTANTS["AHI_TIER2_CAP"]
-    max_fee = PBS_CONSTANTS["AHI_MAX_FEE"]
-
-    if price_to_pharmacist < tier1_cap:
-        return ahi_base
-    elif price_to_pharmacist <= tier2_cap:
-        result = ahi_base + (price_to_pharmacist - tier1_cap) * Decimal("0.05")
-        return result  # Delay quantization
-    else:
-        return max_fee
-
-# Final DPMQ – used in inverse check (final rounding)
-def calculate_inverse_dpmq(price_to_pharmacist, ahi_fee, dispensing_fee, include_dangerous=False):
-    dangerous_fee = PBS_CONSTANTS["DANGEROUS_FEE"] if include_dangerous else Decimal("0.00")
-    result = to_decimal(price_to_pharmacist) + to_decimal(ahi_fee) + to_decimal(dispensing_fee) + dangerous_fee
-    return result.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
 # ===============================
 # 5. 🚀 SECTION OUTPUT EXECUTION
 # ===============================
 
 # ----------------------------------------
-# 🔹 SECTION 85 – OUTPUT EXECUTION
+# 🔹 BATCH UPLOAD – OUTPUT EXECUTION
 # ----------------------------------------
 
-if selected_section == "Section 85" and price_type == "DPMQ":
-    st.session_state['original_input_price'] = input_price
+if calculation_mode == "Batch":
+    run_batch_upload(uploaded_file, selected_section, price_type)
 
-    dispensing_fee = PBS_CONSTANTS["DISPENSING_FEE"]
-    tier = get_inverse_tier_type(input_price)
+# ----------------------------------------
+# 🔹 PRICE SWEEP – OUTPUT EXECUTION
+# ----------------------------------------
 
-    effective_dpmq = Decimal(input_price) - DANGEROUS_FEE if include_dangerous_fee else Decimal(input_price)
+elif calculation_mode == "Sweep":
+    run_price_sweep(sweep_params)
 
-    aemp_max_qty = calculate_inverse_aemp_max(effective_dpmq, dispensing_fee, tier)
-    unit_aemp = calculate_unit_aemp(aemp_max_qty, pricing_qty, max_qty)
-    wholesale_markup = calculate_inverse_wholesale_markup(aemp_max_qty)
-    price_to_pharmacist = calculate_price_to_pharmacist(aemp_max_qty, wholesale_markup)
-    ahi_fee = calculate_inverse_ahi_fee(price_to_pharmacist)
-    dangerous_fee = PBS_CONSTANTS["DANGEROUS_FEE"] if include_dangerous_fee else Decimal("0.00")
-    dpmq = price_to_pharmacist + ahi_fee + dispensing_fee + dangerous_fee
+# ----------------------------------------
+# 🔹 SECTION 85 – OUTPUT EXECUTION
+# ----------------------------------------
 
-    display_cost_breakdown(
-        aemp_max_qty, unit_aemp, wholesale_markup,
-        price_to_pharmacist, ahi_fee, dispensing_fee,
-        dangerous_fee, dpmq, label="DPMQ"
-    )
+elif selected_section == "Section 85" and price_type == "DPMQ":
+    st.session_state['original_input_price'] = input_price
 
-    df = generate_cost_breakdown_df(
-        aemp_max_qty, unit_aemp, wholesale_markup,
-        price_to_pharmacist, ahi_fee, dispensing_fee,
-        dangerous_fee, dpmq, label="DPMQ"
-    )
-    buffer = io.BytesIO()
-    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="Cost Breakdown")
-
-    st.download_button(
-        label="📅 Download DPMQ Breakdown in Excel",
-        data=buffer.getvalue(),
-        file_name="dpmpq_breakdown.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    # Only the stages downstream of a changed input are recomputed (results_panel)
+    render_results("Section 85", "DPMQ", dict(
+        price=input_price, pricing_qty=pricing_qty, max_qty=max_qty, dangerous=include_dangerous_fee
+    ))
 
 elif selected_section == "Section 85" and price_type == "AEMP":
-    dispensing_fee = PBS_CONSTANTS["DISPENSING_FEE"]
-
-    aemp_max_qty = calculate_aemp_max_qty(input_price, pricing_qty, max_qty)
-    wholesale_markup = calculate_wholesale_markup(aemp_max_qty)
-    price_to_pharmacist = calculate_price_to_pharmacist(aemp_max_qty, wholesale_markup)
-    ahi_fee = calculate_ahi_fee(price_to_pharmacist)
-    dangerous_fee = PBS_CONSTANTS["DANGEROUS_FEE"] if include_dangerous_fee else Decimal("0.00")
-    dpmq = calculate_dpmq(price_to_pharmacist, ahi_fee, include_dangerous_fee)
-
-    display_cost_breakdown(
-        aemp_max_qty, None, wholesale_markup,
-        price_to_pharmacist, ahi_fee, dispensing_fee,
-        dangerous_fee, dpmq, label="AEMP"
-    )
-
-    df = generate_cost_breakdown_df(
-        aemp_max_qty, None, wholesale_markup,
-        price_to_pharmacist, ahi_fee, dispensing_fee,
-        dangerous_fee, dpmq, label="AEMP"
-    )
-    buffer = io.BytesIO()
-    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="Cost Breakdown")
-
-    st.download_button(
-        label="📅 Download AEMP Breakdown in Excel",
-        data=buffer.getvalue(),
-        file_name="aemp_breakdown.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    render_results("Section 85", "AEMP", dict(
+        price=input_price, pricing_qty=pricing_qty, max_qty=max_qty, dangerous=include_dangerous_fee
+    ))
 
 # ----------------------------------------
 # 🔹 SECTION 100 – EFC OUTPUT EXECUTION
 # ----------------------------------------
 
 elif selected_section == "Section 100 – EFC" and price_type == "DPMQ":
+    from helpers_section100_EFC import run_section100_efc_inverse
+
     run_section100_efc_inverse(
         input_price=input_price,
         pricing_qty=pricing_qty,
@@ -502,6 +225,8 @@ elif selected_section == "Section 100 – EFC" and price_type == "DPMQ":
     )
 
 elif selected_section == "Section 100 – EFC" and price_type == "AEMP":
+    from helpers_section100_EFC import run_section100_efc_forward
+
     run_section100_efc_forward(
         input_price=input_price,
         pricing_qty=pricing_qty,
@@ -511,6 +236,9 @@ elif selected_section == "Section 100 – EFC" and price_type == "AEMP":
         hospital_setting=hospital_setting
     )
 
+# ----------------------------------------
+# 🔹 DEBUG PANEL
+# ----------------------------------------
 
-
-
+render_cache_debug_panel()
+render_diagnostics_panel(diagnostics, run_started, imports_seconds)
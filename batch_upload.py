@@ -0,0 +1,118 @@
+# batch_upload.py
+
+from __future__ import annotations
+
+import pandas as pd
+import streamlit as st
+
+from pbs_calc.diagnostics import stage
+from pbs_calc.reprice import (
+    BATCH_COLUMNS, ColumnarFile, is_columnar, missing_columns, normalise_columns, price_chunk,
+)
+from ui_helpers import breakdown_column_names, render_export
+
+# Rows priced between progress-bar updates
+BATCH_CHUNK_ROWS = 5_000
+
+# Rows shown on screen; the download always carries every row
+PREVIEW_ROWS = 20
+
+# Accepted uploads; Parquet and Arrow are priced batch by batch without a full read
+UPLOAD_TYPES = ["csv", "xlsx", "parquet", "arrow", "feather"]
+
+# ==============================
+# Reading & pricing
+# ==============================
+
+def read_batch_file(uploaded_file) -> pd.DataFrame:
+    """Load an uploaded CSV or XLSX into a DataFrame with normalised column names."""
+    if uploaded_file.name.lower().endswith(".xlsx"):
+        items = pd.read_excel(uploaded_file)
+    else:
+        items = pd.read_csv(uploaded_file)
+    return normalise_columns(items)
+
+
+def open_batch_file(uploaded_file) -> tuple:
+    """
+    (normalised column names, row count, chunks of BATCH_CHUNK_ROWS rows) of
+    an upload. Parquet and Arrow uploads are decoded one chunk at a time
+    straight from the uploaded bytes; CSV and XLSX are read whole.
+    """
+    if is_columnar(uploaded_file.name):
+        import pyarrow as pa
+
+        columnar = ColumnarFile(pa.BufferReader(uploaded_file.getvalue()), uploaded_file.name)
+        return columnar.columns, columnar.num_rows, columnar.chunks(BATCH_CHUNK_ROWS)
+    items = read_batch_file(uploaded_file)
+    chunks = (items.iloc[start:start + BATCH_CHUNK_ROWS] for start in range(0, len(items), BATCH_CHUNK_ROWS))
+    return list(items.columns), len(items), chunks
+
+
+def price_batch_chunk(chunk: pd.DataFrame, selected_section: str, price_type: str) -> pd.DataFrame:
+    """price_chunk with the breakdown columns named as in the Excel downloads."""
+    names = breakdown_column_names(price_type)
+    names.update({"difference": "Difference", "precision_ok": "Precision OK", "valid": "Valid"})
+    return price_chunk(chunk, selected_section, price_type).rename(columns=names)
+
+
+# ==============================
+# UI
+# ==============================
+
+def render_batch_help(selected_section: str) -> None:
+    """Caption listing the columns the upload must (and may) contain."""
+    spec = BATCH_COLUMNS[selected_section]
+    required = ", ".join(f"`{col}`" for col in spec["required"])
+    optional = ", ".join(f"`{col}` (default {default})" for col, default in spec["optional"].items())
+    st.caption(f"Required columns: {required}. Optional: {optional}. Other columns are kept as-is.")
+
+
+def run_batch_upload(uploaded_file, selected_section: str, price_type: str) -> None:
+    """
+    Price every row of an uploaded file in chunks with a progress bar, preview
+    the first rows and offer the full result for download. The priced result
+    is kept in session state so later reruns do not reprocess the same file.
+    """
+    if uploaded_file is None:
+        st.info("📂 Upload a CSV, XLSX, Parquet or Arrow file to price items in bulk.")
+        return
+
+    cache_key = (uploaded_file.name, uploaded_file.size, selected_section, price_type)
+    cached = st.session_state.get("batch_result")
+
+    if cached is not None and cached[0] == cache_key:
+        result = cached[1]
+    else:
+        with stage("read_file"):
+            columns, total, chunks = open_batch_file(uploaded_file)
+        missing = missing_columns(columns, selected_section)
+        if missing:
+            st.error(f"❌ Missing column(s): {', '.join(missing)}")
+            return
+
+        progress = st.progress(0.0, text=f"Pricing {total:,} items…")
+        priced = []
+        done = 0
+        for chunk in chunks:
+            priced.append(price_batch_chunk(chunk, selected_section, price_type))
+            done += len(chunk)
+            progress.progress(done / total, text=f"Priced {done:,} of {total:,} items")
+        progress.empty()
+
+        result = pd.concat(priced) if priced else pd.DataFrame(columns=columns)
+        st.session_state["batch_result"] = (cache_key, result)
+
+    st.markdown(f"### 📋 BATCH RESULT ({len(result):,} items)")
+    st.dataframe(result.head(PREVIEW_ROWS), hide_index=True)
+    invalid = int((~result["Valid"]).sum()) if "Valid" in result else 0
+    if invalid:
+        st.warning(f"⚠️ {invalid:,} rows could not be priced (non-numeric cell, zero quantity or DPMQ below the fees)")
+    if "Precision OK" in result:
+        failed = int((~result["Precision OK"] & result["Valid"]).sum())
+        if failed:
+            st.warning(f"⚠️ {failed:,} rows differ from the entered DPMQ by more than $0.0050")
+
+    # Serialised only when clicked; large XLSX exports are streamed row by row
+    render_export(result, "batch_breakdown", "📥 Download batch result ({format})",
+                  key="batch_export", sheet_name="Batch")
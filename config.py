@@ -1,6 +1,10 @@
+from datetime import date
 from decimal import Decimal
 
 PBS_CONSTANTS = {
+    # 📅 Date this schedule applies from
+    "EFFECTIVE_FROM": date(2024, 7, 1),
+
     # 💊 Dispensing & Handling Fees
     "DISPENSING_FEE": Decimal("8.88"),
     "DANGEROUS_FEE": Decimal("5.50"),
@@ -10,6 +14,7 @@ PBS_CONSTANTS = {
     "AHI_TIER1_CAP": Decimal("100.00"),
     "AHI_TIER2_CAP": Decimal("2000.00"),
     "AHI_MAX_FEE": Decimal("99.91"),
+    "AHI_RATE": Decimal("0.05"),
 
     # 🏷️ Wholesale Markup Structure
     "WHOLESALE_FIXED_FEE_TIER1": Decimal("0.41"),
@@ -34,3 +39,10 @@ PBS_CONSTANTS = {
     "EFC_PRIVATE_MARKUP_RATE": Decimal("0.014"),
     "EFC_PRIVATE_MARKUP_MULTIPLIER": Decimal("1.014"),
 }
+
+# 📚 Every dated fee schedule; each applies from its EFFECTIVE_FROM until the next
+# one starts. Add the new year's constants here (e.g. from 1 July) rather than
+# editing an old schedule, so historical prices can still be reproduced.
+FEE_SCHEDULES = [
+    PBS_CONSTANTS,
+]
@@ -0,0 +1,8 @@
+# pbs_calc/__init__.py
+"""
+Importable PBS pricing engine shared by the Streamlit app and batch tooling.
+
+Submodules are imported on demand so that ``import pbs_calc`` stays cheap.
+"""
+
+from pbs_calc.errors import DPMQBelowFeesError, InvalidInputError, PricingError
@@ -0,0 +1,5 @@
+# pbs_calc/__main__.py
+
+from pbs_calc.cli import main
+
+raise SystemExit(main())
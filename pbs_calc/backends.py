@@ -0,0 +1,131 @@
+# pbs_calc/backends.py
+"""
+Arithmetic backend selection and the Decimal / fixed-point equivalence check.
+
+    PBS_ARITHMETIC=decimal  pbs_calc.section85 / pbs_calc.section100_efc (default)
+    PBS_ARITHMETIC=fixed    pbs_calc.fixed_point (scaled integers, same signatures)
+
+Both backends return Decimals keyed the same way, so callers only choose which
+module to call through. Only the app's cached Section 85 solve
+(streamlit_cache) and sweep do; every other path uses the Decimal calculators.
+"""
+
+from __future__ import annotations
+
+import importlib
+import os
+import time
+from decimal import Decimal
+from typing import Optional
+
+from pbs_calc.cache import bypassing_caches
+from pbs_calc.precision import to_cents
+
+BACKENDS = {
+    "decimal": ("pbs_calc.section85", "pbs_calc.section100_efc"),
+    "fixed": ("pbs_calc.fixed_point", "pbs_calc.fixed_point"),
+}
+
+DEFAULT_BACKEND = "decimal"
+
+
+def arithmetic_backend(name: Optional[str] = None) -> str:
+    """Backend name from the argument or PBS_ARITHMETIC; unknown names raise ValueError."""
+    name = (name or os.environ.get("PBS_ARITHMETIC") or DEFAULT_BACKEND).strip().lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown arithmetic backend {name!r} (expected one of: {', '.join(BACKENDS)}).")
+    return name
+
+
+def section85_backend(name: Optional[str] = None):
+    """Module providing calculate_section85_forward / _inverse for the backend."""
+    return importlib.import_module(BACKENDS[arithmetic_backend(name)][0])
+
+
+def efc_backend(name: Optional[str] = None):
+    """Module providing calculate_efc_forward / _inverse for the backend."""
+    return importlib.import_module(BACKENDS[arithmetic_backend(name)][1])
+
+
+# ==============================
+# Equivalence check
+# ==============================
+
+def _cases(stop_cents: int, step_cents: int):
+    """Section 85 cases: every step of price up to stop, each quantity pair, both fee settings."""
+    quantities = ((1, 1), (30, 60), (7, 28), (3, 2))
+    for cents in range(1, stop_cents + 1, step_cents):
+        price = Decimal(cents).scaleb(-2)
+        for pricing_qty, max_qty in quantities:
+            for include_dangerous in (False, True):
+                yield price, pricing_qty, max_qty, include_dangerous
+
+
+def _efc_cases(stop_cents: int, step_cents: int):
+    settings = [
+        (pricing_qty, vial_content, max_amount, wastage, hospital)
+        for pricing_qty, vial_content, max_amount in ((1, 100, 250), (10, Decimal("12.5"), 70), (100, 500, 1000))
+        for wastage in (False, True)
+        for hospital in ("Public", "Private")
+    ]
+    for cents in range(1, stop_cents + 1, step_cents * 10):
+        price = Decimal(cents).scaleb(-2)
+        for setting in settings:
+            yield (price, *setting)
+
+
+def _compare(name: str, reference, candidate, cases: list, valid=None) -> dict:
+    mismatches = []
+    reference_seconds = candidate_seconds = 0.0
+    checked = 0
+    for args in cases:
+        if valid is not None and not valid(*args):
+            continue
+        started = time.perf_counter()
+        expected = reference(*args)
+        middle = time.perf_counter()
+        actual = candidate(*args)
+        candidate_seconds += time.perf_counter() - middle
+        reference_seconds += middle - started
+        checked += 1
+        for key, value in expected.items():
+            if to_cents(value) != to_cents(actual[key]):
+                mismatches.append({"check": name, "args": args, "field": key,
+                                   "decimal": to_cents(value), "fixed": to_cents(actual[key])})
+    return {
+        "check": name,
+        "cases": checked,
+        "mismatches": mismatches,
+        "decimal_seconds": reference_seconds,
+        "fixed_seconds": candidate_seconds,
+    }
+
+
+def compare_backends(max_price: Decimal = Decimal("3000.00"), step: Decimal = Decimal("0.07")) -> list:
+    """
+    Run every Section 85 and EFC calculator through both backends over prices
+    from 0.01 to max_price (every tier and breakpoint for the default range)
+    and report, per calculator, the number of cases, every component that
+    differs once rounded to the cent, and the time spent in each backend.
+    """
+    from pbs_calc import fixed_point, section85, section100_efc
+
+    stop_cents = int(Decimal(max_price) * 100)
+    step_cents = max(1, int(Decimal(step) * 100))
+    cases = list(_cases(stop_cents, step_cents))
+    efc_cases = list(_efc_cases(stop_cents, step_cents))
+
+    # Time the calculations themselves, not the LRUs and the result store in front of them
+    with bypassing_caches():
+        return [
+            _compare("section85_forward", section85.calculate_section85_forward,
+                     fixed_point.calculate_section85_forward, cases),
+            _compare("section85_inverse", section85.calculate_section85_inverse,
+                     fixed_point.calculate_section85_inverse, cases,
+                     valid=lambda dpmq, *rest: dpmq >= section85.minimum_dpmq(rest[-1])),
+            _compare("efc_forward", section100_efc.calculate_efc_forward,
+                     fixed_point.calculate_efc_forward, efc_cases),
+            _compare("efc_inverse", section100_efc.calculate_efc_inverse,
+                     fixed_point.calculate_efc_inverse, efc_cases,
+                     valid=lambda dpma, *rest: dpma > section100_efc.calculate_ahi_fee_efc(rest[-1])),
+        ]
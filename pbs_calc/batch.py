@@ -0,0 +1,865 @@
+# pbs_calc/batch.py
+
+from __future__ import annotations
+
+from typing import Callable, Dict
+
+import numpy as np
+
+from pbs_calc import fixed_point, section85, section100_efc
+from pbs_calc.cache import bypassing_caches
+from pbs_calc.diagnostics import count, stage
+from pbs_calc.precision import to_cents
+from pbs_calc.schedule import active_schedule
+from pbs_calc.segments import TIER1_BRANCH
+
+# round_half_up snaps to fixed-point units of 10 ** -FIXED_PLACES dollars first
+FIXED_PLACES = 8
+FIXED_SCALE = 10.0 ** FIXED_PLACES
+# round_half_up snaps values below this many dollars to int64 units
+ROUND_UNITS_MAX = 1e10
+
+# Limits of the int64 fixed-point paths, far from overflow: any input (as whole
+# cents, 1e-4 vials...), a published price in cents, and an AEMP(max)
+# numerator in cents (cents * max_qty, or a price times a quantity)
+FIXED_LIMIT = 10 ** 11
+FIXED_MAX_CENTS = 10 ** 8
+FIXED_MAX_NUMERATOR = 10 ** 10
+
+# EFC vial contents, amounts and vial counts are fixed point in 1 / VIAL_SCALE
+VIAL_SCALE = 10 ** 4
+
+# A float within EXACT_MARGIN dollars (plus a relative 1e-12) of a half cent, a
+# tier or segment bound, or a whole vial may fall on the other side of it in
+# Decimal; such rows are re-priced with the Decimal calculators
+EXACT_MARGIN = 1e-8
+
+# ==============================
+# Utilities
+# ==============================
+
+
+def _schedule():
+    """Active fee schedule in floats, for vectorised maths."""
+    return active_schedule().floats
+
+
+def _number(cell) -> float:
+    try:
+        return float(cell)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _column(values, size: int | None = None, dtype=np.float64) -> np.ndarray:
+    """
+    1-D array view of a column, broadcasting scalars to ``size`` rows. In a
+    numeric column, cells that are not numbers ("n/a", blanks) become NaN, so
+    one bad cell fails its own row rather than the whole column.
+    """
+    try:
+        arr = np.asarray(values, dtype=dtype)
+    except (TypeError, ValueError):
+        if dtype is not np.float64:
+            raise
+        cells = np.asarray(values, dtype=object)
+        arr = np.array([_number(cell) for cell in cells.ravel()], dtype=np.float64).reshape(cells.shape)
+    if arr.ndim == 0 and size is not None:
+        arr = np.full(size, arr, dtype=dtype)
+    return np.atleast_1d(arr)
+
+
+def _fail_rows(result: dict, valid: np.ndarray) -> dict:
+    """NaN in every numeric column (and "" in tier columns) of rows that failed validation; adds "valid"."""
+    if not valid.all():
+        for name, values in result.items():
+            if values.dtype.kind == "f":
+                result[name] = np.where(valid, values, np.nan)
+            elif values.dtype.kind == "U":
+                result[name] = np.where(valid, values, "")
+            elif values.dtype.kind == "b":
+                result[name] = values & valid
+    result["valid"] = valid
+    return result
+
+
+def round_half_up(values, places: int = 2) -> np.ndarray:
+    """
+    Vectorised ROUND_HALF_UP (ties away from zero), matching Decimal.quantize.
+
+    Values are first snapped to fixed-point units of 1e-8 (as pbs_calc.fixed_point
+    holds money), which absorbs binary noise such as 1.005 stored as
+    1.00499999999999989, then rounded half up in integers. Only a value
+    within 5e-9 of a half cent can round differently from Decimal. Values too
+    large for int64 units (ROUND_UNITS_MAX dollars and up, where a float has
+    no digits to spare below a cent anyway) are rounded in floats.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    magnitude = np.abs(np.where(np.isfinite(values), values, 0.0))
+    units_ok = magnitude < ROUND_UNITS_MAX
+    units = np.rint(np.where(units_ok, magnitude, 0.0) * FIXED_SCALE).astype(np.int64)
+    step = 10 ** (FIXED_PLACES - places)
+    rounded = np.where(units_ok, (units + step // 2) // step, np.floor(magnitude * 10.0 ** places + 0.5))
+    return np.where(np.isfinite(values), np.copysign(rounded / 10.0 ** places, values), values)
+
+
+def _margin(values: np.ndarray) -> np.ndarray:
+    return EXACT_MARGIN + np.abs(values) * 1e-12
+
+
+def _near(values, bound) -> np.ndarray:
+    """Rows whose float value is too close to bound to trust the comparison (NaN never is)."""
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        return np.abs(values - bound) <= _margin(values)
+
+
+def _near_half_cent(values) -> np.ndarray:
+    """Rows whose float value is too close to a half cent to trust round_half_up."""
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        cents = np.abs(values) * 100
+        return np.abs(cents - np.floor(cents) - 0.5) <= _margin(values) * 100
+
+
+def _half_cent_ties(rows: np.ndarray, *columns) -> np.ndarray:
+    """
+    Of rows (a mask), those where any of the columns is too close to a half
+    cent; only those rows are checked, as most of a batch is already exact.
+    """
+    indices = np.flatnonzero(rows)
+    ties = np.zeros(rows.shape, dtype=bool)
+    if indices.size:
+        near = np.zeros(indices.size, dtype=bool)
+        for values in columns:
+            near |= _near_half_cent(np.broadcast_to(values, rows.shape)[indices])
+        ties[indices] = near
+    return ties
+
+
+def _decimal_rows(result: dict, rows: np.ndarray, price_row: Callable, columns: dict) -> list:
+    """
+    Re-price rows (a mask) with the Decimal calculators, the single-item UI
+    path, so the batch agrees with it to the cent. price_row(i) returns the
+    breakdown of row i; columns maps result columns to breakdown keys, copied
+    in rounded half up to cents. Returns [(i, breakdown), ...] for columns the
+    caller derives itself.
+    """
+    indices = np.flatnonzero(rows)
+    count("batch.decimal_rows", len(indices))
+    breakdowns = []
+    # One-off rows would only churn the calculators' LRUs; the result store is
+    # shared with other runs and bounded, so it is still read and filled
+    with bypassing_caches(keep_store=True):
+        for i in indices:
+            breakdown = price_row(i)
+            for column, key in columns.items():
+                result[column][i] = float(to_cents(breakdown[key]))
+            breakdowns.append((i, breakdown))
+    return breakdowns
+
+
+def _tier(value, tier1_cap, tier2_cap, tier1_inclusive: bool) -> str:
+    """Decimal counterpart of wholesale_tier_batch / ahi_tier_batch for one value."""
+    if value <= tier1_cap if tier1_inclusive else value < tier1_cap:
+        return "Tier1"
+    return "Tier2" if value <= tier2_cap else "Tier3"
+
+
+def _div_half_up(numerator: np.ndarray, denominator: int) -> np.ndarray:
+    """Vectorised fixed_point.div_half_up for int64 numerators and a positive denominator."""
+    rounded = (2 * np.abs(numerator) + denominator) // (2 * denominator)
+    return np.where(numerator < 0, -rounded, rounded)
+
+
+def _scaled(values, scale: int, limit: int = FIXED_LIMIT) -> tuple:
+    """
+    Rows whose value is a whole number of 1 / scale below limit (their Decimal
+    then is too), and that number as int64.
+    """
+    with np.errstate(invalid="ignore"):
+        scaled = np.rint(values * scale)
+        rows = (scaled / scale == values) & (np.abs(scaled) < limit)
+    return rows, np.where(rows, scaled, 0).astype(np.int64)
+
+
+def _fixed_forward(unit_aemp, pricing_qty, max_qty, include_dangerous, valid, tiers: bool) -> tuple:
+    """
+    Exact Section 85 forward pricing in int64 fixed point (pbs_calc.fixed_point
+    units) for the rows whose AEMP(max) is a whole number of units: cent
+    prices, whole quantities and a pricing quantity that divides out. Every
+    later stage is then exact in Decimal as well, so these rows match the
+    single-item breakdown to the cent even on exact half-cent ties. Returns
+    (rows, {column: values}), columns in dollars (and tier labels with tiers).
+    """
+    r = fixed_point.rules()
+    cent = fixed_point.CENT
+    rows, cents = _scaled(unit_aemp, 100)
+    whole_pricing, pricing = _scaled(pricing_qty, 1)
+    whole_max, maximum = _scaled(max_qty, 1)
+    rows &= valid & whole_pricing & whole_max & (cents * max_qty < FIXED_MAX_NUMERATOR)
+    numerator = np.where(rows, cents * maximum, 0) * cent
+    quantity = np.where(rows, pricing, 1)
+    rows &= numerator % quantity == 0
+    aemp_max_qty = np.where(rows, numerator // quantity, 0)
+
+    rate, rate_den = r.wholesale_markup_rate
+    markup = np.where(
+        aemp_max_qty <= r.wholesale_aemp_threshold,
+        r.wholesale_fixed_fee,
+        np.where(
+            aemp_max_qty <= r.wholesale_tier2_cap,
+            _div_half_up(np.minimum(aemp_max_qty, r.wholesale_tier2_cap) * rate, rate_den * cent) * cent,
+            r.wholesale_flat_fee,
+        ),
+    )
+    price_to_pharmacist = aemp_max_qty + markup
+
+    # AHI fee and DPMQ in units / ahi_den, so the AHI rate stays exact
+    ahi_rate, ahi_den = r.ahi_rate
+    banded = np.clip(price_to_pharmacist, r.ahi_tier1_cap, r.ahi_tier2_cap) - r.ahi_tier1_cap
+    ahi_fee = np.where(
+        price_to_pharmacist < r.ahi_tier1_cap,
+        r.ahi_base * ahi_den,
+        np.where(price_to_pharmacist <= r.ahi_tier2_cap, r.ahi_base * ahi_den + banded * ahi_rate,
+                 r.ahi_max_fee * ahi_den),
+    )
+    fees = r.dispensing_fee + np.where(include_dangerous, r.dangerous_fee, 0)
+    dpmq = (price_to_pharmacist + fees) * ahi_den + ahi_fee
+
+    columns = {
+        "aemp_max_qty": _div_half_up(aemp_max_qty, cent) / 100,
+        "wholesale_markup": markup // cent / 100,
+        "price_to_pharmacist": _div_half_up(price_to_pharmacist, cent) / 100,
+        "ahi_fee": _div_half_up(ahi_fee, ahi_den * cent) / 100,
+        "dpmq": _div_half_up(dpmq, ahi_den * cent) / 100,
+    }
+    if tiers:
+        columns["wholesale_tier"] = np.where(aemp_max_qty <= r.wholesale_aemp_threshold, "Tier1",
+                                             np.where(aemp_max_qty <= r.wholesale_tier2_cap, "Tier2", "Tier3"))
+        columns["ahi_tier"] = np.where(price_to_pharmacist < r.ahi_tier1_cap, "Tier1",
+                                       np.where(price_to_pharmacist <= r.ahi_tier2_cap, "Tier2", "Tier3"))
+    return rows, columns
+
+
+def _quantities_valid(pricing_qty: np.ndarray, max_qty: np.ndarray) -> np.ndarray:
+    """validate_quantities per row (NaN fails as well)."""
+    with np.errstate(invalid="ignore"):
+        return (pricing_qty > 0) & (max_qty > 0)
+
+
+def _minimum_dpmq(include_dangerous: np.ndarray) -> np.ndarray:
+    """minimum_dpmq per row, summed in Decimal so a DPMQ exactly at the minimum passes."""
+    schedule = active_schedule()
+    return np.where(include_dangerous, float(schedule.minimum_dpmq + schedule.dangerous_fee),
+                    float(schedule.minimum_dpmq))
+
+
+# ==============================
+# Section 85 – Forward: AEMP -> DPMQ
+# ==============================
+
+def wholesale_markup_batch(aemp_max_qty) -> np.ndarray:
+    """Vectorised calculate_wholesale_markup (percentage tier rounded to cents)."""
+    aemp_max_qty = _column(aemp_max_qty)
+    schedule = _schedule()
+    return np.where(
+        aemp_max_qty <= schedule.wholesale_aemp_threshold,
+        schedule.wholesale_fixed_fee,
+        np.where(
+            aemp_max_qty <= schedule.wholesale_tier2_cap,
+            round_half_up(aemp_max_qty * schedule.wholesale_markup_rate),
+            schedule.wholesale_flat_fee,
+        ),
+    )
+
+
+def ahi_fee_batch(price_to_pharmacist) -> np.ndarray:
+    """Vectorised calculate_ahi_fee (unrounded, like the scalar version)."""
+    ptp = _column(price_to_pharmacist)
+    schedule = _schedule()
+    return np.where(
+        ptp < schedule.ahi_tier1_cap,
+        schedule.ahi_base,
+        np.where(
+            ptp <= schedule.ahi_tier2_cap,
+            schedule.ahi_base + (ptp - schedule.ahi_tier1_cap) * schedule.ahi_rate,
+            schedule.ahi_max_fee,
+        ),
+    )
+
+
+def wholesale_tier_batch(aemp_max_qty) -> np.ndarray:
+    """Wholesale tier per unrounded AEMP(max): "Tier1" fixed fee, "Tier2" percentage, "Tier3" flat fee."""
+    aemp_max_qty = _column(aemp_max_qty)
+    schedule = _schedule()
+    return np.where(
+        aemp_max_qty <= schedule.wholesale_aemp_threshold,
+        "Tier1",
+        np.where(aemp_max_qty <= schedule.wholesale_tier2_cap, "Tier2", "Tier3"),
+    )
+
+
+def ahi_tier_batch(price_to_pharmacist) -> np.ndarray:
+    """AHI tier per unrounded PtP: "Tier1" base fee, "Tier2" base plus rate, "Tier3" capped."""
+    ptp = _column(price_to_pharmacist)
+    schedule = _schedule()
+    return np.where(
+        ptp < schedule.ahi_tier1_cap,
+        "Tier1",
+        np.where(ptp <= schedule.ahi_tier2_cap, "Tier2", "Tier3"),
+    )
+
+
+def section85_forward_batch(
+    unit_aemp,
+    pricing_qty,
+    max_qty,
+    include_dangerous=False,
+    tiers: bool = False,
+) -> Dict[str, np.ndarray]:
+    """
+    Price whole catalogues of Section 85 items in one vectorised pass.
+
+    Mirrors calculate_aemp_max_qty -> calculate_wholesale_markup ->
+    calculate_price_to_pharmacist -> calculate_ahi_fee -> calculate_dpmq:
+    intermediate values stay unrounded and every returned column is rounded
+    half-up to cents, as in the on-screen breakdown.
+
+    Every argument may be a scalar or a column (NumPy array, pandas Series,
+    list); scalars are broadcast. The result is a dict of equal-length arrays
+    keyed like the scalar calculators, ready for ``pd.DataFrame(result)``.
+    With tiers, "wholesale_tier" and "ahi_tier" are added, classified on the
+    unrounded AEMP(max) and PtP.
+
+    Rows the single-item UI would reject (validate_quantities, a negative or
+    non-numeric AEMP) are NaN throughout, with False in the "valid" column.
+    Rows with cent prices and whole quantities are priced exactly in integer
+    fixed point (_fixed_forward); of the rest, those whose floats land too
+    close to a half cent or a tier bound are re-priced with
+    calculate_section85_forward, so every row agrees with the single-item
+    breakdown to the cent.
+    """
+    unit_aemp = _column(unit_aemp)
+    size = unit_aemp.shape[0]
+    pricing_qty = _column(pricing_qty, size)
+    max_qty = _column(max_qty, size)
+    include_dangerous = _column(include_dangerous, size, dtype=bool)
+    schedule = _schedule()
+    with np.errstate(invalid="ignore"):
+        valid = (unit_aemp >= 0) & _quantities_valid(pricing_qty, max_qty)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        aemp_max_qty = np.where(valid, unit_aemp * max_qty / pricing_qty, np.nan)
+
+    wholesale_markup = wholesale_markup_batch(aemp_max_qty)
+    price_to_pharmacist = aemp_max_qty + wholesale_markup
+    ahi_fee = ahi_fee_batch(price_to_pharmacist)
+    dispensing_fee = np.full(size, schedule.dispensing_fee)
+    dangerous_fee = np.where(include_dangerous, schedule.dangerous_fee, 0.0)
+    dpmq = price_to_pharmacist + ahi_fee + dispensing_fee + dangerous_fee
+
+    result = {
+        "aemp_max_qty": round_half_up(aemp_max_qty),
+        "wholesale_markup": wholesale_markup,
+        "price_to_pharmacist": round_half_up(price_to_pharmacist),
+        "ahi_fee": round_half_up(ahi_fee),
+        "dispensing_fee": dispensing_fee,
+        "dangerous_fee": dangerous_fee,
+        "dpmq": round_half_up(dpmq),
+    }
+    if tiers:
+        result["wholesale_tier"] = wholesale_tier_batch(aemp_max_qty)
+        result["ahi_tier"] = ahi_tier_batch(price_to_pharmacist)
+
+    fixed, columns = _fixed_forward(unit_aemp, pricing_qty, max_qty, include_dangerous, valid, tiers)
+    for name, values in result.items():
+        if name in columns:
+            result[name] = np.where(fixed, columns[name], values)
+
+    inexact = valid & ~fixed & (
+        _near(aemp_max_qty, schedule.wholesale_aemp_threshold) | _near(aemp_max_qty, schedule.wholesale_tier2_cap)
+        | _near(price_to_pharmacist, schedule.ahi_tier1_cap) | _near(price_to_pharmacist, schedule.ahi_tier2_cap)
+    )
+    inexact |= _half_cent_ties(
+        valid & ~fixed & ~inexact, aemp_max_qty, aemp_max_qty * schedule.wholesale_markup_rate,
+        price_to_pharmacist, ahi_fee, dpmq,
+    )
+    if inexact.any():
+        exact = active_schedule()
+        rows = _decimal_rows(
+            result, inexact,
+            lambda i: section85.calculate_section85_forward(
+                unit_aemp[i], pricing_qty[i], max_qty[i], bool(include_dangerous[i])),
+            {"aemp_max_qty": "aemp_max_qty", "wholesale_markup": "wholesale_markup",
+             "price_to_pharmacist": "price_to_pharmacist", "ahi_fee": "ahi_fee", "dpmq": "final_price"},
+        )
+        if tiers:
+            for i, breakdown in rows:
+                result["wholesale_tier"][i] = _tier(breakdown["aemp_max_qty"], exact.wholesale_aemp_threshold,
+                                                    exact.wholesale_tier2_cap, tier1_inclusive=True)
+                result["ahi_tier"][i] = _tier(breakdown["price_to_pharmacist"], exact.ahi_tier1_cap,
+                                              exact.ahi_tier2_cap, tier1_inclusive=False)
+    return _fail_rows(result, valid)
+
+
+# ==============================
+# Section 85 – Inverse: DPMQ -> AEMP
+# ==============================
+
+def classify_tiers_batch(dpmq) -> np.ndarray:
+    """Vectorised get_inverse_tier_type: "Tier1" / "Tier2" / "Tier3" per DPMQ."""
+    dpmq = _column(dpmq)
+    schedule = _schedule()
+    return np.where(
+        dpmq <= schedule.tier1_dpmq_cap,
+        "Tier1",
+        np.where(dpmq <= schedule.tier2_dpmq_cap, "Tier2", "Tier3"),
+    )
+
+
+def inverse_aemp_max_batch(effective_dpmq, dispensing_fee=None) -> np.ndarray:
+    """
+    Vectorised calculate_inverse_aemp_max over the schedule's inverse segments (unrounded).
+
+    Rows at or below the Tier 1 DPMQ cap use the closed Tier 1 remainder; the
+    rest are solved segment by segment with the same overlap (lowest AEMP wins)
+    and gap (snap to the breakpoint) rules as precise_inverse_aemp_fixed.
+    """
+    return _inverse_solve(effective_dpmq, dispensing_fee)[0]
+
+
+def _inverse_solve(effective_dpmq, dispensing_fee=None) -> tuple:
+    """inverse_aemp_max_batch plus each row's branch code (pbs_calc.segments.inverse_branch)."""
+    effective_dpmq = _column(effective_dpmq)
+    schedule = _schedule()
+    if dispensing_fee is None:
+        dispensing_fee = schedule.dispensing_fee
+    target = effective_dpmq - dispensing_fee
+
+    aemp_max_qty = np.full(target.shape, np.nan)
+    codes = np.full(target.shape, TIER1_BRANCH, dtype=np.int8)
+    unresolved = np.ones(target.shape, dtype=bool)
+    for index, (low, high, slope, intercept) in enumerate(schedule.inverse_segments):
+        if low is not None:
+            in_gap = unresolved & (target <= slope * low + intercept)
+            aemp_max_qty[in_gap] = low
+            codes[in_gap] = 2 * index + 1
+            unresolved &= ~in_gap
+        hit = unresolved if high is None else unresolved & (target <= slope * high + intercept)
+        aemp_max_qty[hit] = (target[hit] - intercept) / slope
+        codes[hit] = 2 * index
+        unresolved &= ~hit
+
+    tier1 = effective_dpmq <= schedule.tier1_dpmq_cap
+    tier1_aemp = round_half_up(target - schedule.ahi_base - schedule.wholesale_fixed_fee)
+    return np.where(tier1, tier1_aemp, aemp_max_qty), np.where(tier1, TIER1_BRANCH, codes)
+
+
+def _fixed_unit_aemp(dpmq, include_dangerous, codes, pricing_qty, max_qty, rows) -> tuple:
+    """
+    Unit AEMP in int64 fixed point for the rows (a mask) where the Decimal
+    AEMP(max) and unit AEMP are both whole numbers of fixed_point units: a
+    cent DPMQ solved in Tier 1 or on a segment whose slope divides out, and
+    whole quantities that divide out. Returns (rows, unit AEMP in dollars).
+    """
+    r = fixed_point.rules()
+    cent = fixed_point.CENT
+    index = np.flatnonzero(rows)
+    codes = codes[index]
+    usable, cents = _scaled(dpmq[index], 100, FIXED_MAX_CENTS)
+    whole_pricing, pricing_qty = _scaled(pricing_qty[index], 1, 10 ** 4)
+    whole_max, max_qty = _scaled(max_qty[index], 1)
+    usable &= whole_pricing & whole_max
+    target = cents * cent - np.where(include_dangerous[index], r.dangerous_fee, 0) - r.dispensing_fee
+
+    aemp_max_qty = np.zeros(index.size, dtype=np.int64)
+    solved = usable & (codes == TIER1_BRANCH)
+    aemp_max_qty[solved] = target[solved] - r.ahi_base - r.wholesale_fixed_fee
+    for segment, (_, _, _, slope_num, slope_den, intercept) in enumerate(r.segments):
+        scaled = (target - intercept) * slope_den
+        on_segment = usable & (codes == 2 * segment) & (scaled % slope_num == 0)
+        aemp_max_qty[on_segment] = scaled[on_segment] // slope_num
+        solved |= on_segment
+
+    quantity = np.where(solved, max_qty, 1)
+    scaled = aemp_max_qty * np.where(solved, pricing_qty, 0)
+    solved &= scaled % quantity == 0
+
+    fixed = np.zeros(rows.shape, dtype=bool)
+    fixed[index[solved]] = True
+    unit_aemp = np.zeros(rows.shape)
+    unit_aemp[index[solved]] = _div_half_up(scaled[solved] // quantity[solved], cent) / 100
+    return fixed, unit_aemp
+
+
+def section85_inverse_batch(
+    dpmq,
+    pricing_qty,
+    max_qty,
+    include_dangerous=False,
+    tolerance: float = 0.005,
+) -> Dict[str, np.ndarray]:
+    """
+    Reverse whole schedules of Section 85 DPMQs to AEMP in one vectorised pass.
+
+    Mirrors the single-item DPMQ branch of app.py: tiers are classified on the
+    published DPMQ, the dangerous drug fee is stripped before solving, and the
+    DPMQ is rebuilt from the unrounded AEMP(max) with delayed rounding.
+    ``difference`` is reconstructed minus published DPMQ and ``precision_ok``
+    applies the validate_calculation_precision_enhanced tolerance to each row.
+
+    Rows the single-item UI would reject (validate_dpmq_covers_fees,
+    validate_quantities, a non-numeric cell) are NaN throughout, with False
+    in "precision_ok" and "valid". Rows whose floats land too close to a half
+    cent, a tier or segment bound or the tolerance are re-priced with
+    calculate_section85_inverse (only the unit AEMP, when that is the one
+    tie), so every row agrees with the single-item breakdown to the cent.
+    """
+    dpmq = _column(dpmq)
+    size = dpmq.shape[0]
+    pricing_qty = _column(pricing_qty, size)
+    max_qty = _column(max_qty, size)
+    include_dangerous = _column(include_dangerous, size, dtype=bool)
+    schedule = _schedule()
+
+    dispensing_fee = np.full(size, schedule.dispensing_fee)
+    dangerous_fee = np.where(include_dangerous, schedule.dangerous_fee, 0.0)
+    with np.errstate(invalid="ignore"):
+        valid = (dpmq >= _minimum_dpmq(include_dangerous)) & _quantities_valid(pricing_qty, max_qty)
+    dpmq = np.where(valid, dpmq, np.nan)
+
+    with stage("tier_classification"):
+        tier = classify_tiers_batch(dpmq)
+    with stage("solve"):
+        aemp_max_qty, codes = _inverse_solve(dpmq - dangerous_fee, dispensing_fee)
+    with stage("reconstruction"):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            unrounded_unit_aemp = np.where(valid, aemp_max_qty * pricing_qty / max_qty, np.nan)
+        unit_aemp = round_half_up(unrounded_unit_aemp)
+
+        # Delayed rounding, as calculate_inverse_wholesale_markup / calculate_inverse_ahi_fee
+        wholesale_markup = np.where(
+            aemp_max_qty <= schedule.wholesale_aemp_threshold,
+            schedule.wholesale_fixed_fee,
+            np.where(
+                aemp_max_qty <= schedule.wholesale_tier2_cap,
+                aemp_max_qty * schedule.wholesale_markup_rate,
+                schedule.wholesale_flat_fee,
+            ),
+        )
+        price_to_pharmacist = aemp_max_qty + wholesale_markup
+        ahi_fee = ahi_fee_batch(price_to_pharmacist)
+        reconstructed_dpmq = price_to_pharmacist + ahi_fee + dispensing_fee + dangerous_fee
+        difference = reconstructed_dpmq - dpmq
+        with np.errstate(invalid="ignore"):
+            precision_ok = np.abs(difference) <= tolerance
+
+    result = {
+        "tier": tier,
+        "aemp_max_qty": round_half_up(aemp_max_qty),
+        "unit_aemp": unit_aemp,
+        "wholesale_markup": round_half_up(wholesale_markup),
+        "price_to_pharmacist": round_half_up(price_to_pharmacist),
+        "ahi_fee": round_half_up(ahi_fee),
+        "dispensing_fee": dispensing_fee,
+        "dangerous_fee": dangerous_fee,
+        "reconstructed_dpmq": round_half_up(reconstructed_dpmq),
+        "difference": difference,
+        "precision_ok": precision_ok,
+    }
+
+    effective_dpmq = dpmq - dangerous_fee
+    inexact = (
+        _near(dpmq, schedule.tier1_dpmq_cap) | _near(dpmq, schedule.tier2_dpmq_cap)
+        | _near(effective_dpmq, schedule.tier1_dpmq_cap)
+        | _near(np.abs(difference), tolerance)
+        | _near(aemp_max_qty, schedule.wholesale_aemp_threshold) | _near(aemp_max_qty, schedule.wholesale_tier2_cap)
+        | _near(price_to_pharmacist, schedule.ahi_tier1_cap) | _near(price_to_pharmacist, schedule.ahi_tier2_cap)
+    )
+    for low, high, slope, intercept in schedule.inverse_segments:
+        for bound in (low, high):
+            if bound is not None:
+                inexact |= _near(effective_dpmq - dispensing_fee, slope * bound + intercept)
+    for values in (aemp_max_qty, wholesale_markup, price_to_pharmacist, ahi_fee, reconstructed_dpmq):
+        inexact |= _near_half_cent(values)
+    inexact &= valid
+
+    # Unit AEMP ties are common (AEMP(max) * 1 / 2 and the like); they are
+    # settled in fixed point where exact, else from the Decimal AEMP(max) alone
+    unit_ties = valid & ~inexact & _near_half_cent(unrounded_unit_aemp)
+    if unit_ties.any():
+        fixed, unit_aemp = _fixed_unit_aemp(dpmq, include_dangerous, codes, pricing_qty, max_qty, unit_ties)
+        result["unit_aemp"] = np.where(fixed, unit_aemp, result["unit_aemp"])
+        unit_ties &= ~fixed
+    if unit_ties.any():
+        exact = active_schedule()
+        _decimal_rows(
+            result, unit_ties,
+            lambda i: {"unit_aemp": section85.calculate_unit_aemp(
+                section85.precise_inverse_aemp_fixed(
+                    section85.to_decimal(dpmq[i]) - (exact.dangerous_fee if include_dangerous[i] else 0),
+                    exact.dispensing_fee),
+                pricing_qty[i], max_qty[i])},
+            {"unit_aemp": "unit_aemp"},
+        )
+    if inexact.any():
+        for i, breakdown in _decimal_rows(
+            result, inexact,
+            lambda i: section85.calculate_section85_inverse(
+                dpmq[i], pricing_qty[i], max_qty[i], bool(include_dangerous[i])),
+            {"aemp_max_qty": "aemp_max_qty", "unit_aemp": "unit_aemp", "wholesale_markup": "wholesale_markup",
+             "price_to_pharmacist": "price_to_pharmacist", "ahi_fee": "ahi_fee",
+             "reconstructed_dpmq": "final_price"},
+        ):
+            exact_difference = breakdown["final_price"] - section85.to_decimal(dpmq[i])
+            result["tier"][i] = section85.get_inverse_tier_type(dpmq[i])
+            result["difference"][i] = float(exact_difference)
+            result["precision_ok"][i] = abs(exact_difference) <= section85.to_decimal(tolerance)
+    count("precision_failures", int(np.count_nonzero(valid & ~result["precision_ok"])))
+
+    return _fail_rows(result, valid)
+
+
+# ==============================
+# Section 100 EFC – both directions
+# ==============================
+
+def ceil_tolerant(values) -> np.ndarray:
+    """
+    Vectorised math.ceil that ignores binary noise just above a whole number
+    (1.1 / 0.1 = 11.000000000000002 needs 11 vials, as Decimal says, not 12).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return np.ceil(values - np.abs(values) * 1e-12)
+
+
+def _efc_columns(price, pricing_qty, vial_content, max_amount, consider_wastage, hospital_setting) -> tuple:
+    price = _column(price)
+    size = price.shape[0]
+    pricing_qty = _column(pricing_qty, size)
+    vial_content = _column(vial_content, size)
+    max_amount = _column(max_amount, size)
+    consider_wastage = _column(consider_wastage, size, dtype=bool)
+    private = _column(hospital_setting, size, dtype=object) == "Private"
+    # Rows the single-item UI would reject (validate_positive, a non-numeric price) come back as NaN
+    with np.errstate(invalid="ignore"):
+        valid = np.isfinite(price) & (pricing_qty > 0) & (vial_content > 0) & (max_amount > 0)
+    return price, pricing_qty, vial_content, max_amount, consider_wastage, private, valid
+
+
+def _efc_vials(vial_content, max_amount, consider_wastage) -> tuple:
+    """
+    Vectorised calculate_vials_needed: whole vials with wastage, fractional
+    without. Also returns the rows whose ratio is too close to (but not
+    exactly) a whole number to trust the rounding up.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vials = max_amount / vial_content
+        whole = np.round(vials)
+        inexact = consider_wastage & (vials != whole) & _near(vials, whole)
+    return np.where(consider_wastage, ceil_tolerant(vials), vials), inexact
+
+
+def _fixed_efc_vials(vial_content, max_amount, consider_wastage, rows) -> tuple:
+    """
+    calculate_vials_needed in 1 / VIAL_SCALE vials for the rows (a mask) whose
+    content and amount are whole numbers of 1 / VIAL_SCALE and whose vial
+    count is one too (always, with wastage). Returns (rows, vials).
+    """
+    whole_content, content = _scaled(vial_content, VIAL_SCALE)
+    whole_amount, amount = _scaled(max_amount, VIAL_SCALE)
+    rows = rows & whole_content & whole_amount & (content > 0)
+    content = np.where(rows, content, 1)
+    fractional, remainder = np.divmod(amount * VIAL_SCALE, content)
+    rows &= consider_wastage | (remainder == 0)
+    return rows, np.where(consider_wastage, -(-amount // content) * VIAL_SCALE, fractional)
+
+
+def _fixed_efc_forward(unit_aemp, pricing_qty, vial_content, max_amount, consider_wastage, private, valid) -> tuple:
+    """
+    Exact EFC forward pricing in int64 fixed point (see _fixed_forward) for
+    the rows whose vial count and AEMP(max) are whole numbers of units.
+    Returns (rows, {column: values in dollars}).
+    """
+    r = fixed_point.rules()
+    cent = fixed_point.CENT
+    rows, vials = _fixed_efc_vials(vial_content, max_amount, consider_wastage, valid)
+    whole_price, cents = _scaled(unit_aemp, 100)
+    whole_pricing, pricing = _scaled(pricing_qty, 1)
+    rows &= whole_price & whole_pricing & (vials.astype(np.float64) * cents < FIXED_MAX_NUMERATOR * 100)
+    # vials / VIAL_SCALE * cents / 100 dollars, in units
+    numerator = np.where(rows, vials * cents, 0) * (fixed_point.SCALE // (VIAL_SCALE * 100))
+    pricing = np.where(rows, pricing, 1)
+    rows &= numerator % pricing == 0
+    aemp_max_qty = numerator // pricing
+
+    # Markup, PtP and DPMA in units / rate_den, so the private markup stays exact
+    rate, rate_den = r.efc_private_markup_rate
+    markup = np.where(private, aemp_max_qty * rate, 0)
+    price_to_pharmacist = aemp_max_qty * rate_den + markup
+    ahi_fee = np.where(private, r.efc_ahi_private, r.efc_ahi_public)
+    return rows, {
+        "aemp_max_qty": _div_half_up(aemp_max_qty, cent) / 100,
+        "wholesale_markup": _div_half_up(markup, rate_den * cent) / 100,
+        "price_to_pharmacist": _div_half_up(price_to_pharmacist, rate_den * cent) / 100,
+        "dpma": _div_half_up(price_to_pharmacist + ahi_fee * rate_den, rate_den * cent) / 100,
+    }
+
+
+def _fixed_efc_inverse(dpma, pricing_qty, vial_content, max_amount, consider_wastage, private, valid) -> tuple:
+    """
+    Exact EFC inverse in int64 fixed point for the rows whose price to
+    pharmacist, vial count and AEMP(max) are whole numbers of units.
+    Returns (rows, {column: values in dollars}).
+    """
+    r = fixed_point.rules()
+    cent = fixed_point.CENT
+    rows, vials = _fixed_efc_vials(vial_content, max_amount, consider_wastage, valid)
+    whole_price, cents = _scaled(dpma, 100, FIXED_MAX_CENTS)
+    whole_pricing, pricing = _scaled(pricing_qty, 1, 10 ** 4)
+    subtotal = cents * cent - np.where(private, r.efc_ahi_private, r.efc_ahi_public)
+    rows &= whole_price & whole_pricing & (vials > 0) & (subtotal >= 0)
+
+    multiplier, multiplier_den = r.efc_private_markup_multiplier
+    divided, remainder = np.divmod(subtotal * multiplier_den, multiplier)
+    rows &= ~private | (remainder == 0)
+    price_to_pharmacist = np.where(private, divided, subtotal)
+
+    rows &= price_to_pharmacist.astype(np.float64) * pricing < FIXED_MAX_NUMERATOR * VIAL_SCALE
+    numerator = np.where(rows, price_to_pharmacist * pricing, 0) * VIAL_SCALE
+    vials = np.where(rows, vials, 1)
+    rows &= numerator % vials == 0
+    return rows, {
+        "aemp_max_qty": _div_half_up(numerator // vials, cent) / 100,
+        "wholesale_markup": _div_half_up(np.where(rows, subtotal - price_to_pharmacist, 0), cent) / 100,
+        "price_to_pharmacist": _div_half_up(np.where(rows, price_to_pharmacist, 0), cent) / 100,
+    }
+
+
+def _efc_decimal_rows(result: dict, rows: np.ndarray, calculator: Callable, columns: dict,
+                      price, pricing_qty, vial_content, max_amount, consider_wastage, private) -> None:
+    """_decimal_rows for one of the EFC calculators."""
+    _decimal_rows(
+        result, rows,
+        lambda i: calculator(price[i], pricing_qty[i], vial_content[i], max_amount[i],
+                             bool(consider_wastage[i]), "Private" if private[i] else "Public"),
+        columns,
+    )
+
+
+def efc_forward_batch(
+    unit_aemp,
+    pricing_qty,
+    vial_content,
+    max_amount,
+    consider_wastage=False,
+    hospital_setting="Public",
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorised calculate_efc_forward: AEMP -> DPMA for whole EFC catalogues.
+
+    AEMP(max) = vials * price / pricing_qty, with vials rounded up to whole
+    vials where consider_wastage is set. Private rows add the
+    EFC_PRIVATE_MARKUP_RATE markup and EFC_AHI_PRIVATE, public rows
+    EFC_AHI_PUBLIC. Arguments may be scalars or columns (hospital_setting holds
+    "Public" / "Private"); returned columns are rounded half-up to cents and
+    rows with a non-positive quantity, content or amount, or a non-numeric
+    price, are NaN with False in "valid". Rows that divide out exactly are
+    priced in integer fixed point; of the rest, those whose floats land too
+    close to a half cent or a whole vial are re-priced with
+    calculate_efc_forward.
+    """
+    unit_aemp, pricing_qty, vial_content, max_amount, consider_wastage, private, valid = _efc_columns(
+        unit_aemp, pricing_qty, vial_content, max_amount, consider_wastage, hospital_setting)
+    schedule = _schedule()
+
+    with stage("forward_pricing"):
+        vials, inexact = _efc_vials(vial_content, max_amount, consider_wastage)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            aemp_max_qty = np.where(valid, vials * unit_aemp / pricing_qty, np.nan)
+        wholesale_markup = np.where(private, aemp_max_qty * schedule.efc_private_markup_rate, 0.0)
+        ahi_fee = np.where(private, schedule.efc_ahi_private, schedule.efc_ahi_public)
+        price_to_pharmacist = aemp_max_qty + wholesale_markup
+        dpma = price_to_pharmacist + ahi_fee
+
+    result = {
+        "aemp_max_qty": round_half_up(aemp_max_qty),
+        "unit_aemp": round_half_up(unit_aemp),
+        "wholesale_markup": round_half_up(wholesale_markup),
+        "price_to_pharmacist": round_half_up(price_to_pharmacist),
+        "ahi_fee": ahi_fee,
+        "dpma": round_half_up(dpma),
+    }
+    fixed, columns = _fixed_efc_forward(
+        unit_aemp, pricing_qty, vial_content, max_amount, consider_wastage, private, valid)
+    for name, values in columns.items():
+        result[name] = np.where(fixed, values, result[name])
+
+    inexact &= valid & ~fixed
+    inexact |= _half_cent_ties(
+        valid & ~fixed & ~inexact, aemp_max_qty, unit_aemp, wholesale_markup, price_to_pharmacist, dpma)
+    if inexact.any():
+        _efc_decimal_rows(
+            result, inexact, section100_efc.calculate_efc_forward,
+            {"aemp_max_qty": "aemp_max_qty", "unit_aemp": "unit_aemp", "wholesale_markup": "wholesale_markup",
+             "price_to_pharmacist": "price_to_pharmacist", "dpma": "final_price"},
+            unit_aemp, pricing_qty, vial_content, max_amount, consider_wastage, private,
+        )
+    return _fail_rows(result, valid)
+
+
+def efc_inverse_batch(
+    dpma,
+    pricing_qty,
+    vial_content,
+    max_amount,
+    consider_wastage=False,
+    hospital_setting="Public",
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorised calculate_efc_inverse: DPMA -> AEMP(max amount).
+
+    The fixed AHI fee is removed, private rows divide out
+    EFC_PRIVATE_MARKUP_MULTIPLIER, and the price to pharmacist is scaled by
+    pricing_qty / vials. Same argument and result conventions as
+    efc_forward_batch; "dpma" echoes the input, rounded to cents. Exact and
+    near-tie rows are settled as in efc_forward_batch, with
+    calculate_efc_inverse.
+    """
+    dpma, pricing_qty, vial_content, max_amount, consider_wastage, private, valid = _efc_columns(
+        dpma, pricing_qty, vial_content, max_amount, consider_wastage, hospital_setting)
+    schedule = _schedule()
+
+    with stage("fee_removal"):
+        ahi_fee = np.where(private, schedule.efc_ahi_private, schedule.efc_ahi_public)
+        subtotal = dpma - ahi_fee
+        price_to_pharmacist = np.where(private, subtotal / schedule.efc_private_markup_multiplier, subtotal)
+        markup = subtotal - price_to_pharmacist
+    with stage("reconstruction"):
+        vials, inexact = _efc_vials(vial_content, max_amount, consider_wastage)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            aemp_max_qty = np.where(vials == 0, 0.0, price_to_pharmacist * pricing_qty / vials)
+
+    result = {
+        "aemp_max_qty": round_half_up(aemp_max_qty),
+        "wholesale_markup": round_half_up(markup),
+        "price_to_pharmacist": round_half_up(price_to_pharmacist),
+        "ahi_fee": ahi_fee,
+        "dpma": round_half_up(dpma),
+    }
+    fixed, columns = _fixed_efc_inverse(
+        dpma, pricing_qty, vial_content, max_amount, consider_wastage, private, valid)
+    for name, values in columns.items():
+        result[name] = np.where(fixed, values, result[name])
+
+    inexact &= valid & ~fixed
+    inexact |= _half_cent_ties(valid & ~fixed & ~inexact, aemp_max_qty, markup, price_to_pharmacist, dpma)
+    if inexact.any():
+        _efc_decimal_rows(
+            result, inexact, section100_efc.calculate_efc_inverse,
+            {"aemp_max_qty": "aemp_max_qty", "wholesale_markup": "wholesale_markup",
+             "price_to_pharmacist": "price_to_pharmacist", "dpma": "final_price"},
+            dpma, pricing_qty, vial_content, max_amount, consider_wastage, private,
+        )
+    return _fail_rows(result, valid)
@@ -0,0 +1,380 @@
+# pbs_calc/bench.py
+"""
+Local benchmark suite for the pricing hot paths (no network, fixed corpora).
+
+    python -m pbs_calc bench                      # run and compare with the baseline
+    python -m pbs_calc bench --save               # run and record the results as the baseline
+    python -m pbs_calc bench --filter inverse     # only matching benchmarks
+
+Inputs are generated from fixed seeds, so every run prices the same items.
+Memoisation caches are cleared before each timed repeat: the numbers are for
+cold calculations, as seen by the first user to ask for a price.
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+from typing import Callable, Optional
+
+from pbs_calc.schedule import current_schedule
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "benchmarks", "baseline.json")
+
+# A benchmark is slower than its baseline when its best time grows by more than this
+# (the minimum over repeats is the least noisy estimate on a shared machine)
+DEFAULT_THRESHOLD = 0.20
+
+SEED = 85100
+
+SINGLE_ITEMS = 1_000
+BATCH_SIZES = (10_000, 100_000)
+
+# name -> (setup, operations per run, repeats); setup() returns the callable timed
+BENCHMARKS = {}
+
+
+def benchmark(name: str, ops: int = 1, repeats: int = 7):
+    def register(setup: Callable[[], Callable[[], object]]):
+        BENCHMARKS[name] = (setup, ops, repeats)
+        return setup
+    return register
+
+
+# ==============================
+# Fixed corpora
+# ==============================
+
+def _cents_between(low: Decimal, high: Decimal, count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    low, high = int(low * 100), int(high * 100)
+    return [Decimal(rng.randint(low, high)).scaleb(-2) for _ in range(count)]
+
+
+def dpmq_corpus(tier: str, count: int = SINGLE_ITEMS) -> list:
+    """DPMQs spread across one wholesale tier (Tier1 starts where the fees are covered)."""
+    schedule = current_schedule()
+    floor = schedule.minimum_dpmq + schedule.dangerous_fee
+    bounds = {
+        "Tier1": (floor, schedule.tier1_dpmq_cap),
+        "Tier2": (schedule.tier1_dpmq_cap + Decimal("0.01"), schedule.tier2_dpmq_cap),
+        "Tier3": (schedule.tier2_dpmq_cap + Decimal("0.01"), Decimal("9000.00")),
+    }
+    return _cents_between(*bounds[tier], count, seed=SEED + int(tier[-1]))
+
+
+def aemp_corpus(count: int = SINGLE_ITEMS) -> list:
+    return _cents_between(Decimal("0.01"), Decimal("3000.00"), count, seed=SEED)
+
+
+def batch_corpus(selected_section: str, size: int):
+    """Batch-upload style DataFrame of size items with mixed flags."""
+    import numpy as np
+    import pandas as pd
+
+    from pbs_calc.reprice import SECTION_85
+
+    rng = np.random.default_rng(SEED + size)
+    prices = rng.integers(1_400, 900_000, size) / 100
+    if selected_section == SECTION_85:
+        return pd.DataFrame({
+            "price": prices,
+            "pricing_qty": rng.choice([1, 7, 28, 30], size),
+            "max_qty": rng.choice([1, 28, 56, 60], size),
+            "dangerous": rng.choice(["No", "Yes"], size),
+        })
+    return pd.DataFrame({
+        "price": prices,
+        "pricing_qty": rng.choice([1, 10, 100], size),
+        "vial_content": rng.choice([100.0, 12.5, 500.0], size),
+        "max_amount": rng.choice([70.0, 250.0, 1000.0], size),
+        "wastage": rng.choice(["No", "Yes"], size),
+        "setting": rng.choice(["Public", "Private"], size),
+    })
+
+
+# ==============================
+# Benchmarks
+# ==============================
+
+def _register_single_items() -> None:
+    from pbs_calc import fixed_point, section85, section100_efc
+
+    dispensing_fee = current_schedule().dispensing_fee
+
+    for tier in ("Tier1", "Tier2", "Tier3"):
+        for dangerous in (False, True):
+            suffix = f"{tier.lower()}{'_dangerous' if dangerous else ''}"
+
+            @benchmark(f"section85_inverse_{suffix}", ops=SINGLE_ITEMS)
+            def _inverse(tier=tier, dangerous=dangerous):
+                corpus = dpmq_corpus(tier)
+                return lambda: [section85.calculate_section85_inverse(dpmq, 30, 60, dangerous) for dpmq in corpus]
+
+            @benchmark(f"section85_inverse_fixed_{suffix}", ops=SINGLE_ITEMS)
+            def _inverse_fixed(tier=tier, dangerous=dangerous):
+                corpus = dpmq_corpus(tier)
+                return lambda: [fixed_point.calculate_section85_inverse(dpmq, 30, 60, dangerous) for dpmq in corpus]
+
+        @benchmark(f"precise_inverse_aemp_{tier.lower()}", ops=SINGLE_ITEMS)
+        def _solver(tier=tier):
+            corpus = dpmq_corpus(tier)
+            return lambda: [section85.precise_inverse_aemp_fixed(dpmq, dispensing_fee) for dpmq in corpus]
+
+    for dangerous in (False, True):
+        @benchmark(f"section85_forward{'_dangerous' if dangerous else ''}", ops=SINGLE_ITEMS)
+        def _forward(dangerous=dangerous):
+            corpus = aemp_corpus()
+            return lambda: [section85.calculate_section85_forward(aemp, 30, 60, dangerous) for aemp in corpus]
+
+    for direction in ("forward", "inverse"):
+        for hospital in ("Public", "Private"):
+            for wastage in (False, True):
+                name = f"efc_{direction}_{hospital.lower()}{'_wastage' if wastage else ''}"
+
+                @benchmark(name, ops=SINGLE_ITEMS)
+                def _efc(direction=direction, hospital=hospital, wastage=wastage):
+                    calculate = getattr(section100_efc, f"calculate_efc_{direction}")
+                    corpus = _cents_between(Decimal("150.00"), Decimal("9000.00"), SINGLE_ITEMS, seed=SEED)
+                    return lambda: [calculate(price, 10, Decimal("12.5"), 70, wastage, hospital) for price in corpus]
+
+
+def _register_exports() -> None:
+    @benchmark("export_xlsx_single_breakdown", repeats=15)
+    def _export_single():
+        import io
+
+        import pandas as pd
+
+        from pbs_calc.section85 import calculate_section85_inverse
+        from ui_helpers import generate_cost_breakdown_df
+
+        result = calculate_section85_inverse(Decimal("123.45"), 30, 60, True)
+
+        def run():
+            # Same work as each rerun of an app.py output branch
+            df = generate_cost_breakdown_df(
+                result["aemp_max_qty"], result["unit_aemp"], result["wholesale_markup"],
+                result["price_to_pharmacist"], result["ahi_fee"], result["dispensing_fee"],
+                result["dangerous_fee"], result["final_price"], label="DPMQ",
+            )
+            buffer = io.BytesIO()
+            with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+                df.to_excel(writer, index=False, sheet_name="Cost Breakdown")
+            return buffer.getvalue()
+        return run
+
+    @benchmark(f"export_xlsx_batch_{BATCH_SIZES[0] // 1000}k", ops=BATCH_SIZES[0], repeats=3)
+    def _export_batch():
+        import io
+
+        import pandas as pd
+
+        from pbs_calc.reprice import SECTION_85, price_chunk
+
+        priced = price_chunk(batch_corpus(SECTION_85, BATCH_SIZES[0]), SECTION_85, "DPMQ")
+
+        def run():
+            buffer = io.BytesIO()
+            with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+                priced.to_excel(writer, index=False, sheet_name="Batch")
+            return buffer.getvalue()
+        return run
+
+    for export_format in ("XLSX", "CSV", "Parquet"):
+        @benchmark(f"export_{export_format.lower()}_bytes_{BATCH_SIZES[0] // 1000}k", ops=BATCH_SIZES[0], repeats=3)
+        def _export_bytes(export_format=export_format):
+            from pbs_calc.export import export_bytes
+            from pbs_calc.reprice import SECTION_85, price_chunk
+
+            priced = price_chunk(batch_corpus(SECTION_85, BATCH_SIZES[0]), SECTION_85, "DPMQ")
+            return lambda: export_bytes(priced, export_format, "Batch")
+
+
+def _register_batches() -> None:
+    from pbs_calc.reprice import SECTION_85, SECTION_100_EFC, price_chunk
+
+    for size in BATCH_SIZES:
+        for section, short in ((SECTION_85, "section85"), (SECTION_100_EFC, "efc")):
+            for price_type, direction in (("AEMP", "forward"), ("DPMQ", "inverse")):
+                @benchmark(f"batch_{short}_{direction}_{size // 1000}k", ops=size, repeats=3)
+                def _batch(section=section, price_type=price_type, size=size):
+                    items = batch_corpus(section, size)
+                    return lambda: price_chunk(items, section, price_type)
+
+        @benchmark(f"impact_section85_{size // 1000}k", ops=size, repeats=3)
+        def _impact(size=size):
+            from pbs_calc.impact import schedule_impact
+
+            items = batch_corpus(SECTION_85, size)
+            items["item_code"] = items.index.astype(str)
+            schedule = current_schedule()
+            return lambda: schedule_impact(items, schedule, schedule)
+
+    # Reading the pricing columns of a file with an unused text column, chunk by chunk
+    size = BATCH_SIZES[-1]
+    for suffix in ("csv", "parquet", "arrow"):
+        @benchmark(f"ingest_{suffix}_{size // 1000}k", ops=size, repeats=3)
+        def _ingest(suffix=suffix):
+            import tempfile
+
+            from pbs_calc.reprice import ChunkWriter, pricing_columns, read_chunks
+
+            items = batch_corpus(SECTION_85, size)
+            items["description"] = "ready-prepared tablet, 30 pack " * 4
+            path = os.path.join(tempfile.mkdtemp(prefix="pbs_bench_"), f"items.{suffix}")
+            with ChunkWriter(path) as writer:
+                writer.write(items)
+            columns = pricing_columns(SECTION_85)
+            return lambda: sum(len(chunk) for chunk in read_chunks(path, 50_000, columns))
+
+
+def _register_store() -> None:
+    import tempfile
+
+    from pbs_calc import section85
+    from pbs_calc.cache import bypassing_caches
+    from pbs_calc.store import ResultStore, key_text
+
+    @benchmark("store_hit", ops=SINGLE_ITEMS)
+    def _store_hit():
+        # A warm on-disk store read, to set against the calculations it would replace
+        store = ResultStore(os.path.join(tempfile.mkdtemp(prefix="pbs_bench_"), "results.sqlite"))
+        version = current_schedule().version
+        keys = []
+        with bypassing_caches():
+            for dpmq in dpmq_corpus("Tier2"):
+                keys.append(key_text((dpmq, 30, 60, False), ()))
+                store.put("bench", version, keys[-1], section85.calculate_section85_inverse(dpmq, 30, 60, False))
+        store.flush()
+        return lambda: [store.get("bench", version, key) for key in keys]
+
+
+def _register_all() -> None:
+    if not BENCHMARKS:
+        _register_single_items()
+        _register_exports()
+        _register_batches()
+        _register_store()
+
+
+# ==============================
+# Running & comparing
+# ==============================
+
+def _measure(setup, ops: int, repeats: int) -> dict:
+    from pbs_calc.cache import clear_caches
+
+    run = setup()
+    clear_caches()
+    run()  # warm-up: imports, lookup table, first-call allocations
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    try:
+        for _ in range(repeats):
+            clear_caches()
+            gc.collect()
+            gc.disable()  # as timeit does: collections land on random repeats
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) / ops)
+            gc.enable()
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {
+        "ops": ops,
+        "repeats": repeats,
+        "median_us": statistics.median(timings) * 1e6,
+        "min_us": min(timings) * 1e6,
+    }
+
+
+def environment() -> dict:
+    from pbs_calc.cache import fee_schedule_version
+    from pbs_calc.lookup import lookup_enabled
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "fee_schedule_version": fee_schedule_version(),
+        "lookup_table": lookup_enabled(),
+    }
+
+
+def run_benchmarks(pattern: Optional[str] = None, repeats: Optional[int] = None, report=None) -> dict:
+    """Run every benchmark whose name contains pattern; report(name, result) after each."""
+    _register_all()
+    results = {}
+    for name, (setup, ops, default_repeats) in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        results[name] = _measure(setup, ops, repeats or default_repeats)
+        if report:
+            report(name, results[name])
+    return {"environment": environment(), "results": results}
+
+
+def save_baseline(run: dict, path: str = DEFAULT_BASELINE) -> None:
+    """Merge run into the baseline file (benchmarks not run keep their saved numbers)."""
+    baseline = load_baseline(path) or {"results": {}}
+    baseline["environment"] = run["environment"]
+    baseline["results"].update(run["results"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(baseline, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+def load_baseline(path: str = DEFAULT_BASELINE) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def compare(run: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """One row per benchmark: best time, ratio to baseline and a status."""
+    rows = []
+    for name, result in run["results"].items():
+        saved = baseline["results"].get(name)
+        if saved is None:
+            rows.append({"name": name, "min_us": result["min_us"], "baseline_us": None,
+                         "ratio": None, "status": "new"})
+            continue
+        ratio = result["min_us"] / saved["min_us"]
+        status = "slower" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else "ok"
+        rows.append({"name": name, "min_us": result["min_us"], "baseline_us": saved["min_us"],
+                     "ratio": ratio, "status": status})
+    return rows
+
+
+def format_report(rows: list, run: dict, baseline: dict) -> str:
+    lines = []
+    if baseline.get("environment", {}).get("platform") != run["environment"]["platform"] or \
+            baseline.get("environment", {}).get("cpus") != run["environment"]["cpus"]:
+        lines.append("note: baseline was recorded on a different machine; ratios are indicative only")
+    lines.append(f"{'benchmark':<42} {'best':>12} {'baseline':>12} {'ratio':>7}  status")
+    for row in rows:
+        baseline_us = "-" if row["baseline_us"] is None else f"{row['baseline_us']:.2f}us"
+        ratio = "-" if row["ratio"] is None else f"{row['ratio']:.2f}x"
+        lines.append(f"{row['name']:<42} {row['min_us']:>10.2f}us {baseline_us:>12} {ratio:>7}  {row['status']}")
+    slower = [row["name"] for row in rows if row["status"] == "slower"]
+    lines.append(f"{len(slower)} regression(s)" + (f": {', '.join(slower)}" if slower else ""))
+    return "\n".join(lines)
+
+
+def print_result(name: str, result: dict) -> None:
+    per_second = 1e6 / result["median_us"] if result["median_us"] else float("inf")
+    print(f"{name:<42} {result['median_us']:>10.2f}us/op  (min {result['min_us']:.2f}us, "
+          f"{per_second:,.0f} ops/s)", file=sys.stderr)
@@ -0,0 +1,183 @@
+# pbs_calc/cache.py
+"""
+Bounded in-process memoisation for the pricing calculators.
+
+Keys are the normalised Decimal inputs plus the fee-schedule version, so a
+schedule change never serves a stale result. The calculators fix their own
+Decimal context (pbs_calc.precision), so the caller's does not enter the key.
+Calculators memoised with persist=True also share results across processes
+and runs through the optional on-disk store (pbs_calc.store). Inside a
+bypassing_caches() block every memoised calculator, nested ones included,
+skips its LRU; it calculates directly unless the block keeps the store.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+
+from pbs_calc.diagnostics import count
+from pbs_calc.schedule import active_schedule
+from pbs_calc.store import active_store, key_text
+
+DEFAULT_MAXSIZE = 4096
+
+# Every memoised calculator, by qualified name, for stats and clearing
+REGISTRY = {}
+
+_MISSING = object()
+
+# Set by bypassing_caches(): _BYPASS_ALL, _BYPASS_LRU or None; a context
+# variable, so other threads keep their caches
+_BYPASS_ALL = "all"
+_BYPASS_LRU = "lru"
+_bypass = contextvars.ContextVar("pbs_calc_bypass_caches", default=None)
+
+
+def fee_schedule_version() -> str:
+    """Version hash of the active fee schedule (see pbs_calc.schedule)."""
+    return active_schedule().version
+
+
+def normalise(value):
+    """Cache-key form of an input: numbers become Decimals (900, 900.0 and "900.00" collide)."""
+    if isinstance(value, bool) or value is None or isinstance(value, Decimal):
+        return value
+    if isinstance(value, (int, float)):
+        return Decimal(str(value))
+    if isinstance(value, str):
+        try:
+            return Decimal(value)
+        except ArithmeticError:
+            return value
+    return value
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._data), "maxsize": self.maxsize}
+
+
+def memoise(maxsize: int = DEFAULT_MAXSIZE, persist: bool = False):
+    """
+    Decorator: remember results keyed on normalised arguments and the
+    fee-schedule version. dict results are copied on the way out
+    so callers cannot mutate the cached entry. With persist, a miss is
+    looked up in the on-disk store (when PBS_RESULT_CACHE turns it on)
+    before calculating, and new results are written to it.
+    """
+    def decorator(func):
+        cache = LRUCache(maxsize)
+        name = f"{func.__module__}.{func.__name__}"
+        hit_counter = f"memo_hit.{func.__name__}"
+        miss_counter = f"memo_miss.{func.__name__}"
+
+        def key_of(args, kwargs) -> tuple:
+            return (
+                fee_schedule_version(),
+                tuple(normalise(arg) for arg in args),
+                tuple(sorted((name, normalise(arg)) for name, arg in kwargs.items())),
+            )
+
+        def calculate(key, args, kwargs):
+            store = active_store() if persist else None
+            if store is None:
+                return func(*args, **kwargs)
+            stored_key = key_text(key[1], key[2])
+            result = store.get(name, key[0], stored_key)
+            if result is None:
+                count(f"store_miss.{func.__name__}")
+                result = func(*args, **kwargs)
+                store.put(name, key[0], stored_key, result)
+            else:
+                count(f"store_hit.{func.__name__}")
+            return result
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bypass = _bypass.get()
+            if bypass is not None:
+                if bypass == _BYPASS_ALL or not persist:
+                    return func(*args, **kwargs)
+                return calculate(key_of(args, kwargs), args, kwargs)
+            key = key_of(args, kwargs)
+            result = cache.get(key)
+            if result is _MISSING:
+                count(miss_counter)
+                result = calculate(key, args, kwargs)
+                cache.put(key, result)
+            else:
+                count(hit_counter)
+            return dict(result) if isinstance(result, dict) else result
+
+        wrapper.cache = cache
+        wrapper.cache_info = cache.stats
+        wrapper.cache_clear = cache.clear
+        REGISTRY[name] = cache
+        return wrapper
+
+    return decorator
+
+
+@contextlib.contextmanager
+def bypassing_caches(keep_store: bool = False):
+    """
+    Calculate directly inside the block: no memoised calculator (nor the
+    ones it calls) reads or fills its LRU or the on-disk store. For sweeps
+    and comparisons, where millions of one-off prices would only churn them.
+    With keep_store, persisted calculators still read and fill the store,
+    which is shared and bounded anyway (the batch engines' Decimal rows).
+    """
+    token = _bypass.set(_BYPASS_LRU if keep_store else _BYPASS_ALL)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters for every memoised calculator."""
+    return {name: cache.stats() for name, cache in REGISTRY.items()}
+
+
+def clear_caches() -> None:
+    for cache in REGISTRY.values():
+        cache.clear()
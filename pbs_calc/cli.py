@@ -0,0 +1,277 @@
+# pbs_calc/cli.py
+"""
+Headless entry point:
+
+    python -m pbs_calc reprice --section 85 --direction inverse in.csv out.parquet
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from typing import Optional, Sequence
+
+SECTIONS = {"85": "Section 85", "100-efc": "Section 100 – EFC"}
+
+# forward prices from a known AEMP, inverse from a known DPMQ (as in the UI)
+DIRECTIONS = {"forward": "AEMP", "inverse": "DPMQ"}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pbs_calc", description="PBS price calculator (headless).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reprice = commands.add_parser("reprice", help="Price a CSV/Parquet/Arrow/XLSX file of items.")
+    reprice.add_argument("input", help="Input file (.csv, .parquet, .arrow/.feather or .xlsx).")
+    reprice.add_argument("output",
+                         help="Output file (.csv, .parquet, .arrow/.feather or .xlsx), written chunk by chunk.")
+    reprice.add_argument("--section", choices=SECTIONS, default="85")
+    reprice.add_argument("--direction", choices=DIRECTIONS, default="forward")
+    reprice.add_argument("--workers", type=int, default=None,
+                         help="Worker processes (default: one per CPU core).")
+    reprice.add_argument("--chunk-size", type=int, default=50_000,
+                         help="Rows read and priced per chunk (default: 50000).")
+    reprice.add_argument("--diagnostics", default=None, metavar="PATH",
+                         help="Write per-chunk stage timings and counters as JSON lines ('-' for stderr).")
+    reprice.add_argument("--effective-date", default=None, metavar="YYYY-MM-DD",
+                         help="Price with the fee schedule in effect on this date (default: today).")
+    reprice.add_argument("--keep", nargs="*", default=None, metavar="COLUMN",
+                         help="Read only the pricing columns plus these (e.g. item_code); "
+                              "by default every input column is carried to the output.")
+
+    build = commands.add_parser("build-lookup", help="(Re)build the Section 85 DPMQ -> AEMP lookup table.")
+    build.add_argument("--ceiling", default=None,
+                       help="Highest DPMQ covered (default: PBS_LOOKUP_CEILING or 10000.00).")
+
+    check = commands.add_parser("check-backends",
+                                help="Check the fixed-point backend against Decimal to the cent and time both.")
+    check.add_argument("--max-price", default="3000.00", help="Highest price swept (default: 3000.00).")
+    check.add_argument("--step", default="0.07", help="Price step of the sweep (default: 0.07).")
+
+    sweep = commands.add_parser("sweep", help="Round-trip every cent of a price range and report drift.")
+    sweep.add_argument("--low", default="0.01", help="Lowest price swept (default: 0.01).")
+    sweep.add_argument("--high", default="1000.00", help="Highest price swept (default: 1000.00).")
+    sweep.add_argument("--tolerance", default="0.005",
+                       help="Largest acceptable reconstruction difference (default: 0.005).")
+    sweep.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU core).")
+    sweep.add_argument("--backend", default=None, help="Arithmetic backend (default: PBS_ARITHMETIC or decimal).")
+    sweep.add_argument("--effective-date", default=None, metavar="YYYY-MM-DD",
+                       help="Sweep the fee schedule in effect on this date (default: today).")
+    sweep.add_argument("--output", default=None, help="Write every drifting value to this CSV file.")
+
+    bench = commands.add_parser("bench", help="Benchmark the pricing paths and compare with the saved baseline.")
+    bench.add_argument("--filter", default=None, help="Only run benchmarks whose name contains this text.")
+    bench.add_argument("--repeat", type=int, default=None, help="Timed repeats per benchmark.")
+    bench.add_argument("--baseline", default=None, help="Baseline JSON (default: benchmarks/baseline.json).")
+    bench.add_argument("--save", action="store_true", help="Save the results as the new baseline.")
+    bench.add_argument("--threshold", type=float, default=None,
+                       help="Allowed slowdown before a benchmark counts as a regression (default: 0.20).")
+
+    impact = commands.add_parser("impact", help="Compare a catalogue's prices under two fee schedules.")
+    impact.add_argument("input",
+                        help="Catalogue (.csv, .parquet, .arrow or .xlsx): item_code plus the reprice columns.")
+    impact.add_argument("output", help="Per-item changes and tier moves (.csv, .parquet, .arrow or .xlsx).")
+    impact.add_argument("--old", required=True, metavar="YYYY-MM-DD",
+                        help="A date the old fee schedule was in effect.")
+    impact.add_argument("--new", default=None, metavar="YYYY-MM-DD",
+                        help="A date the new fee schedule is in effect (default: today).")
+    impact.add_argument("--section", choices=SECTIONS, default="85")
+    impact.add_argument("--direction", choices=DIRECTIONS, default="forward",
+                        help="forward: catalogue prices are AEMPs; inverse: DPMQs under the old schedule.")
+    impact.add_argument("--new-catalogue", default=None, metavar="PATH",
+                        help="Catalogue priced under the new schedule, joined on item_code (default: the same).")
+
+    warm = commands.add_parser("warm-cache", help="Fill the on-disk result cache from a file of items.")
+    warm.add_argument("input", help="Items file (.csv, .parquet, .arrow or .xlsx) with the reprice columns.")
+    warm.add_argument("--section", choices=SECTIONS, default="85")
+    warm.add_argument("--direction", choices=DIRECTIONS, default="inverse")
+    warm.add_argument("--effective-date", default=None, metavar="YYYY-MM-DD",
+                      help="Warm the fee schedule in effect on this date (default: today).")
+    warm.add_argument("--db", default=None, metavar="PATH",
+                      help="Database file (default: PBS_RESULT_CACHE, else .pbs_cache/results.sqlite).")
+
+    serve = commands.add_parser("serve", help="Run the local HTTP/JSON pricing service.")
+    serve.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1).")
+    serve.add_argument("--port", type=int, default=8585, help="Port to listen on (default: 8585).")
+    serve.add_argument("--max-batch", type=int, default=256,
+                       help="Most single-item requests priced together (default: 256).")
+    serve.add_argument("--max-wait-ms", type=float, default=2.0,
+                       help="Longest a request waits for others to batch with (default: 2 ms).")
+    serve.add_argument("--verbose", action="store_true", help="Log every request to stderr.")
+    return parser
+
+
+def _run_reprice(args: argparse.Namespace) -> int:
+    from pbs_calc.reprice import reprice_file
+
+    started = time.perf_counter()
+    try:
+        total = reprice_file(
+            args.input, args.output,
+            SECTIONS[args.section], DIRECTIONS[args.direction],
+            workers=args.workers, chunk_size=args.chunk_size, diagnostics=args.diagnostics,
+            effective_date=args.effective_date, keep=args.keep,
+            progress=lambda done: print(f"priced {done:,} rows", file=sys.stderr),
+        )
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+
+    elapsed = time.perf_counter() - started
+    print(f"{total:,} rows written to {args.output} in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+def _run_build_lookup(args: argparse.Namespace) -> int:
+    from decimal import Decimal
+
+    from pbs_calc.lookup import build_inverse_table
+
+    started = time.perf_counter()
+    path = build_inverse_table(Decimal(args.ceiling) if args.ceiling else None)
+    print(f"lookup table written to {path} in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    return 0
+
+
+def _run_check_backends(args: argparse.Namespace) -> int:
+    from decimal import Decimal
+
+    from pbs_calc.backends import compare_backends
+
+    failed = False
+    for report in compare_backends(Decimal(args.max_price), Decimal(args.step)):
+        speedup = report["decimal_seconds"] / report["fixed_seconds"] if report["fixed_seconds"] else float("inf")
+        print(f"{report['check']:<18} {report['cases']:>9,} cases  {len(report['mismatches']):>5} mismatches  "
+              f"decimal {report['decimal_seconds']:.2f}s  fixed {report['fixed_seconds']:.2f}s  ({speedup:.1f}x)")
+        for mismatch in report["mismatches"][:10]:
+            print(f"    {mismatch}", file=sys.stderr)
+        failed = failed or bool(report["mismatches"])
+    return 1 if failed else 0
+
+
+def _run_sweep(args: argparse.Namespace) -> int:
+    import csv
+    from decimal import Decimal
+
+    from pbs_calc.sweep import DRIFT_COLUMNS, drift_summary, round_trip_sweep
+
+    try:
+        result = round_trip_sweep(
+            Decimal(args.low), Decimal(args.high), Decimal(args.tolerance),
+            workers=args.workers, backend=args.backend, effective_date=args.effective_date,
+            progress=lambda done: print(f"swept {done:,} cents", file=sys.stderr),
+        )
+    except (ArithmeticError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+
+    for row in drift_summary(result):
+        print(f"{row['check']:<16} {row['cases']:>11,} cases  {row['drifts']:>7,} beyond tolerance  "
+              f"max drift {row['max_drift']}")
+    for drift in result["drifts"][:10]:
+        print(f"    {drift}", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.DictWriter(handle, fieldnames=DRIFT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(result["drifts"])
+        print(f"{len(result['drifts']):,} drifting values written to {args.output}", file=sys.stderr)
+    print(f"swept in {result['seconds']:.2f}s", file=sys.stderr)
+    return 1 if result["drifts"] else 0
+
+
+def _run_bench(args: argparse.Namespace) -> int:
+    from pbs_calc import bench
+
+    path = args.baseline or bench.DEFAULT_BASELINE
+    run = bench.run_benchmarks(args.filter, args.repeat, report=bench.print_result)
+    if not run["results"]:
+        print(f"error: no benchmark matches {args.filter!r}", file=sys.stderr)
+        return 1
+    if args.save:
+        bench.save_baseline(run, path)
+        print(f"baseline saved to {path}", file=sys.stderr)
+        return 0
+
+    baseline = bench.load_baseline(path)
+    if baseline is None:
+        print(f"no baseline at {path}; run with --save to record one", file=sys.stderr)
+        return 0
+    threshold = bench.DEFAULT_THRESHOLD if args.threshold is None else args.threshold
+    rows = bench.compare(run, baseline, threshold)
+    print(bench.format_report(rows, run, baseline))
+    return 1 if any(row["status"] == "slower" for row in rows) else 0
+
+
+def _run_impact(args: argparse.Namespace) -> int:
+    from pbs_calc.impact import impact_file
+
+    started = time.perf_counter()
+    try:
+        totals = impact_file(args.input, args.output, args.old, args.new,
+                             SECTIONS[args.section], DIRECTIONS[args.direction], args.new_catalogue)
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+
+    print(f"{totals['items']:,} items: {totals['listed']:,} listed, {totals['added']:,} added, "
+          f"{totals['delisted']:,} delisted, {totals['failed']:,} failed")
+    for measure in ("wholesale_markup", "price_to_pharmacist", "ahi_fee", "dpmq"):
+        print(f"{measure:<20} {totals[f'{measure}_old']:>16,.2f} -> {totals[f'{measure}_new']:>16,.2f}  "
+              f"({totals[f'{measure}_change']:+,.2f})")
+    print(f"DPMQ up {totals['dpmq_up']:,}, down {totals['dpmq_down']:,}, unchanged {totals['dpmq_unchanged']:,}; "
+          f"change per item {totals['dpmq_change_min']:+.2f} to {totals['dpmq_change_max']:+.2f}")
+    if "tier_changes" in totals:
+        print(f"{totals['tier_migrations']:,} items change tier")
+        for change, items in totals["tier_changes"].items():
+            print(f"    {change:<26} {items:>9,}")
+    print(f"written to {args.output} in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    return 0
+
+
+def _run_warm_cache(args: argparse.Namespace) -> int:
+    from pbs_calc.store import default_store_path, store_path, use_store, warm_store
+
+    use_store(args.db or store_path() or default_store_path())
+    started = time.perf_counter()
+    try:
+        stats = warm_store(args.input, SECTIONS[args.section], DIRECTIONS[args.direction], args.effective_date,
+                           progress=lambda done: print(f"warmed {done:,} rows", file=sys.stderr))
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+
+    print(f"{stats['priced']:,} rows priced ({stats['skipped']:,} skipped), {stats['writes']:,} results written; "
+          f"{stats['entries']:,} of {stats['max_entries']:,} entries in {stats['path']} "
+          f"in {time.perf_counter() - started:.2f}s")
+    return 1 if stats["disabled"] else 0
+
+
+def _run_serve(args: argparse.Namespace) -> int:
+    from pbs_calc.service import serve
+
+    print(f"serving on http://{args.host}:{args.port} (Ctrl+C to stop)", file=sys.stderr)
+    serve(args.host, args.port, args.max_batch, args.max_wait_ms / 1000, args.verbose)
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "reprice":
+        return _run_reprice(args)
+    if args.command == "build-lookup":
+        return _run_build_lookup(args)
+    if args.command == "check-backends":
+        return _run_check_backends(args)
+    if args.command == "sweep":
+        return _run_sweep(args)
+    if args.command == "bench":
+        return _run_bench(args)
+    if args.command == "impact":
+        return _run_impact(args)
+    if args.command == "warm-cache":
+        return _run_warm_cache(args)
+    if args.command == "serve":
+        return _run_serve(args)
+    return 2
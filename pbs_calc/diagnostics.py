@@ -0,0 +1,168 @@
+# pbs_calc/diagnostics.py
+"""
+Per-stage timers and counters for the pricing paths.
+
+Instrumented code calls stage(name) and count(name). Both do nothing unless a
+Collector is active in the current thread, so with diagnostics off the cost is
+one thread-local lookup per call:
+
+    with collecting() as diagnostics:
+        calculate_section85_inverse(dpmq, pricing_qty, max_qty)
+    diagnostics.snapshot()
+    # {"stages": {"solve": {"calls": 1, "total_ms": ..., "max_ms": ...}, ...},
+    #  "counters": {"solver.lookup_hit": 1, ...}}
+
+Streamlit runs each session in its own thread, so sessions never see each
+other's numbers. Batch runs emit snapshots as JSON lines (JsonLinesLog).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+
+class _State(threading.local):
+    collector = None  # class default: a missing per-thread attribute costs ~1us to look up
+
+
+_local = _State()
+
+_NULL = contextlib.nullcontext()
+
+
+def env_enabled() -> bool:
+    """PBS_DIAGNOSTICS=1 turns diagnostics on by default (UI and CLI)."""
+    return os.environ.get("PBS_DIAGNOSTICS", "0") not in ("", "0")
+
+
+class Collector:
+    """Stage timings (calls, total and worst seconds) and counters."""
+
+    __slots__ = ("stages", "counters")
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, snapshot: dict) -> None:
+        """Fold in a snapshot from another collector (e.g. a worker process)."""
+        for name, stats in snapshot["stages"].items():
+            entry = self.stages.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += stats["calls"]
+            entry[1] += stats["total_ms"] / 1000
+            entry[2] = max(entry[2], stats["max_ms"] / 1000)
+        for name, amount in snapshot["counters"].items():
+            self.count(name, amount)
+
+    def snapshot(self) -> dict:
+        return {
+            "stages": {
+                name: {"calls": calls, "total_ms": round(total * 1000, 4), "max_ms": round(worst * 1000, 4)}
+                for name, (calls, total, worst) in self.stages.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+
+class _Timer:
+    __slots__ = ("collector", "name", "started")
+
+    def __init__(self, collector: Collector, name: str):
+        self.collector = collector
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.collector.add(self.name, time.perf_counter() - self.started)
+
+
+# ==============================
+# Instrumentation points
+# ==============================
+
+def active() -> Optional[Collector]:
+    return _local.collector
+
+
+def stage(name: str):
+    """Context manager timing one stage into the active collector (no-op when none)."""
+    collector = _local.collector
+    if collector is None:
+        return _NULL
+    return _Timer(collector, name)
+
+
+def count(name: str, amount: int = 1) -> None:
+    collector = _local.collector
+    if collector is not None:
+        collector.count(name, amount)
+
+
+@contextlib.contextmanager
+def collecting(collector: Optional[Collector] = None):
+    """Activate a collector for the current thread for the duration of the block."""
+    previous = active()
+    collector = collector or Collector()
+    _local.collector = collector
+    try:
+        yield collector
+    finally:
+        _local.collector = previous
+
+
+def start_run(enabled: bool) -> Optional[Collector]:
+    """
+    Activate a fresh collector for the rest of this thread's work (one Streamlit
+    script run), or clear any left over from a previous run when disabled.
+    """
+    _local.collector = Collector() if enabled else None
+    return _local.collector
+
+
+# ==============================
+# JSON lines output (batch runs)
+# ==============================
+
+class JsonLinesLog:
+    """Append one JSON object per line to a file, or to stderr for "-"."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._handle = sys.stderr if path == "-" else open(path, "w", encoding="utf-8")
+
+    def write(self, event: str, **fields) -> None:
+        record = {"ts": round(time.time(), 3), "event": event, **fields}
+        self._handle.write(json.dumps(record, default=str) + "\n")
+        self._handle.flush()
+
+    def close(self) -> None:
+        if self._handle is not sys.stderr:
+            self._handle.close()
+
+    def __enter__(self) -> "JsonLinesLog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
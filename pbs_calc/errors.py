@@ -0,0 +1,13 @@
+# pbs_calc/errors.py
+
+
+class PricingError(ValueError):
+    """Base class for pricing errors raised by the pbs_calc core."""
+
+
+class InvalidInputError(PricingError):
+    """An input value is outside what the PBS pricing rules accept."""
+
+
+class DPMQBelowFeesError(InvalidInputError):
+    """A DPMQ is too low to cover the fixed PBS fees."""
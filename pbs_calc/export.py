@@ -0,0 +1,144 @@
+# pbs_calc/export.py
+"""
+Serialise priced results to CSV, Parquet or XLSX bytes.
+
+Streamlit-free: the app hands these to st.download_button as deferred
+callables, so nothing is built until the user actually downloads. XLSX output
+above STREAMING_XLSX_ROWS rows is written row by row with XlsxWriter's
+constant_memory mode (rows are flushed to a temp file as they are written),
+so large batches never hold a full workbook object model or extra DataFrame
+copies in RAM.
+
+pandas and the writers are imported only when a file is built, so rendering
+a download button costs nothing.
+"""
+
+from __future__ import annotations
+
+import functools
+import importlib.util
+import io
+import math
+from typing import TYPE_CHECKING, Callable, Union
+
+from pbs_calc.diagnostics import stage
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "XLSX": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# Optional packages -> what needs them
+OPTIONAL_PACKAGES = {
+    "xlsxwriter": "XLSX downloads",
+    "pyarrow": "Parquet downloads",
+    "openpyxl": "XLSX uploads",
+}
+
+# format -> optional package that writes it
+FORMAT_PACKAGES = {"XLSX": "xlsxwriter", "Parquet": "pyarrow"}
+
+# Results larger than this are written with XlsxWriter's constant_memory mode
+STREAMING_XLSX_ROWS = 5_000
+
+# Rows converted to Python values at a time when streaming
+XLSX_BATCH_ROWS = 10_000
+
+# Worksheet row limit (header included)
+XLSX_MAX_ROWS = 1_048_576
+
+Frame = Union["pd.DataFrame", Callable[[], "pd.DataFrame"]]
+
+
+@functools.lru_cache(maxsize=None)
+def missing_packages() -> dict:
+    """Optional packages that are not installed, with what needs them (checked once per process)."""
+    return {name: use for name, use in OPTIONAL_PACKAGES.items() if importlib.util.find_spec(name) is None}
+
+
+def available_formats() -> list:
+    """Export formats whose writer is installed."""
+    missing = missing_packages()
+    return [name for name in EXPORT_FORMATS if FORMAT_PACKAGES.get(name) not in missing]
+
+
+def export_file_name(base_name: str, export_format: str) -> str:
+    return f"{base_name}.{EXPORT_FORMATS[export_format][0]}"
+
+
+def export_mime(export_format: str) -> str:
+    return EXPORT_FORMATS[export_format][1]
+
+
+def _cell(value, na, nat):
+    """Spreadsheet-safe cell value (None, pd.NA, NaT and NaN become blanks)."""
+    if value is None or value is na or value is nat or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    return value
+
+
+def write_xlsx_rows(worksheet, frame: pd.DataFrame, first_row: int = 0) -> int:
+    """Write frame row by row starting at first_row; returns the next free row."""
+    import pandas as pd
+
+    na, nat = pd.NA, pd.NaT
+    row = first_row
+    for start in range(0, len(frame), XLSX_BATCH_ROWS):
+        for values in frame.iloc[start:start + XLSX_BATCH_ROWS].itertuples(index=False, name=None):
+            for col, value in enumerate(values):
+                value = _cell(value, na, nat)
+                if value is not None:
+                    worksheet.write(row, col, value)
+            row += 1
+    return row
+
+
+def xlsx_bytes(frame: pd.DataFrame, sheet_name: str = "Cost Breakdown") -> bytes:
+    import pandas as pd
+
+    buffer = io.BytesIO()
+    if len(frame) <= STREAMING_XLSX_ROWS:
+        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+            frame.to_excel(writer, index=False, sheet_name=sheet_name)
+        return buffer.getvalue()
+
+    if len(frame) >= XLSX_MAX_ROWS:
+        raise ValueError(f"XLSX exports are limited to {XLSX_MAX_ROWS - 1:,} rows; use CSV or Parquet instead.")
+
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(buffer, {"constant_memory": True})
+    worksheet = workbook.add_worksheet(sheet_name)
+    bold = workbook.add_format({"bold": True})
+    for col, name in enumerate(frame.columns):
+        worksheet.write(0, col, str(name), bold)
+    write_xlsx_rows(worksheet, frame, first_row=1)
+    workbook.close()
+    return buffer.getvalue()
+
+
+def export_bytes(frame: Frame, export_format: str, sheet_name: str = "Cost Breakdown") -> bytes:
+    """
+    frame (or a callable returning it, built only now) serialised as
+    export_format: "XLSX", "CSV" or "Parquet".
+    """
+    if callable(frame):
+        with stage("dataframe_build"):
+            frame = frame()
+    with stage("workbook_serialisation"):
+        if export_format == "CSV":
+            return frame.to_csv(index=False).encode("utf-8")
+        if export_format == "Parquet":
+            buffer = io.BytesIO()
+            frame.to_parquet(buffer, index=False)
+            return buffer.getvalue()
+        if export_format == "XLSX":
+            return xlsx_bytes(frame, sheet_name)
+    raise ValueError(f"Unknown export format {export_format!r} (expected one of: {', '.join(EXPORT_FORMATS)}).")
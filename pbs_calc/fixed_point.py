@@ -0,0 +1,452 @@
+# pbs_calc/fixed_point.py
+"""
+Integer fixed-point arithmetic backend for the Section 85 and Section 100 EFC
+calculators.
+
+Money is held as Python ints of 1e-8 dollars (1e-6 cents). Products and
+quotients are computed exactly from integer ratios and rounded half-up only
+where the Decimal calculators round (cents) or would lose precision (1e-8), so
+results agree with the Decimal backend to the cent. Every calculator of
+pbs_calc.section85 and pbs_calc.section100_efc has a counterpart here with the
+same name and signature; results come back as Decimals.
+
+PBS_ARITHMETIC=fixed (pbs_calc.backends) selects this module for the app's
+cached Section 85 solve (streamlit_cache) and for sweep only; bench and
+check-backends run it alongside Decimal. The rest of the app and the batch
+engines never use it. Timings against Decimal vary by calculator and input;
+check-backends measures them.
+
+A quotient rounded to 1e-8 can settle a half-cent tie differently from the
+Decimal calculators, whose 28-digit quotients round on their own terms. The
+inverse solvers therefore return the 28-digit quotient itself, and a breakdown
+with a rounded quotient and a result within a few units of a half cent is
+handed to the Decimal calculator.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+
+from pbs_calc import section85, section100_efc
+from pbs_calc.precision import pricing_context
+from pbs_calc.schedule import active_schedule
+
+# Fixed-point units per dollar
+SCALE = 10 ** 8
+CENT = SCALE // 100
+
+# Units a result may sit from a half cent before a rounded quotient could have
+# moved it across (1e-8 rounding plus what the later stages add)
+TIE_SLACK = 2
+
+ZERO = Decimal("0.00")
+
+# ==============================
+# Conversions & rounding
+# ==============================
+
+
+def div_half_up(numerator: int, denominator: int) -> int:
+    """numerator / denominator rounded half away from zero (Decimal ROUND_HALF_UP)."""
+    if numerator >= 0 and denominator > 0:
+        return (2 * numerator + denominator) // (2 * denominator)
+    negative = (numerator < 0) != (denominator < 0)
+    numerator, denominator = abs(numerator), abs(denominator)
+    result = (2 * numerator + denominator) // (2 * denominator)
+    return -result if negative else result
+
+
+def to_units(value) -> int:
+    """Any numeric input (Decimal, str, int, float) as fixed-point units."""
+    if type(value) is int:
+        return value * SCALE
+    if type(value) is float and abs(value) < 1e7:
+        return round(value * SCALE)  # exact for inputs with up to 8 decimals
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    numerator, denominator = value.as_integer_ratio()
+    units, remainder = divmod(numerator * SCALE, denominator)
+    return units if not remainder else div_half_up(numerator * SCALE, denominator)
+
+
+def from_units(units: int) -> Decimal:
+    return Decimal(units).scaleb(-8)
+
+
+def ratio(value) -> tuple:
+    """Exact (numerator, denominator) of a quantity or rate."""
+    if type(value) is int:
+        return value, 1
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.as_integer_ratio()
+
+
+def round_cents(units: int) -> int:
+    return div_half_up(units, CENT) * CENT
+
+
+def near_half_cent(*units: int, slack: int = TIE_SLACK) -> bool:
+    """Whether any of the amounts is within slack units of a half cent."""
+    return any(abs(amount % CENT - CENT // 2) <= slack for amount in units)
+
+
+class Rules:
+    """A fee schedule converted once to fixed-point units and exact rate ratios."""
+
+    __slots__ = (
+        "dispensing_fee", "dangerous_fee", "ahi_base", "ahi_tier1_cap", "ahi_tier2_cap", "ahi_max_fee",
+        "ahi_rate", "wholesale_fixed_fee", "wholesale_aemp_threshold", "wholesale_tier2_cap",
+        "wholesale_markup_rate", "wholesale_flat_fee", "tier1_dpmq_cap", "tier2_dpmq_cap", "efc_ahi_public",
+        "efc_ahi_private", "efc_private_markup_rate", "efc_private_markup_multiplier", "segments",
+        "schedule",
+    )
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+        for name in ("dispensing_fee", "dangerous_fee", "ahi_base", "ahi_tier1_cap", "ahi_tier2_cap",
+                     "ahi_max_fee", "wholesale_fixed_fee", "wholesale_aemp_threshold", "wholesale_tier2_cap",
+                     "wholesale_flat_fee", "tier1_dpmq_cap", "tier2_dpmq_cap", "efc_ahi_public",
+                     "efc_ahi_private"):
+            setattr(self, name, to_units(getattr(schedule, name)))
+        for name in ("ahi_rate", "wholesale_markup_rate", "efc_private_markup_rate",
+                     "efc_private_markup_multiplier"):
+            setattr(self, name, getattr(schedule, name).as_integer_ratio())
+        self.segments = tuple(_segment(*segment) for segment in schedule.inverse_segments)
+
+
+def _segment(low, high, slope, intercept) -> tuple:
+    """
+    Inverse segment in fixed-point: (low, start, end, slope numerator, slope
+    denominator, intercept). start / end are the DPMQ-less-dispensing targets
+    at the segment's ends, scaled by the slope denominator so comparisons stay exact.
+    """
+    slope_num, slope_den = slope.as_integer_ratio()
+    low = None if low is None else to_units(low)
+    high = None if high is None else to_units(high)
+    intercept = to_units(intercept)
+    start = None if low is None else low * slope_num + intercept * slope_den
+    end = None if high is None else high * slope_num + intercept * slope_den
+    return low, start, end, slope_num, slope_den, intercept
+
+
+# Compiled rules by schedule version (a handful of dated schedules at most)
+_RULES = {}
+
+
+def rules() -> Rules:
+    """Fixed-point rules for the active fee schedule, converted on first use."""
+    schedule = active_schedule()
+    compiled = _RULES.get(schedule.version)
+    if compiled is None:
+        compiled = _RULES[schedule.version] = Rules(schedule)
+    return compiled
+
+
+# ==============================
+# Section 85 – integer kernels
+# ==============================
+
+
+def _wholesale_markup(r: Rules, aemp_max_qty: int, rounded: bool) -> int:
+    if aemp_max_qty <= r.wholesale_aemp_threshold:
+        return r.wholesale_fixed_fee
+    if aemp_max_qty <= r.wholesale_tier2_cap:
+        numerator, denominator = r.wholesale_markup_rate
+        if rounded:
+            return div_half_up(aemp_max_qty * numerator, denominator * CENT) * CENT
+        return div_half_up(aemp_max_qty * numerator, denominator)
+    return r.wholesale_flat_fee
+
+
+def _ahi_fee(r: Rules, price_to_pharmacist: int) -> int:
+    if price_to_pharmacist < r.ahi_tier1_cap:
+        return r.ahi_base
+    if price_to_pharmacist <= r.ahi_tier2_cap:
+        numerator, denominator = r.ahi_rate
+        return r.ahi_base + div_half_up((price_to_pharmacist - r.ahi_tier1_cap) * numerator, denominator)
+    return r.ahi_max_fee
+
+
+def _inverse_aemp_max(r: Rules, dpmq: int, dispensing_fee: int) -> tuple:
+    """
+    AEMP(max) in units, and the exact (numerator, denominator) of a segment
+    solve that had to be rounded to get there (None when it is exact).
+    """
+    if dpmq <= r.tier1_dpmq_cap:
+        return round_cents(dpmq - dispensing_fee - r.ahi_base - r.wholesale_fixed_fee), None
+
+    target = dpmq - dispensing_fee
+    for low, start, end, slope_num, slope_den, intercept in r.segments:
+        scaled = target * slope_den
+        if start is not None and scaled <= start:
+            return low, None  # fell into the gap before this segment: snap to the breakpoint
+        if end is None or scaled <= end:
+            numerator = (target - intercept) * slope_den
+            units, remainder = divmod(numerator, slope_num)
+            if not remainder:
+                return units, None
+            return div_half_up(numerator, slope_num), (numerator, slope_num)
+    return 0, None
+
+
+def _solved_aemp(r: Rules, dpmq: int, dispensing_fee: int) -> Decimal:
+    """_inverse_aemp_max as a Decimal; a rounded solve gives the Decimal solver's own 28-digit quotient."""
+    units, quotient = _inverse_aemp_max(r, dpmq, dispensing_fee)
+    if quotient is None:
+        return from_units(units)
+    numerator, denominator = quotient
+    return Decimal(numerator) / Decimal(denominator * SCALE)
+
+
+def _scale_exact(units: int, multiplier, divisor) -> tuple:
+    """units * multiplier / divisor to 1e-8, and whether no rounding was needed."""
+    mul_num, mul_den = ratio(multiplier)
+    div_num, div_den = ratio(divisor)
+    numerator, denominator = units * mul_num * div_den, mul_den * div_num
+    return div_half_up(numerator, denominator), numerator % denominator == 0
+
+
+def _scale(units: int, multiplier, divisor, step: int = 1) -> int:
+    """
+    units * multiplier / divisor for (possibly fractional) quantities, rounded
+    once to a multiple of step units (1e-8 by default, CENT for cents).
+    """
+    mul_num, mul_den = ratio(multiplier)
+    div_num, div_den = ratio(divisor)
+    return div_half_up(units * mul_num * div_den, mul_den * div_num * step) * step
+
+
+# ==============================
+# Section 85 – public calculators (same signatures as pbs_calc.section85)
+# ==============================
+
+
+@pricing_context
+def calculate_aemp_max_qty(input_price, pricing_qty, max_qty):
+    if pricing_qty == 0:
+        return ZERO
+    return from_units(_scale(to_units(input_price), max_qty, pricing_qty))
+
+
+@pricing_context
+def calculate_wholesale_markup(aemp_max_qty):
+    return from_units(_wholesale_markup(rules(), to_units(aemp_max_qty), rounded=True))
+
+
+@pricing_context
+def calculate_inverse_wholesale_markup(aemp_max_qty):
+    return from_units(_wholesale_markup(rules(), to_units(aemp_max_qty), rounded=False))
+
+
+@pricing_context
+def calculate_ahi_fee(price_to_pharmacist):
+    return from_units(_ahi_fee(rules(), to_units(price_to_pharmacist)))
+
+
+calculate_inverse_ahi_fee = calculate_ahi_fee
+
+
+@pricing_context
+def calculate_price_to_pharmacist(aemp_max_qty, wholesale_markup):
+    return from_units(to_units(aemp_max_qty) + to_units(wholesale_markup))
+
+
+@pricing_context
+def calculate_dpmq(price_to_pharmacist, ahi_fee, include_dangerous=False):
+    r = rules()
+    dangerous_fee = r.dangerous_fee if include_dangerous else 0
+    return from_units(to_units(price_to_pharmacist) + to_units(ahi_fee) + r.dispensing_fee + dangerous_fee)
+
+
+@pricing_context
+def calculate_inverse_dpmq(price_to_pharmacist, ahi_fee, dispensing_fee, include_dangerous=False):
+    dangerous_fee = rules().dangerous_fee if include_dangerous else 0
+    total = to_units(price_to_pharmacist) + to_units(ahi_fee) + to_units(dispensing_fee) + dangerous_fee
+    return from_units(round_cents(total))
+
+
+def get_wholesale_tier(dpmq):
+    dpmq = to_units(dpmq)
+    r = rules()
+    if dpmq <= r.tier1_dpmq_cap:
+        return "Tier1"
+    if dpmq <= r.tier2_dpmq_cap:
+        return "Tier2"
+    return "Tier3"
+
+
+def get_inverse_tier_type(dpmq):
+    return get_wholesale_tier(dpmq)
+
+
+@pricing_context
+def precise_inverse_aemp_fixed(dpmq, dispensing_fee):
+    return _solved_aemp(rules(), to_units(dpmq), to_units(dispensing_fee))
+
+
+@pricing_context
+def calculate_inverse_aemp_max(dpmq, dispensing_fee, tier):
+    dpmq, dispensing_fee = to_units(dpmq), to_units(dispensing_fee)
+    r = rules()
+    if tier == "Tier1":
+        return from_units(round_cents(dpmq - dispensing_fee - r.ahi_base - r.wholesale_fixed_fee))
+    if tier in ("Tier2", "Tier3"):
+        return _solved_aemp(r, dpmq, dispensing_fee)
+    return ZERO
+
+
+@pricing_context
+def calculate_unit_aemp(aemp_max_qty, pricing_qty, max_qty):
+    if max_qty == 0:
+        return ZERO
+    return from_units(_scale(to_units(aemp_max_qty), pricing_qty, max_qty, CENT))
+
+
+@pricing_context
+def calculate_section85_forward(input_price, pricing_qty, max_qty, include_dangerous=False):
+    r = rules()
+    aemp_max_qty, exact = (0, True) if pricing_qty == 0 else _scale_exact(to_units(input_price), max_qty, pricing_qty)
+    wholesale_markup = _wholesale_markup(r, aemp_max_qty, rounded=True)
+    price_to_pharmacist = aemp_max_qty + wholesale_markup
+    ahi_fee = _ahi_fee(r, price_to_pharmacist)
+    dangerous_fee = r.dangerous_fee if include_dangerous else 0
+    total = price_to_pharmacist + ahi_fee + r.dispensing_fee + dangerous_fee
+    if not exact and near_half_cent(aemp_max_qty, _wholesale_markup(r, aemp_max_qty, rounded=False),
+                                    price_to_pharmacist, ahi_fee, total):
+        return section85.calculate_section85_forward(input_price, pricing_qty, max_qty, include_dangerous)
+    return {
+        "aemp_max_qty": from_units(aemp_max_qty),
+        "wholesale_markup": from_units(wholesale_markup),
+        "price_to_pharmacist": from_units(price_to_pharmacist),
+        "ahi_fee": from_units(ahi_fee),
+        "dispensing_fee": r.schedule.dispensing_fee,
+        "dangerous_fee": r.schedule.dangerous_fee if include_dangerous else ZERO,
+        "final_price": from_units(total),
+    }
+
+
+@pricing_context
+def calculate_section85_inverse(dpmq, pricing_qty, max_qty, include_dangerous=False):
+    r = rules()
+    dangerous_fee = r.dangerous_fee if include_dangerous else 0
+
+    # Tier is classified on the published DPMQ; Tier1 there implies Tier1 after the fee
+    aemp_max_qty, quotient = _inverse_aemp_max(r, to_units(dpmq) - dangerous_fee, r.dispensing_fee)
+    wholesale_markup = _wholesale_markup(r, aemp_max_qty, rounded=False)
+    price_to_pharmacist = aemp_max_qty + wholesale_markup
+    ahi_fee = _ahi_fee(r, price_to_pharmacist)
+    total = price_to_pharmacist + ahi_fee + r.dispensing_fee + dangerous_fee
+    unrounded_unit_aemp = 0 if max_qty == 0 else _scale(aemp_max_qty, pricing_qty, max_qty)
+    if quotient is not None and (
+            near_half_cent(aemp_max_qty, wholesale_markup, price_to_pharmacist, ahi_fee, total)
+            or near_half_cent(unrounded_unit_aemp, slack=TIE_SLACK + _scale(1, pricing_qty, max_qty))):
+        return section85.calculate_section85_inverse(dpmq, pricing_qty, max_qty, include_dangerous)
+    unit_aemp = 0 if max_qty == 0 else _scale(aemp_max_qty, pricing_qty, max_qty, CENT)
+    return {
+        "aemp_max_qty": from_units(aemp_max_qty),
+        "unit_aemp": from_units(unit_aemp),
+        "wholesale_markup": from_units(wholesale_markup),
+        "price_to_pharmacist": from_units(price_to_pharmacist),
+        "ahi_fee": from_units(ahi_fee),
+        "dispensing_fee": r.schedule.dispensing_fee,
+        "dangerous_fee": r.schedule.dangerous_fee if include_dangerous else ZERO,
+        "final_price": from_units(total),
+    }
+
+
+# ==============================
+# Section 100 EFC – public calculators (same signatures as pbs_calc.section100_efc)
+# ==============================
+
+
+def _vials(max_amount, vial_content, consider_wastage: bool) -> tuple:
+    """Vials needed as an exact (numerator, denominator) ratio."""
+    max_num, max_den = ratio(max_amount)
+    vial_num, vial_den = ratio(vial_content)
+    numerator, denominator = max_num * vial_den, max_den * vial_num
+    if consider_wastage:
+        return -(-numerator // denominator), 1
+    return numerator, denominator
+
+
+def _efc_ahi_fee(r: Rules, hospital_setting: str) -> int:
+    return r.efc_ahi_public if hospital_setting == "Public" else r.efc_ahi_private
+
+
+def _decimal(value) -> Decimal:
+    """Inputs echoed back in results, converted like the Decimal backend does."""
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+@pricing_context
+def calculate_efc_forward(input_price, pricing_qty, vial_content, max_amount,
+                          consider_wastage: bool, hospital_setting: str) -> dict:
+    aemp_unit = to_units(input_price)
+    vials_num, vials_den = _vials(max_amount, vial_content, consider_wastage)
+    qty_num, qty_den = ratio(pricing_qty)
+    numerator, denominator = aemp_unit * vials_num * qty_den, vials_den * qty_num
+    aemp_max = div_half_up(numerator, denominator)
+    exact = numerator % denominator == 0
+
+    r = rules()
+    if hospital_setting == "Private":
+        rate_num, rate_den = r.efc_private_markup_rate
+        wholesale_markup = div_half_up(aemp_max * rate_num, rate_den)
+        exact = exact and aemp_max * rate_num % rate_den == 0
+        ahi_fee = r.efc_ahi_private
+    else:
+        wholesale_markup = 0
+        ahi_fee = r.efc_ahi_public
+
+    ptp = aemp_max + wholesale_markup
+    if not exact and near_half_cent(aemp_max, wholesale_markup, ptp, ptp + ahi_fee):
+        return section100_efc.calculate_efc_forward(input_price, pricing_qty, vial_content, max_amount,
+                                                    consider_wastage, hospital_setting)
+    return {
+        "aemp_max_qty": from_units(aemp_max),
+        "unit_aemp": _decimal(input_price),
+        "wholesale_markup": from_units(wholesale_markup),
+        "price_to_pharmacist": from_units(ptp),
+        "ahi_fee": from_units(ahi_fee),
+        "final_price": from_units(ptp + ahi_fee),
+    }
+
+
+@pricing_context
+def calculate_efc_inverse(input_price, pricing_qty, vial_content, max_amount,
+                          consider_wastage: bool, hospital_setting: str) -> dict:
+    r = rules()
+    dpma = to_units(input_price)
+    ahi_fee = _efc_ahi_fee(r, hospital_setting)
+    subtotal = dpma - ahi_fee
+
+    exact = True
+    if hospital_setting == "Private":
+        mult_num, mult_den = r.efc_private_markup_multiplier
+        price_to_pharmacist = div_half_up(subtotal * mult_den, mult_num)
+        exact = subtotal * mult_den % mult_num == 0
+        markup = subtotal - price_to_pharmacist
+    else:
+        price_to_pharmacist = subtotal
+        markup = 0
+
+    vials_num, vials_den = _vials(max_amount, vial_content, consider_wastage)
+    if vials_num == 0:
+        aemp_max_qty = 0
+    else:
+        qty_num, qty_den = ratio(pricing_qty)
+        numerator, denominator = price_to_pharmacist * qty_num * vials_den, qty_den * vials_num
+        aemp_max_qty = div_half_up(numerator, denominator)
+        exact = exact and numerator % denominator == 0
+
+    if not exact and near_half_cent(aemp_max_qty, markup, price_to_pharmacist):
+        return section100_efc.calculate_efc_inverse(input_price, pricing_qty, vial_content, max_amount,
+                                                    consider_wastage, hospital_setting)
+    return {
+        "aemp_max_qty": from_units(aemp_max_qty),
+        "wholesale_markup": from_units(markup),
+        "price_to_pharmacist": from_units(price_to_pharmacist),
+        "ahi_fee": from_units(ahi_fee),
+        "final_price": _decimal(input_price),
+    }
@@ -0,0 +1,256 @@
+# pbs_calc/impact.py
+"""
+Fee-schedule impact: how every item of a catalogue moves from one schedule to another.
+
+    python -m pbs_calc impact catalogue.csv impact.csv --old 2024-07-01 --new 2025-07-01
+
+The catalogue (the reprice input columns plus item_code) is priced under both
+schedules with the vectorised batch engine, and the two sides are joined on
+item_code. Each item gets its wholesale markup, PtP, AHI fee and DPMQ under
+either schedule and the change in each. Section 85 items also get their
+wholesale and AHI tier under either schedule, and the tier boundaries they
+cross. A second catalogue may be given for the new side; items only in one of
+them are listed as "added" or "delisted". Items that cannot be priced under
+a schedule they are in (invalid inputs, or a DPMQ that does not reverse) are
+listed as "failed", with no prices or changes, and left out of the totals.
+
+The AEMP is what stays fixed across a schedule change. Known DPMQs are first
+reversed to a unit AEMP (to the cent) under the schedule the catalogue was
+published with. Where several AEMPs share a published DPMQ, the repriced old
+DPMQ can differ from it by a cent, so prefer an AEMP catalogue when one exists.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from pbs_calc.batch import (
+    efc_forward_batch, efc_inverse_batch, round_half_up, section85_forward_batch, section85_inverse_batch,
+)
+from pbs_calc.diagnostics import count, stage
+from pbs_calc.reprice import (
+    SECTION_85, ChunkWriter, flag_values, missing_columns, pricing_columns, read_chunks, setting_values,
+)
+from pbs_calc.schedule import DateLike, FeeSchedule, schedule_for, using_schedule
+
+ITEM_CODE = "item_code"
+
+# Components compared between the schedules, in breakdown order
+MEASURES = ("wholesale_markup", "price_to_pharmacist", "ahi_fee", "dpmq")
+
+# Section 85 tier columns: (column, name used in tier_change)
+TIERS = (("wholesale_tier", "Wholesale"), ("ahi_tier", "AHI"))
+
+ScheduleLike = Union[FeeSchedule, DateLike]
+
+# ==============================
+# Pricing one side
+# ==============================
+
+
+def _schedule(effective: ScheduleLike) -> FeeSchedule:
+    return effective if isinstance(effective, FeeSchedule) else schedule_for(effective)
+
+
+def _item_codes(items: pd.DataFrame) -> pd.Index:
+    codes = pd.Index(items[ITEM_CODE].astype(str).str.strip(), name=ITEM_CODE)
+    duplicated = codes[codes.duplicated()].unique()
+    if len(duplicated):
+        raise ValueError(f"Duplicate item code(s): {', '.join(duplicated[:10])}")
+    return codes
+
+
+def _efc_args(items: pd.DataFrame) -> tuple:
+    return (items["pricing_qty"], items["vial_content"], items["max_amount"],
+            flag_values(items, "wastage", False), setting_values(items))
+
+
+def unit_aemps(items: pd.DataFrame, selected_section: str, price_type: str, schedule: FeeSchedule) -> np.ndarray:
+    """
+    Unit AEMP per item: the price column itself for "AEMP", else the DPMQ
+    reversed under schedule (the one the DPMQs were published with). NaN for
+    items whose DPMQ fails to reverse: invalid inputs, or (Section 85) an
+    AEMP that does not reprice to the published DPMQ within the tolerance.
+    """
+    if price_type != "DPMQ":
+        return pd.to_numeric(items["price"], errors="coerce").to_numpy(dtype=np.float64)
+    with using_schedule(schedule), stage("impact_inverse"):
+        if selected_section == SECTION_85:
+            reversed_ = section85_inverse_batch(items["price"], items["pricing_qty"], items["max_qty"],
+                                                flag_values(items, "dangerous", False))
+            return np.where(reversed_["precision_ok"], reversed_["unit_aemp"], np.nan)
+        # The EFC inverse scales PtP back by pricing_qty / vials, which is the price per pricing unit
+        return efc_inverse_batch(items["price"], *_efc_args(items))["aemp_max_qty"]
+
+
+def price_side(items: pd.DataFrame, unit_aemp, selected_section: str, schedule: FeeSchedule) -> pd.DataFrame:
+    """
+    Forward-price items from their unit AEMP under schedule, indexed by item
+    code. Items that cannot be priced (a NaN unit AEMP included) are NaN.
+    """
+    with using_schedule(schedule), stage("impact_pricing"):
+        if selected_section == SECTION_85:
+            priced = section85_forward_batch(unit_aemp, items["pricing_qty"], items["max_qty"],
+                                             flag_values(items, "dangerous", False), tiers=True)
+        else:
+            priced = efc_forward_batch(unit_aemp, *_efc_args(items))
+            priced["dpmq"] = priced.pop("dpma")
+    columns = ["unit_aemp", *MEASURES]
+    if selected_section == SECTION_85:
+        columns += [column for column, _ in TIERS]
+    priced["unit_aemp"] = round_half_up(unit_aemp)
+    return pd.DataFrame({column: priced[column] for column in columns}, index=_item_codes(items))
+
+
+# ==============================
+# Comparison
+# ==============================
+
+
+def _tier_changes(impact: pd.DataFrame) -> np.ndarray:
+    """"Wholesale Tier2 → Tier3; AHI Tier2 → Tier3" per item, "" where no tier changed."""
+    changes = np.full(len(impact), "", dtype=object)
+    for column, name in TIERS:
+        old = impact[f"{column}_old"].to_numpy(dtype=object)
+        new = impact[f"{column}_new"].to_numpy(dtype=object)
+        moved = pd.notna(old) & pd.notna(new) & (old != new)
+        described = name + " " + old[moved] + " → " + new[moved]
+        changes[moved] = np.where(changes[moved] == "", described, changes[moved] + "; " + described)
+    return changes
+
+
+def schedule_impact(
+    items: pd.DataFrame,
+    old: ScheduleLike,
+    new: ScheduleLike = None,
+    selected_section: str = SECTION_85,
+    price_type: str = "AEMP",
+    new_items: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """
+    Per-item comparison of items priced under the old and the new schedule
+    (FeeSchedules or effective dates; new defaults to today's).
+
+    items carry item_code and the reprice input columns (normalised names);
+    price_type is the known price, "AEMP" or "DPMQ". With new_items, the new
+    schedule prices that catalogue instead and the two are joined on item
+    code. Otherwise the same items are priced under both. Each measure in
+    MEASURES gets <measure>_old, <measure>_new and <measure>_change columns.
+    dpmq_change_pct, listing ("listed", "added", "delisted") and, for Section
+    85, the tiers under each schedule and tier_change follow. Items that fail
+    to price under a schedule they are in are listed as "failed", with NaN
+    in every price and change column and no tier_change.
+    """
+    old, new = _schedule(old), _schedule(new)
+    for catalogue in (items, new_items):
+        if catalogue is not None:
+            missing = missing_columns(catalogue, selected_section) + [ITEM_CODE] * (ITEM_CODE not in catalogue)
+            if missing:
+                raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+    old_aemp = unit_aemps(items, selected_section, price_type, old)
+    before = price_side(items, old_aemp, selected_section, old)
+    if new_items is None:
+        after = price_side(items, old_aemp, selected_section, new)
+    else:
+        after = price_side(new_items, unit_aemps(new_items, selected_section, price_type, new), selected_section, new)
+
+    with stage("impact_join"):
+        # Old catalogue order, then items only in the new one (an outer join would sort the codes)
+        if new_items is None:
+            codes, in_old, in_new = before.index, True, True
+        else:
+            added = before.index.get_indexer(after.index) < 0
+            codes = before.index.append(after.index[added])
+            in_old = np.arange(len(codes)) < len(before)
+            in_new = np.concatenate([after.index.get_indexer(before.index) >= 0, np.ones(added.sum(), dtype=bool)])
+        impact = pd.concat([before.reindex(codes).add_suffix("_old"), after.reindex(codes).add_suffix("_new")], axis=1)
+        failed = (in_old & impact["dpmq_old"].isna().to_numpy()) | (in_new & impact["dpmq_new"].isna().to_numpy())
+        listing = np.where(failed, "failed",
+                           np.where(in_old & in_new, "listed", np.where(in_new, "added", "delisted")))
+        if failed.any():
+            impact.loc[failed, [f"{measure}_{side}" for measure in MEASURES for side in ("old", "new")]] = np.nan
+        columns = {ITEM_CODE: impact.index, "listing": listing,
+                   "unit_aemp_old": impact["unit_aemp_old"], "unit_aemp_new": impact["unit_aemp_new"]}
+        for measure in MEASURES:
+            columns[f"{measure}_old"] = impact[f"{measure}_old"]
+            columns[f"{measure}_new"] = impact[f"{measure}_new"]
+            columns[f"{measure}_change"] = round_half_up(impact[f"{measure}_new"] - impact[f"{measure}_old"])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            columns["dpmq_change_pct"] = np.round(columns["dpmq_change"] / impact["dpmq_old"] * 100, 2)
+        if selected_section == SECTION_85:
+            for column, _ in TIERS:
+                columns[f"{column}_old"] = impact[f"{column}_old"]
+                columns[f"{column}_new"] = impact[f"{column}_new"]
+            columns["tier_change"] = np.where(failed, "", _tier_changes(impact))
+        result = pd.DataFrame(columns).reset_index(drop=True)
+    count("impact_items", len(result))
+    count("impact_failed", int(failed.sum()))
+    return result
+
+
+def impact_totals(impact: pd.DataFrame) -> dict:
+    """
+    Aggregates of a schedule_impact result: item counts by listing, and over
+    items listed (and priced) under both schedules the summed components, how
+    many DPMQs rose or fell, and the items per tier change.
+    """
+    listed = impact[impact["listing"] == "listed"]
+    change = listed["dpmq_change"]
+    totals = {
+        "items": len(impact),
+        **{status: int((impact["listing"] == status).sum()) for status in ("listed", "added", "delisted", "failed")},
+    }
+    for measure in MEASURES:
+        for side in ("old", "new", "change"):
+            totals[f"{measure}_{side}"] = round(float(listed[f"{measure}_{side}"].sum()), 2)
+    totals.update({
+        "dpmq_up": int((change > 0).sum()),
+        "dpmq_down": int((change < 0).sum()),
+        "dpmq_unchanged": int((change == 0).sum()),
+        "dpmq_change_mean": round(float(change.mean()), 4) if len(change) else 0.0,
+        "dpmq_change_max": round(float(change.max()), 2) if len(change) else 0.0,
+        "dpmq_change_min": round(float(change.min()), 2) if len(change) else 0.0,
+    })
+    if "tier_change" in impact:
+        moved = listed.loc[listed["tier_change"] != "", "tier_change"]
+        totals["tier_migrations"] = int(len(moved))
+        # One count per boundary crossed, so an item crossing both is counted under each
+        totals["tier_changes"] = moved.str.split("; ").explode().value_counts().to_dict()
+    return totals
+
+
+# ==============================
+# Files
+# ==============================
+
+
+def read_catalogue(path: str, selected_section: Optional[str] = None) -> pd.DataFrame:
+    """
+    A whole catalogue file (CSV, Parquet, Arrow IPC or XLSX) with normalised
+    column names; with selected_section, only item_code and its pricing columns.
+    """
+    columns = None if selected_section is None else [ITEM_CODE, *pricing_columns(selected_section)]
+    return pd.concat(read_chunks(path, 1_000_000, columns), ignore_index=True)
+
+
+def impact_file(
+    input_path: str,
+    output_path: str,
+    old: ScheduleLike,
+    new: ScheduleLike = None,
+    selected_section: str = SECTION_85,
+    price_type: str = "AEMP",
+    new_input_path: Optional[str] = None,
+) -> dict:
+    """schedule_impact of a catalogue file, written to output_path; returns impact_totals."""
+    old, new = _schedule(old), _schedule(new)  # bad dates fail before any file is read
+    items = read_catalogue(input_path, selected_section)
+    new_items = read_catalogue(new_input_path, selected_section) if new_input_path else None
+    impact = schedule_impact(items, old, new, selected_section, price_type, new_items)
+    with ChunkWriter(output_path) as writer:
+        writer.write(impact)
+    return impact_totals(impact)
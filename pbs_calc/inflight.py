@@ -0,0 +1,78 @@
+# pbs_calc/inflight.py
+"""
+Shared worker pool with in-flight request coalescing.
+
+    solver = InFlight(max_workers=4)
+    future = solver.submit(key, calculate_section85_inverse, dpmq, pricing_qty, max_qty, dangerous)
+    result = future.result()
+
+The first caller for a key starts the computation on the pool. Callers that
+ask for the same key while it is still running get the same Future, so they
+wait on one computation instead of repeating it. Once it finishes the key is
+forgotten; results are not cached here (pbs_calc.cache and the Streamlit
+caches do that).
+
+Each job runs in a copy of the submitting thread's contextvars, so the fee
+schedule selected with using_schedule() is the caller's, and in the caller's
+diagnostics collector, if any.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Hashable, Optional
+
+from pbs_calc.diagnostics import active, collecting, count
+
+DEFAULT_WORKERS = 4
+
+
+def solver_workers() -> int:
+    """PBS_SOLVER_WORKERS, or DEFAULT_WORKERS."""
+    return max(1, int(os.environ.get("PBS_SOLVER_WORKERS", DEFAULT_WORKERS)))
+
+
+def _run(collector, func: Callable, args: tuple):
+    if collector is None:
+        return func(*args)
+    with collecting(collector):
+        return func(*args)
+
+
+class InFlight:
+    """Thread pool that runs at most one job per key at a time."""
+
+    def __init__(self, max_workers: Optional[int] = None, thread_name_prefix: str = "pbs-solver"):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or solver_workers(),
+                                        thread_name_prefix=thread_name_prefix)
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, func: Callable, *args) -> Future:
+        """Future for func(*args); joins the running job if key is already in flight."""
+        with self._lock:
+            future = self._running.get(key)
+            if future is not None:
+                count("inflight.joined")
+                return future
+            context = contextvars.copy_context()
+            future = self._pool.submit(context.run, _run, active(), func, args)
+            self._running[key] = future
+        count("inflight.started")
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._running.get(key) is future:
+                del self._running[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._running)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,198 @@
+# pbs_calc/lookup.py
+"""
+Precomputed Section 85 DPMQ -> AEMP(max) table, memory-mapped for O(1) reads.
+
+One int8 entry per cent of effective DPMQ (DPMQ minus any dangerous drug fee)
+from the dispensing fee + AHI base up to a configurable ceiling, so the same table
+serves both dangerous-fee settings. Each entry is the branch of the closed-form
+inverse for that cent (Tier 1, solve on a segment, or snap to a breakpoint; see
+pbs_calc.segments), taken from the exact Decimal segment bounds; a read
+evaluates that branch in Decimal, so table and solver agree to the last digit.
+
+Each fee schedule gets its own table, built on first use while that schedule
+is active; the header records the schedule version, and a table built from
+other constants (or in an older format) is rebuilt automatically. Tables of
+schedules no longer in the registry are removed. NumPy is only imported when a
+table is first needed.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+import threading
+from decimal import ROUND_FLOOR, Decimal
+from typing import Optional
+
+from pbs_calc.precision import pricing_context
+from pbs_calc.schedule import SCHEDULES, active_schedule, current_schedule
+from pbs_calc.segments import branch_aemp, branch_bounds
+
+# Stored in the header; bump when the entry layout changes so old tables are rebuilt
+TABLE_FORMAT = 2
+
+# Highest DPMQ covered unless PBS_LOOKUP_CEILING says otherwise
+DEFAULT_CEILING = Decimal("10000.00")
+
+# int64 header, stored as the first HEADER_BYTES bytes of the int8 table:
+# start cents, stop cents (inclusive), table format, schedule version
+HEADER_SIZE = 4
+HEADER_BYTES = HEADER_SIZE * 8
+
+# Set PBS_LOOKUP_TABLE=0 to always solve directly (read once, at import)
+LOOKUP_ENABLED = os.environ.get("PBS_LOOKUP_TABLE", "1") != "0"
+
+# schedule version -> (start, stop, data)
+_tables = {}
+_table_lock = threading.Lock()
+_disabled = False
+
+
+# ==============================
+# Configuration
+# ==============================
+
+def lookup_dir() -> str:
+    """Directory holding built tables (PBS_CALC_CACHE_DIR, else .pbs_cache in the repo)."""
+    default = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".pbs_cache")
+    return os.environ.get("PBS_CALC_CACHE_DIR", default)
+
+
+def lookup_enabled() -> bool:
+    return LOOKUP_ENABLED and not _disabled
+
+
+def lookup_ceiling() -> Decimal:
+    return Decimal(os.environ.get("PBS_LOOKUP_CEILING", str(DEFAULT_CEILING)))
+
+
+def table_path(version: Optional[str] = None) -> str:
+    return os.path.join(lookup_dir(), f"section85_inverse_{version or current_schedule().version}.npy")
+
+
+def _cents(amount: Decimal) -> int:
+    return int(amount * 100)
+
+
+# ==============================
+# Build
+# ==============================
+
+@pricing_context
+def inverse_branch_codes(schedule, start: int, stop: int):
+    """
+    Branch code (pbs_calc.segments.inverse_branch) of every cent from start
+    to stop inclusive, at the schedule's dispensing fee, as an int8 array.
+    """
+    import numpy as np
+
+    cents = np.arange(start, stop + 1, dtype=np.int64)
+    bounds = branch_bounds(schedule, schedule.dispensing_fee)
+    codes = np.full(cents.size, bounds[-1][0], dtype=np.int8)
+    # Earlier tests win, so paint the bounds from last to first
+    for code, bound in reversed(bounds[:-1]):
+        last_cent = int(bound.scaleb(2).to_integral_value(rounding=ROUND_FLOOR))
+        codes[cents <= last_cent] = code
+    return codes
+
+
+def build_inverse_table(ceiling: Optional[Decimal] = None, path: Optional[str] = None, schedule=None) -> str:
+    """
+    Record the inverse branch of every cent of effective DPMQ up to ceiling,
+    for schedule (today's by default), and write the table atomically.
+    Returns the file path.
+    """
+    import numpy as np
+
+    schedule = schedule or current_schedule()
+    version = schedule.version
+    path = path or table_path(version)
+    start = _cents(schedule.minimum_dpmq)
+    stop = _cents(Decimal(ceiling) if ceiling is not None else lookup_ceiling())
+
+    header = np.array([start, stop, TABLE_FORMAT, int(version, 16)], dtype=np.int64)
+    table = np.concatenate([header.view(np.int8), inverse_branch_codes(schedule, start, stop)])
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as handle:
+        np.save(handle, table)
+    os.replace(tmp_path, path)
+
+    # Tables of schedules that left the registry are never read again
+    known = {f"section85_inverse_{known.version}.npy" for known in SCHEDULES}
+    for stale in glob.glob(os.path.join(os.path.dirname(path), "section85_inverse_*.npy")):
+        if os.path.basename(stale) not in known and stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return path
+
+
+# ==============================
+# Load & read
+# ==============================
+
+def _read_header(data) -> tuple:
+    return tuple(int(value) for value in data[:HEADER_BYTES].view("i8"))
+
+
+def load_inverse_table(schedule=None):
+    """
+    Memory-map the table for schedule (the active one by default), building it
+    first if it is missing or was built from different constants. Returns
+    (start, stop, data), or None (and stops trying for this process) if the
+    table cannot be built or read.
+    """
+    global _disabled
+    schedule = schedule or active_schedule()
+    version = schedule.version
+    table = _tables.get(version)
+    if table is not None:
+        return table
+
+    with _table_lock:
+        table = _tables.get(version)
+        if table is not None:
+            return table
+        try:
+            import numpy as np
+
+            path = table_path(version)
+            if not os.path.exists(path):
+                build_inverse_table(path=path, schedule=schedule)
+            data = np.load(path, mmap_mode="r")
+            if data.dtype != np.int8 or _read_header(data)[2:] != (TABLE_FORMAT, int(version, 16)):
+                build_inverse_table(path=path, schedule=schedule)
+                data = np.load(path, mmap_mode="r")
+            start, stop = _read_header(data)[:2]
+        except (OSError, ValueError, ImportError):
+            _disabled = True
+            return None
+        table = _tables[version] = (start, stop, data)
+        return table
+
+
+@pricing_context
+def lookup_inverse_aemp_max(effective_dpmq: Decimal, dispensing_fee: Decimal) -> Optional[Decimal]:
+    """
+    AEMP(max) for a cent-valued effective DPMQ, or None when the table cannot
+    answer (disabled, non-standard dispensing fee, sub-cent or out-of-range
+    DPMQ) and the caller should solve directly.
+    """
+    schedule = active_schedule()
+    if not lookup_enabled() or dispensing_fee != schedule.dispensing_fee:
+        return None
+    cents = effective_dpmq * 100
+    if cents != cents.to_integral_value():
+        return None
+    table = _tables.get(schedule.version) or load_inverse_table(schedule)
+    if table is None:
+        return None
+    start, stop, data = table
+    cents = int(cents)
+    if not start <= cents <= stop:
+        return None
+    code = data.item(HEADER_BYTES + cents - start)
+    return branch_aemp(schedule, code, effective_dpmq, dispensing_fee)
@@ -0,0 +1,224 @@
+# pbs_calc/pipeline.py
+"""
+Incremental single-item pricing: each pricing chain as a small graph of stages.
+
+    pipeline = new_pipeline("Section 85", "DPMQ")
+    pipeline.values(price=900, pricing_qty=30, max_qty=60, dangerous=False, schedule=version)
+    pipeline.values(price=900, pricing_qty=30, max_qty=90, dangerous=False, schedule=version)
+    # second call recomputes only unit_aemp; the AEMP solve and fees are reused
+
+A stage is (name, dependencies, function); dependencies are pipeline inputs
+or earlier stages. value(name) pulls its dependencies first and recomputes
+only when one of them differs from what the stage last saw. A recomputed
+stage that comes out equal to its previous value leaves everything downstream
+untouched. The stages call the same helpers as the full chains in
+pbs_calc.section85 and pbs_calc.section100_efc, so the numbers are the same.
+
+Stages that read fees take the fee-schedule version as a "schedule" input, so
+a schedule change recomputes them and nothing else.
+"""
+
+from __future__ import annotations
+
+import threading
+from decimal import Decimal
+from typing import Callable, NamedTuple, Optional
+
+from pbs_calc import section85, section100_efc
+from pbs_calc.diagnostics import count, stage
+from pbs_calc.precision import pricing_context
+from pbs_calc.schedule import active_schedule
+
+_UNSET = object()
+
+
+@pricing_context
+def _call(func: Callable, args: tuple):
+    return func(*args)
+
+
+class Stage(NamedTuple):
+    name: str
+    depends: tuple
+    func: Callable
+
+
+class Pipeline:
+    """
+    Last inputs and stage values of one pricing chain (e.g. one per Streamlit
+    session), recomputed lazily and only where an input changed.
+    """
+
+    def __init__(self, stages: list, inputs: tuple):
+        self.stages = {entry.name: entry for entry in stages}
+        self.inputs = inputs
+        self._given = {}
+        self._cache = {}  # stage -> (dependency values, value)
+        self._lock = threading.RLock()
+
+    def add(self, entry: Stage) -> "Pipeline":
+        """Append a stage (e.g. the export table built from "breakdown"); returns self."""
+        self.stages[entry.name] = entry
+        return self
+
+    def replace(self, name: str, func: Callable) -> "Pipeline":
+        """Swap the function of one stage (e.g. to solve on a shared pool); returns self."""
+        self.stages[name] = self.stages[name]._replace(func=func)
+        self._cache.pop(name, None)
+        return self
+
+    def set_inputs(self, **inputs) -> None:
+        unknown = set(inputs) - set(self.inputs)
+        if unknown:
+            raise KeyError(f"Unknown pipeline input(s): {', '.join(sorted(unknown))}")
+        with self._lock:
+            self._given.update(inputs)
+
+    def value(self, name: str):
+        """Stage (or input) value, recomputing it and its dependencies only if needed."""
+        with self._lock:
+            return self._pull(name, {})
+
+    def _pull(self, name: str, pulled: dict):
+        if name in pulled:
+            return pulled[name]
+        if name in self.inputs:
+            result = self._given[name]
+        else:
+            entry = self.stages[name]
+            seen = tuple(self._pull(dep, pulled) for dep in entry.depends)
+            cached_seen, result = self._cache.get(name, (_UNSET, None))
+            if cached_seen == seen:
+                count("pipeline.reused")
+            else:
+                count(f"pipeline.recomputed.{name}")
+                with stage(f"pipeline.{name}"):
+                    result = _call(entry.func, seen)
+                self._cache[name] = (seen, result)
+        pulled[name] = result
+        return result
+
+    def values(self, **inputs) -> dict:
+        """Set inputs and return the "breakdown" stage."""
+        self.set_inputs(**inputs)
+        return self.value("breakdown")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+# ==============================
+# Shared fee stages
+# ==============================
+
+def _dispensing_fee(_schedule) -> Decimal:
+    return active_schedule().dispensing_fee
+
+
+def _dangerous_fee(dangerous: bool, _schedule) -> Decimal:
+    return active_schedule().dangerous_fee if dangerous else Decimal("0.00")
+
+
+def _breakdown(*names: str) -> Stage:
+    """Final stage: the components keyed like display_cost_breakdown."""
+    return Stage("breakdown", names, lambda *values: dict(zip(names, values)))
+
+
+# ==============================
+# Section 85
+# ==============================
+
+SECTION85_INPUTS = ("price", "pricing_qty", "max_qty", "dangerous", "schedule")
+
+
+def _section85_forward() -> list:
+    return [
+        Stage("aemp_max_qty", ("price", "pricing_qty", "max_qty"), section85.calculate_aemp_max_qty),
+        Stage("wholesale_markup", ("aemp_max_qty", "schedule"),
+              lambda aemp, _: section85.calculate_wholesale_markup(aemp)),
+        Stage("price_to_pharmacist", ("aemp_max_qty", "wholesale_markup"), section85.calculate_price_to_pharmacist),
+        Stage("ahi_fee", ("price_to_pharmacist", "schedule"), lambda ptp, _: section85.calculate_ahi_fee(ptp)),
+        Stage("dispensing_fee", ("schedule",), _dispensing_fee),
+        Stage("dangerous_fee", ("dangerous", "schedule"), _dangerous_fee),
+        Stage("final_price", ("price_to_pharmacist", "ahi_fee", "dangerous", "schedule"),
+              lambda ptp, ahi, dangerous, _: section85.calculate_dpmq(ptp, ahi, dangerous)),
+        _breakdown("aemp_max_qty", "wholesale_markup", "price_to_pharmacist", "ahi_fee",
+                   "dispensing_fee", "dangerous_fee", "final_price"),
+    ]
+
+
+def solve_section85_aemp_max(dpmq, dangerous_fee: Decimal, _schedule,
+                             solve: Optional[Callable] = None) -> Decimal:
+    """The inverse solve stage: AEMP(max) for the DPMQ less the dangerous drug fee."""
+    effective_dpmq = section85.to_decimal(dpmq) - dangerous_fee
+    tier = section85.get_inverse_tier_type(section85.to_decimal(dpmq))
+    return (solve or section85.calculate_inverse_aemp_max)(effective_dpmq, active_schedule().dispensing_fee, tier)
+
+
+def _section85_inverse() -> list:
+    return [
+        Stage("dangerous_fee", ("dangerous", "schedule"), _dangerous_fee),
+        Stage("dispensing_fee", ("schedule",), _dispensing_fee),
+        Stage("aemp_max_qty", ("price", "dangerous_fee", "schedule"), solve_section85_aemp_max),
+        Stage("wholesale_markup", ("aemp_max_qty", "schedule"),
+              lambda aemp, _: section85.calculate_inverse_wholesale_markup(aemp)),
+        Stage("price_to_pharmacist", ("aemp_max_qty", "wholesale_markup"), section85.calculate_price_to_pharmacist),
+        Stage("ahi_fee", ("price_to_pharmacist", "schedule"), lambda ptp, _: section85.calculate_inverse_ahi_fee(ptp)),
+        Stage("unit_aemp", ("aemp_max_qty", "pricing_qty", "max_qty"), section85.calculate_unit_aemp),
+        Stage("final_price", ("price_to_pharmacist", "ahi_fee", "dispensing_fee", "dangerous_fee"),
+              lambda ptp, ahi, dispensing, dangerous: ptp + ahi + dispensing + dangerous),
+        _breakdown("aemp_max_qty", "unit_aemp", "wholesale_markup", "price_to_pharmacist", "ahi_fee",
+                   "dispensing_fee", "dangerous_fee", "final_price"),
+    ]
+
+
+# ==============================
+# Section 100 EFC
+# ==============================
+
+EFC_INPUTS = ("price", "pricing_qty", "vial_content", "max_amount", "wastage", "setting", "schedule")
+
+
+def _efc_forward() -> list:
+    return [
+        Stage("vials_needed", ("max_amount", "vial_content", "wastage"), section100_efc.calculate_vials_needed),
+        Stage("unit_aemp", ("price",), section100_efc.D),
+        Stage("aemp_max_qty", ("unit_aemp", "vials_needed", "pricing_qty"), section100_efc.calculate_efc_aemp_max),
+        Stage("wholesale_markup", ("aemp_max_qty", "setting", "schedule"),
+              lambda aemp, setting, _: section100_efc.calculate_efc_wholesale_markup(aemp, setting)),
+        Stage("price_to_pharmacist", ("aemp_max_qty", "wholesale_markup"), lambda aemp, markup: aemp + markup),
+        Stage("ahi_fee", ("setting", "schedule"), lambda setting, _: section100_efc.calculate_ahi_fee_fixed(setting)),
+        Stage("final_price", ("price_to_pharmacist", "ahi_fee"), lambda ptp, ahi: ptp + ahi),
+        _breakdown("aemp_max_qty", "unit_aemp", "wholesale_markup", "price_to_pharmacist", "ahi_fee", "final_price"),
+    ]
+
+
+def _efc_inverse() -> list:
+    return [
+        Stage("final_price", ("price",), section100_efc.D),
+        Stage("ahi_fee", ("setting", "schedule"), lambda setting, _: section100_efc.calculate_ahi_fee_efc(setting)),
+        Stage("price_to_pharmacist", ("final_price", "ahi_fee", "setting", "schedule"),
+              lambda dpma, ahi, setting, _: section100_efc.calculate_efc_inverse_ptp(dpma, ahi, setting)),
+        Stage("wholesale_markup", ("final_price", "ahi_fee", "price_to_pharmacist", "setting"),
+              section100_efc.calculate_efc_inverse_markup),
+        Stage("vials_needed", ("max_amount", "vial_content", "wastage"), section100_efc.calculate_vials_needed),
+        Stage("aemp_max_qty", ("price_to_pharmacist", "pricing_qty", "vials_needed"),
+              section100_efc.calculate_efc_inverse_aemp_max),
+        _breakdown("aemp_max_qty", "wholesale_markup", "price_to_pharmacist", "ahi_fee", "final_price"),
+    ]
+
+
+# (section, known price type) -> (stage factory, inputs)
+PIPELINES = {
+    ("Section 85", "AEMP"): (_section85_forward, SECTION85_INPUTS),
+    ("Section 85", "DPMQ"): (_section85_inverse, SECTION85_INPUTS),
+    ("Section 100 – EFC", "AEMP"): (_efc_forward, EFC_INPUTS),
+    ("Section 100 – EFC", "DPMQ"): (_efc_inverse, EFC_INPUTS),
+}
+
+
+def new_pipeline(selected_section: str, price_type: str) -> Pipeline:
+    """Empty pipeline for one section and known price type ("AEMP" forward, "DPMQ" inverse)."""
+    stages, inputs = PIPELINES[(selected_section, price_type)]
+    return Pipeline(stages(), inputs)
@@ -0,0 +1,48 @@
+# pbs_calc/precision.py
+"""
+Decimal context every calculator runs in.
+
+Decimal arithmetic takes its precision and rounding from the calling thread's
+context, so a caller that changed getcontext() (or a thread that never set it)
+would otherwise change the cents. Every public calculator is wrapped with
+@pricing_context and runs with:
+
+    PRECISION = 28          significant digits for intermediate results
+    ROUNDING  = ROUND_HALF_EVEN for inexact intermediates (divisions)
+
+Money is always quantized explicitly with ROUND_HALF_UP (to_cents), independent
+of the context. The context is a private copy per call (decimal.localcontext), so
+threads never share or lock it; when the caller's context already has this
+precision and rounding (the default for every new thread) it is used as is.
+"""
+
+from __future__ import annotations
+
+import functools
+from decimal import (Context, Decimal, DivisionByZero, InvalidOperation, Overflow, ROUND_HALF_EVEN, ROUND_HALF_UP,
+                     getcontext, localcontext)
+
+PRECISION = 28
+ROUNDING = ROUND_HALF_EVEN
+
+MONEY = Decimal("0.01")
+
+PRICING_CONTEXT = Context(prec=PRECISION, rounding=ROUNDING, traps=[InvalidOperation, DivisionByZero, Overflow])
+
+
+def pricing_context(func):
+    """Decorator: run func in PRICING_CONTEXT (a thread-local copy)."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        context = getcontext()
+        if context.prec == PRECISION and context.rounding == ROUNDING:
+            return func(*args, **kwargs)
+        with localcontext(PRICING_CONTEXT):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def to_cents(value) -> Decimal:
+    """Round a money value to cents, half up, as every breakdown displays it."""
+    return Decimal(value).quantize(MONEY, rounding=ROUND_HALF_UP)
@@ -0,0 +1,410 @@
+# pbs_calc/reprice.py
+
+from __future__ import annotations
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from pbs_calc.batch import efc_forward_batch, efc_inverse_batch, section85_forward_batch, section85_inverse_batch
+from pbs_calc.diagnostics import Collector, JsonLinesLog, collecting, count, stage
+from pbs_calc.schedule import schedule_for, using_schedule
+
+SECTION_85 = "Section 85"
+SECTION_100_EFC = "Section 100 – EFC"
+
+# Expected input columns (optional ones fall back to the single-item defaults)
+BATCH_COLUMNS = {
+    SECTION_85: {
+        "required": ["price", "pricing_qty", "max_qty"],
+        "optional": {"dangerous": False},
+    },
+    SECTION_100_EFC: {
+        "required": ["price", "pricing_qty", "vial_content", "max_amount"],
+        "optional": {"wastage": False, "setting": "Public"},
+    },
+}
+
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+
+# Arrow IPC (Feather v2) files, read and written like Parquet
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+# Output column order, following generate_cost_breakdown_df
+RESULT_ORDER = [
+    "aemp_max_qty", "unit_aemp", "wholesale_markup", "price_to_pharmacist",
+    "ahi_fee", "dispensing_fee", "dangerous_fee", "final_price",
+    "difference", "precision_ok", "valid",
+]
+
+# ==============================
+# Parsing
+# ==============================
+
+
+def column_name(col) -> str:
+    """Normalised column name ("Pricing Qty" -> "pricing_qty")."""
+    return str(col).strip().lower().replace(" ", "_")
+
+
+def normalise_columns(items: pd.DataFrame) -> pd.DataFrame:
+    """Lower-case, underscore-separated column names ("Pricing Qty" -> "pricing_qty")."""
+    items.columns = [column_name(col) for col in items.columns]
+    return items
+
+
+def missing_columns(items, selected_section: str) -> list:
+    """Required columns absent from items (a DataFrame or a list of normalised column names)."""
+    return [col for col in BATCH_COLUMNS[selected_section]["required"] if col not in items]
+
+
+def pricing_columns(selected_section: str) -> list:
+    """Every input column the section's calculators read (required and optional)."""
+    spec = BATCH_COLUMNS[selected_section]
+    return [*spec["required"], *spec["optional"]]
+
+
+def flag_values(chunk: pd.DataFrame, name: str, default: bool) -> np.ndarray:
+    """Yes/No style column as booleans; missing column or blanks use the default."""
+    if name not in chunk:
+        return np.full(len(chunk), default)
+    values = chunk[name].fillna(default).astype(str).str.strip().str.lower()
+    return values.isin(TRUE_VALUES).to_numpy()
+
+
+def setting_values(chunk: pd.DataFrame) -> np.ndarray:
+    """Hospital setting per row, normalised to "Public" / "Private"."""
+    if "setting" not in chunk:
+        return np.full(len(chunk), "Public")
+    values = chunk["setting"].fillna("Public").astype(str).str.strip().str.capitalize()
+    return np.where(values == "Private", "Private", "Public")
+
+
+# ==============================
+# Pricing one chunk
+# ==============================
+
+
+def _price_section85_chunk(chunk: pd.DataFrame, price_type: str) -> pd.DataFrame:
+    dangerous = flag_values(chunk, "dangerous", False)
+    if price_type == "DPMQ":
+        result = section85_inverse_batch(chunk["price"], chunk["pricing_qty"], chunk["max_qty"], dangerous)
+        result["final_price"] = result.pop("reconstructed_dpmq")
+        result["difference"] = result["difference"].round(4)
+        result.pop("tier")
+    else:
+        result = section85_forward_batch(chunk["price"], chunk["pricing_qty"], chunk["max_qty"], dangerous)
+        result["final_price"] = result.pop("dpmq")
+    return pd.DataFrame(result, index=chunk.index)
+
+
+def _price_efc_chunk(chunk: pd.DataFrame, price_type: str) -> pd.DataFrame:
+    calculate = efc_inverse_batch if price_type == "DPMQ" else efc_forward_batch
+    result = calculate(chunk["price"], chunk["pricing_qty"], chunk["vial_content"], chunk["max_amount"],
+                       flag_values(chunk, "wastage", False), setting_values(chunk))
+    result["final_price"] = result.pop("dpma")
+    priced = pd.DataFrame(result, index=chunk.index)
+    priced["dispensing_fee"] = 0.0
+    return priced
+
+
+def price_chunk(chunk: pd.DataFrame, selected_section: str, price_type: str,
+                effective_date: Optional[str] = None) -> pd.DataFrame:
+    """
+    Price one chunk of items with the same calculators as the app and return
+    the input columns followed by the cost-breakdown columns (snake_case keys;
+    the UI renames them with breakdown_column_names).
+    price_type is the known price, as in the UI: "AEMP" (forward) or "DPMQ" (inverse).
+    effective_date (YYYY-MM-DD) prices with the fee schedule in effect on that
+    date instead of today's.
+    """
+    with using_schedule(effective_date), stage("price_chunk"):
+        if selected_section == SECTION_85:
+            priced = _price_section85_chunk(chunk, price_type)
+        else:
+            priced = _price_efc_chunk(chunk, price_type)
+        priced = priced[[col for col in RESULT_ORDER if col in priced]]
+        count("rows_priced", len(chunk))
+        return pd.concat([chunk, priced], axis=1)
+
+
+def price_chunk_diagnosed(chunk: pd.DataFrame, selected_section: str, price_type: str,
+                          effective_date: Optional[str] = None) -> tuple:
+    """price_chunk plus the stage timings and counters it produced (picklable, for workers)."""
+    with collecting() as diagnostics:
+        priced = price_chunk(chunk, selected_section, price_type, effective_date)
+    return priced, diagnostics.snapshot()
+
+
+# ==============================
+# Streaming files
+# ==============================
+
+
+def is_columnar(name: str) -> bool:
+    """Parquet or Arrow IPC file name."""
+    return name.lower().endswith((".parquet", *ARROW_SUFFIXES))
+
+
+class ColumnarFile:
+    """
+    A Parquet or Arrow IPC file read record batch by record batch.
+
+    A path is memory-mapped and only the projected columns' pages are read.
+    One chunk (for Parquet, one row group) is decoded at a time, so memory
+    stays flat whatever the file size. source may also be an open
+    file or a pyarrow buffer (e.g. an upload), named by name.
+    """
+
+    def __init__(self, source, name: Optional[str] = None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.name = name or source
+        mapped = isinstance(source, str)
+        if self.name.lower().endswith(".parquet"):
+            self._parquet = pq.ParquetFile(source, memory_map=mapped)
+            self._ipc = None
+            self.schema = self._parquet.schema_arrow
+            self.num_rows = self._parquet.metadata.num_rows
+        else:
+            self._parquet = None
+            self._ipc = pa.ipc.open_file(pa.memory_map(source) if mapped else source)
+            self.schema = self._ipc.schema
+            # Batches of a mapped or in-memory file are zero-copy views, so counting reads no data
+            self.num_rows = sum(self._ipc.get_batch(index).num_rows for index in range(self._ipc.num_record_batches))
+
+    @property
+    def columns(self) -> list:
+        """Normalised column names."""
+        return [column_name(col) for col in self.schema.names]
+
+    def _batches(self, names: list, chunk_size: int):
+        if self._parquet is not None:
+            yield from self._parquet.iter_batches(batch_size=chunk_size, columns=names)
+        else:
+            for index in range(self._ipc.num_record_batches):
+                yield self._ipc.get_batch(index).select(names)
+
+    def chunks(self, chunk_size: int, columns: Optional[list] = None) -> Iterator[pd.DataFrame]:
+        """
+        DataFrames of at most chunk_size rows with normalised column names and
+        a running row index. columns (normalised names) projects the read;
+        None reads every column.
+        """
+        import pyarrow as pa
+
+        names = [col for col in self.schema.names if columns is None or column_name(col) in columns]
+        pending, rows, start = [], 0, 0
+
+        def frame(batches: list) -> pd.DataFrame:
+            nonlocal start
+            chunk = normalise_columns(pa.Table.from_batches(batches).to_pandas())
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            return chunk
+
+        # Batches are re-cut to chunk_size: IPC files keep whatever batch size they were written with
+        for batch in self._batches(names, chunk_size):
+            offset = 0
+            while offset < batch.num_rows:
+                piece = batch.slice(offset, chunk_size - rows)
+                pending.append(piece)
+                rows += piece.num_rows
+                offset += piece.num_rows
+                if rows == chunk_size:
+                    yield frame(pending)
+                    pending, rows = [], 0
+        if pending:
+            yield frame(pending)
+
+
+def read_chunks(path: str, chunk_size: int, columns: Optional[list] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield the input file in chunks of at most chunk_size rows (CSV, Parquet,
+    Arrow IPC or XLSX). columns (normalised names) reads only those columns;
+    None reads every column. Parquet and Arrow files are memory-mapped.
+    """
+    lower = path.lower()
+    usecols = None if columns is None else (lambda col: column_name(col) in columns)
+    if is_columnar(lower):
+        yield from ColumnarFile(path).chunks(chunk_size, columns)
+    elif lower.endswith(".xlsx"):
+        items = normalise_columns(pd.read_excel(path, usecols=usecols))  # XLSX cannot be streamed
+        for start in range(0, len(items), chunk_size):
+            yield items.iloc[start:start + chunk_size]
+    else:
+        for chunk in pd.read_csv(path, chunksize=chunk_size, usecols=usecols):
+            yield normalise_columns(chunk)
+
+
+class ChunkWriter:
+    """Append priced chunks to a CSV, Parquet, Arrow IPC or XLSX file as they arrive."""
+
+    def __init__(self, path: str):
+        self.path = path
+        lower = path.lower()
+        self.is_parquet = lower.endswith(".parquet")
+        self.is_arrow = lower.endswith(ARROW_SUFFIXES)
+        self.is_xlsx = lower.endswith(".xlsx")
+        self._parquet_writer = None
+        self._arrow_writer = None
+        self._arrow_schema = None
+        self._workbook = None
+        self._worksheet = None
+        self._next_row = 0
+        self._wrote_header = False
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self.is_parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+        elif self.is_arrow:
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._arrow_writer is None:
+                self._arrow_schema = table.schema
+                self._arrow_writer = pa.ipc.new_file(self.path, table.schema)
+            self._arrow_writer.write_table(table.cast(self._arrow_schema))
+        elif self.is_xlsx:
+            self._write_xlsx(chunk)
+        else:
+            chunk.to_csv(self.path, mode="a" if self._wrote_header else "w",
+                         header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def _write_xlsx(self, chunk: pd.DataFrame) -> None:
+        # constant_memory flushes each row to a temp file, so memory stays flat
+        from pbs_calc.export import XLSX_MAX_ROWS, write_xlsx_rows
+
+        if self._next_row + len(chunk) > XLSX_MAX_ROWS:
+            raise ValueError(f"XLSX output is limited to {XLSX_MAX_ROWS - 1:,} rows; write .csv or .parquet instead.")
+        if self._workbook is None:
+            import xlsxwriter
+
+            self._workbook = xlsxwriter.Workbook(self.path, {"constant_memory": True})
+            self._worksheet = self._workbook.add_worksheet("Batch")
+            bold = self._workbook.add_format({"bold": True})
+            for col, name in enumerate(chunk.columns):
+                self._worksheet.write(0, col, str(name), bold)
+            self._next_row = 1
+        self._next_row = write_xlsx_rows(self._worksheet, chunk, self._next_row)
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if self._arrow_writer is not None:
+            self._arrow_writer.close()
+        if self._workbook is not None:
+            self._workbook.close()
+
+    def __enter__(self) -> "ChunkWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _checked_chunks(path: str, selected_section: str, chunk_size: int,
+                    columns: Optional[list] = None) -> Iterator[pd.DataFrame]:
+    for chunk in read_chunks(path, chunk_size, columns):
+        missing = missing_columns(chunk, selected_section)
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+        yield chunk
+
+
+def reprice_file(
+    input_path: str,
+    output_path: str,
+    selected_section: str,
+    price_type: str,
+    workers: Optional[int] = None,
+    chunk_size: int = 50_000,
+    progress=None,
+    diagnostics: Optional[str] = None,
+    effective_date: Optional[str] = None,
+    keep: Optional[list] = None,
+) -> int:
+    """
+    Stream input_path through price_chunk and write results to output_path.
+
+    Chunks are fanned out over a process pool (one worker per core by default)
+    with at most two chunks per worker in flight, and written back in input
+    order as soon as each is ready, so memory stays bounded by the window
+    rather than the file. Returns the number of rows priced; progress, if
+    given, is called with the running row count after each chunk.
+
+    With diagnostics (a file path, or "-" for stderr), one JSON line of stage
+    timings and counters is written per chunk, then a summary line.
+    effective_date reprices with a historical fee schedule (see price_chunk).
+
+    Every input column is carried to the output by default. With keep (a
+    list of column names, possibly empty), only the pricing columns and those
+    are read: for Parquet and Arrow input the other columns are never loaded.
+    """
+    if effective_date is not None:
+        schedule_for(effective_date)  # unknown or malformed dates fail before any output is written
+    workers = workers or os.cpu_count() or 1
+    columns = None if keep is None else [*pricing_columns(selected_section), *(column_name(col) for col in keep)]
+    chunks = _checked_chunks(input_path, selected_section, chunk_size, columns)
+    task = price_chunk_diagnosed if diagnostics else price_chunk
+    log = JsonLinesLog(diagnostics) if diagnostics else None
+    summary = Collector()
+    started = time.perf_counter()
+    total = emitted = 0
+
+    with ChunkWriter(output_path) as writer:
+
+        def emit(result) -> None:
+            nonlocal total, emitted
+            if log is None:
+                writer.write(result)
+                rows = len(result)
+            else:
+                priced, snapshot = result
+                chunk_stats = Collector()
+                chunk_stats.merge(snapshot)
+                with collecting(chunk_stats), stage("write_chunk"):
+                    writer.write(priced)
+                rows = len(priced)
+                record = chunk_stats.snapshot()
+                summary.merge(record)
+                log.write("chunk", index=emitted, rows=rows, **record)
+            total += rows
+            emitted += 1
+            if progress:
+                progress(total)
+
+        try:
+            if workers == 1:
+                for chunk in chunks:
+                    emit(task(chunk, selected_section, price_type, effective_date))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    pending = deque()
+                    for chunk in chunks:
+                        pending.append(pool.submit(task, chunk, selected_section, price_type, effective_date))
+                        if len(pending) >= 2 * workers:
+                            emit(pending.popleft().result())
+                    while pending:
+                        emit(pending.popleft().result())
+            if log:
+                log.write("summary", rows=total, workers=workers,
+                          seconds=round(time.perf_counter() - started, 4), **summary.snapshot())
+        finally:
+            if log:
+                log.close()
+
+    return total
@@ -0,0 +1,200 @@
+# pbs_calc/schedule.py
+"""
+Registry of dated PBS fee schedules, compiled once into immutable rule objects.
+
+config.FEE_SCHEDULES holds the raw constants of every schedule; each is
+compiled at import into a FeeSchedule with plain attributes (no dict lookups
+in the hot paths) and its precomputed inverse segments. Calculators read
+active_schedule(), which is the schedule in effect today unless a block
+selects another:
+
+    with using_schedule("2024-07-01"):
+        calculate_section85_inverse(dpmq, pricing_qty, max_qty)
+
+The selection is a context variable, so threads and Streamlit sessions never
+see each other's choice. Worker processes are handed the effective date.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import contextvars
+import hashlib
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional, Union
+
+from config import FEE_SCHEDULES
+from pbs_calc.errors import InvalidInputError
+from pbs_calc.segments import build_inverse_segments
+
+# attribute -> PBS_CONSTANTS key (nested keys as tuples)
+FIELDS = {
+    "dispensing_fee": "DISPENSING_FEE",
+    "dangerous_fee": "DANGEROUS_FEE",
+    "ahi_base": "AHI_BASE",
+    "ahi_tier1_cap": "AHI_TIER1_CAP",
+    "ahi_tier2_cap": "AHI_TIER2_CAP",
+    "ahi_max_fee": "AHI_MAX_FEE",
+    "ahi_rate": "AHI_RATE",
+    "wholesale_fixed_fee": "WHOLESALE_FIXED_FEE_TIER1",
+    "wholesale_markup_rate": "WHOLESALE_MARKUP_RATE",
+    "wholesale_flat_fee": "WHOLESALE_FLAT_FEE",
+    "wholesale_aemp_threshold": "WHOLESALE_AEMP_THRESHOLD",
+    "wholesale_tier2_cap": "WHOLESALE_TIER2_CAP",
+    "tier1_dpmq_cap": ("WHOLESALE_TIER_THRESHOLDS", "TIER1"),
+    "tier2_dpmq_cap": ("WHOLESALE_TIER_THRESHOLDS", "TIER2"),
+    "efc_ahi_public": "EFC_AHI_PUBLIC",
+    "efc_ahi_private": "EFC_AHI_PRIVATE",
+    "efc_private_markup_rate": "EFC_PRIVATE_MARKUP_RATE",
+    "efc_private_markup_multiplier": "EFC_PRIVATE_MARKUP_MULTIPLIER",
+}
+
+DateLike = Union[date, datetime, str, None]
+
+
+class FeeSchedule:
+    """
+    One compiled fee schedule. Amounts and rates are attributes named after
+    FIELDS; minimum_dpmq (dispensing fee + AHI base) and inverse_segments are
+    derived once here. Instances are immutable and shared between threads.
+    """
+
+    __slots__ = ("effective_from", "version", *FIELDS, "minimum_dpmq", "inverse_segments", "_floats")
+
+    def __init__(self, effective_from: date, version: str, values: dict, inverse_segments: Optional[tuple] = None):
+        assign = object.__setattr__
+        assign(self, "effective_from", effective_from)
+        assign(self, "version", version)
+        for name in FIELDS:
+            assign(self, name, values[name])
+        assign(self, "minimum_dpmq", self.dispensing_fee + self.ahi_base)
+        assign(self, "inverse_segments",
+               build_inverse_segments(self) if inverse_segments is None else inverse_segments)
+        assign(self, "_floats", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FeeSchedule is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("FeeSchedule is immutable")
+
+    def __repr__(self) -> str:
+        return f"FeeSchedule(effective_from={self.effective_from.isoformat()}, version={self.version})"
+
+    @property
+    def floats(self) -> "FeeSchedule":
+        """The same schedule in floats (segments included), for vectorised NumPy maths."""
+        floats = self._floats
+        if floats is None:
+            segments = tuple(
+                tuple(None if value is None else float(value) for value in segment)
+                for segment in self.inverse_segments
+            )
+            values = {name: float(getattr(self, name)) for name in FIELDS}
+            floats = FeeSchedule(self.effective_from, self.version, values, segments)
+            object.__setattr__(self, "_floats", floats)
+        return floats
+
+
+# ==============================
+# Compilation
+# ==============================
+
+def schedule_version(constants: dict) -> str:
+    """Short hash of a schedule's constants; changes whenever any fee, threshold or date does."""
+    def flatten(prefix, mapping):
+        for name in sorted(mapping):
+            value = mapping[name]
+            if isinstance(value, dict):
+                yield from flatten(f"{prefix}{name}.", value)
+            else:
+                yield f"{prefix}{name}={value}"
+
+    payload = ";".join(flatten("", constants))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def compile_schedule(constants: dict) -> FeeSchedule:
+    values = {}
+    for name, key in FIELDS.items():
+        value = constants[key[0]][key[1]] if isinstance(key, tuple) else constants[key]
+        values[name] = Decimal(value)
+    return FeeSchedule(constants["EFFECTIVE_FROM"], schedule_version(constants), values)
+
+
+# Oldest first; _STARTS is kept parallel for bisection
+SCHEDULES = tuple(sorted((compile_schedule(constants) for constants in FEE_SCHEDULES),
+                         key=lambda schedule: schedule.effective_from))
+_STARTS = [schedule.effective_from for schedule in SCHEDULES]
+
+
+# ==============================
+# Lookup
+# ==============================
+
+def _as_date(effective: DateLike) -> date:
+    if effective is None:
+        return date.today()
+    if isinstance(effective, datetime):
+        return effective.date()
+    if isinstance(effective, date):
+        return effective
+    try:
+        return date.fromisoformat(str(effective).strip())
+    except ValueError:
+        raise InvalidInputError(f"Effective date {effective!r} is not a YYYY-MM-DD date.") from None
+
+
+def schedule_for(effective: DateLike = None) -> FeeSchedule:
+    """Schedule in effect on a date (today by default)."""
+    when = _as_date(effective)
+    index = bisect.bisect_right(_STARTS, when) - 1
+    if index < 0:
+        raise InvalidInputError(
+            f"No PBS fee schedule is in effect on {when.isoformat()} "
+            f"(the earliest starts {_STARTS[0].isoformat()})."
+        )
+    return SCHEDULES[index]
+
+
+_current = None
+_current_until = 0.0  # time.time() at which the next schedule takes over
+
+
+def current_schedule() -> FeeSchedule:
+    """Schedule in effect today (local date); rolls over at the next effective date."""
+    global _current, _current_until
+    if time.time() >= _current_until:
+        today = date.today()
+        _current = schedule_for(today)
+        later = [start for start in _STARTS if start > today]
+        _current_until = (datetime.combine(later[0], datetime.min.time()).timestamp()
+                          if later else float("inf"))
+    return _current
+
+
+# ==============================
+# Selection
+# ==============================
+
+_selected = contextvars.ContextVar("pbs_fee_schedule", default=None)
+
+
+def active_schedule() -> FeeSchedule:
+    """Schedule the calculators use: the one selected by using_schedule, else today's."""
+    schedule = _selected.get()
+    return schedule if schedule is not None else current_schedule()
+
+
+@contextlib.contextmanager
+def using_schedule(effective: Union[FeeSchedule, DateLike]):
+    """Price with the schedule in effect on a date (or a given FeeSchedule) inside the block."""
+    schedule = effective if isinstance(effective, FeeSchedule) else schedule_for(effective)
+    token = _selected.set(schedule)
+    try:
+        yield schedule
+    finally:
+        _selected.reset(token)
@@ -0,0 +1,216 @@
+# pbs_calc/section100_efc.py
+"""
+Section 100 – Efficient Funding of Chemotherapy (EFC) calculators.
+
+Pure Python and Decimal only: no Streamlit or pandas, so worker processes and
+scripts can import it cheaply. Invalid inputs raise pbs_calc.errors types.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal, ROUND_HALF_UP
+import math
+
+from pbs_calc.cache import memoise
+from pbs_calc.diagnostics import stage
+from pbs_calc.errors import InvalidInputError
+from pbs_calc.precision import pricing_context
+from pbs_calc.schedule import active_schedule
+
+# ==============================
+# Utilities
+# ==============================
+
+MONEY = Decimal("0.01")
+
+
+def D(x) -> Decimal:
+    """Safe Decimal conversion."""
+    return Decimal(str(x))
+
+
+def q(amount: Decimal) -> Decimal:
+    """Quantize to cents (half up)."""
+    return amount.quantize(MONEY, rounding=ROUND_HALF_UP)
+
+
+def validate_positive(name: str, value) -> None:
+    if D(value) <= 0:
+        raise InvalidInputError(f"{name} must be greater than zero.")
+
+
+# ==============================
+# Core Calculators (S100 EFC)
+# ==============================
+
+@pricing_context
+def calculate_unit_aemp(aemp_max_qty: Decimal, pricing_qty: Decimal, max_amount: Decimal) -> Decimal:
+    """
+    Unit AEMP = AEMP(max amount) * pricing_qty / max_amount
+    Keeps full precision; caller can round if desired.
+    """
+    return D(aemp_max_qty) * D(pricing_qty) / D(max_amount)
+
+
+@pricing_context
+def calculate_wholesale_markup_private(aemp_max_qty: Decimal) -> Decimal:
+    """
+    Private hospital add-on: 1.4 percent of AEMP at maximum amount.
+    """
+    return D(aemp_max_qty) * active_schedule().efc_private_markup_rate
+
+
+def calculate_ahi_fee_fixed(hospital_setting: str) -> Decimal:
+    """
+    Fixed AHI fee by setting.
+    Public:  91.23
+    Private: 136.90
+    """
+    schedule = active_schedule()
+    return schedule.efc_ahi_public if hospital_setting == "Public" else schedule.efc_ahi_private
+
+
+def calculate_ahi_fee_efc(hospital_setting: str) -> Decimal:
+    """Alias used by inverse path."""
+    return calculate_ahi_fee_fixed(hospital_setting)
+
+
+@pricing_context
+def calculate_vials_needed(max_amount: Decimal, vial_content: Decimal, consider_wastage: bool) -> Decimal:
+    """
+    If wastage is considered, round vials up to the next whole vial.
+    If not, allow fractional vials.
+    """
+    max_amount = D(max_amount)
+    vial_content = D(vial_content)
+
+    if consider_wastage:
+        return D(math.ceil(max_amount / vial_content))
+    return max_amount / vial_content
+
+
+@pricing_context
+def calculate_efc_aemp_max(unit_aemp, vials_needed: Decimal, pricing_qty) -> Decimal:
+    """Forward: AEMP(max amount) = vials needed * unit AEMP / pricing quantity."""
+    return vials_needed * D(unit_aemp) / D(pricing_qty)
+
+
+def calculate_efc_wholesale_markup(aemp_max_qty: Decimal, hospital_setting: str) -> Decimal:
+    """Private hospitals add the 1.4 percent markup; public ones none."""
+    if hospital_setting == "Private":
+        return calculate_wholesale_markup_private(aemp_max_qty)
+    return D("0.00")
+
+
+@pricing_context
+def calculate_efc_inverse_ptp(dpma, ahi_fee: Decimal, hospital_setting: str) -> Decimal:
+    """
+    Inverse: price to pharmacist from the DPMA. Remove the fixed AHI fee, then
+    for Private the markup (subtotal = PtP * 1.014 -> PtP = subtotal / 1.014).
+    """
+    subtotal = D(dpma) - ahi_fee
+    if hospital_setting == "Private":
+        return subtotal / active_schedule().efc_private_markup_multiplier
+    return subtotal
+
+
+@pricing_context
+def calculate_efc_inverse_markup(dpma, ahi_fee: Decimal, price_to_pharmacist: Decimal, hospital_setting: str) -> Decimal:
+    """Inverse: the markup removed by calculate_efc_inverse_ptp (none for Public)."""
+    if hospital_setting == "Private":
+        return D(dpma) - ahi_fee - price_to_pharmacist
+    return D("0.00")
+
+
+@pricing_context
+def calculate_efc_inverse_aemp_max(price_to_pharmacist: Decimal, pricing_qty, vials_needed: Decimal) -> Decimal:
+    """
+    Inverse: AEMP(max amount). price_to_pharmacist is the total PtP for the
+    maximum amount; scale by pricing_qty / vials to get AEMP(max) per pricing unit.
+    """
+    if vials_needed == 0:
+        return D("0.00")
+    return (price_to_pharmacist * D(pricing_qty)) / D(vials_needed)
+
+# ==============================
+# Forward: AEMP -> DPMA (shown as DPMQ label in UI)
+# ==============================
+
+@memoise(persist=True)
+@pricing_context
+def calculate_efc_forward(
+    input_price,
+    pricing_qty,
+    vial_content,
+    max_amount,
+    consider_wastage: bool,
+    hospital_setting: str
+) -> dict:
+    """
+    AEMP -> DPMA components at full precision, keyed like display_cost_breakdown.
+    DPMA = AEMP_max + wholesale_markup(private only) + fixed AHI
+    AEMP_max = (MaxAmount / VialContent) * Price / PricingQuantity
+    """
+    with stage("forward_pricing"):
+        aemp_unit = D(input_price)
+
+        # Vials ratio with optional wastage rounding
+        vials_ratio = calculate_vials_needed(max_amount, vial_content, consider_wastage)
+        aemp_max = calculate_efc_aemp_max(aemp_unit, vials_ratio, pricing_qty)
+
+        # Fees by setting: 1.4% markup (Private only), fixed AHI 91.23 / 136.90
+        wholesale_markup = calculate_efc_wholesale_markup(aemp_max, hospital_setting)
+        ahi_fee = calculate_ahi_fee_fixed(hospital_setting)
+
+        # Totals
+        ptp  = aemp_max + wholesale_markup
+        dpma = ptp + ahi_fee
+
+    return {
+        "aemp_max_qty": aemp_max,
+        "unit_aemp": aemp_unit,
+        "wholesale_markup": wholesale_markup,
+        "price_to_pharmacist": ptp,
+        "ahi_fee": ahi_fee,
+        "final_price": dpma,
+    }
+
+
+# ==============================
+# Inverse: DPMA -> AEMP
+# ==============================
+
+@memoise(persist=True)
+@pricing_context
+def calculate_efc_inverse(
+    input_price,
+    pricing_qty,
+    vial_content,
+    max_amount,
+    consider_wastage: bool,
+    hospital_setting: str
+) -> dict:
+    """
+    DPMA -> AEMP(max amount) components at full precision, keyed like
+    display_cost_breakdown (final_price is the DPMA that was entered).
+    """
+    dpmq_input = D(input_price)  # DPMA in S100 wording
+
+    with stage("fee_removal"):
+        # 1) Remove fixed AHI, 2) remove wholesale markup for private setting
+        ahi_fee = calculate_ahi_fee_efc(hospital_setting)
+        price_to_pharmacist = calculate_efc_inverse_ptp(dpmq_input, ahi_fee, hospital_setting)
+        markup = calculate_efc_inverse_markup(dpmq_input, ahi_fee, price_to_pharmacist, hospital_setting)
+
+    with stage("reconstruction"):
+        # 3) Reconstruct AEMP(max)
+        vials_needed = calculate_vials_needed(max_amount, vial_content, consider_wastage)
+        aemp_max_qty = calculate_efc_inverse_aemp_max(price_to_pharmacist, pricing_qty, vials_needed)
+
+    return {
+        "aemp_max_qty": aemp_max_qty,
+        "wholesale_markup": markup,
+        "price_to_pharmacist": price_to_pharmacist,
+        "ahi_fee": ahi_fee,
+        "final_price": dpmq_input,
+    }
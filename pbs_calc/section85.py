@@ -0,0 +1,272 @@
+# pbs_calc/section85.py
+"""
+Section 85 calculators (forward AEMP -> DPMQ and inverse DPMQ -> AEMP).
+
+Pure Python and Decimal only: no Streamlit or pandas, so worker processes and
+scripts can import it cheaply. Invalid inputs raise pbs_calc.errors types.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from pbs_calc.cache import memoise
+from pbs_calc.diagnostics import count, stage
+from pbs_calc.errors import DPMQBelowFeesError, InvalidInputError
+from pbs_calc.lookup import lookup_inverse_aemp_max
+from pbs_calc.precision import pricing_context
+from pbs_calc.schedule import active_schedule
+from pbs_calc.segments import TIER1_BRANCH, branch_aemp, inverse_branch
+
+# ----------------------
+# 🔹 PRECISION HELPERS
+# ----------------------
+
+def to_decimal(value):
+    """Convert any numeric value to Decimal with proper precision"""
+    return Decimal(str(value))
+
+def validate_calculation_precision_enhanced(original_dpmq, reconstructed_dpmq, tolerance=Decimal("0.005")):
+    """
+    Enhanced validation with better error reporting
+    """
+    original_dpmq = to_decimal(original_dpmq)
+    reconstructed_dpmq = to_decimal(reconstructed_dpmq)
+    diff = abs(original_dpmq - reconstructed_dpmq)
+    
+    if diff <= tolerance:
+        return True, f"✅ Precision validated: difference ${diff:.4f}"
+    else:
+        return False, f"❌ Precision warning: difference ${diff:.4f} exceeds tolerance ${tolerance:.4f}"
+
+# ----------------------
+# 🔹 FORWARD LOGIC
+# ----------------------
+
+# Forward: AEMP (unit) → AEMP (max quantity)
+@pricing_context
+def calculate_aemp_max_qty(input_price, pricing_qty, max_qty):
+    if pricing_qty == 0:
+        return Decimal("0.00")
+    return (to_decimal(input_price) * to_decimal(max_qty)) / to_decimal(pricing_qty)
+
+# Forward: AHI Fee – FORWARD PBS LOGIC
+@pricing_context
+def calculate_ahi_fee(price_to_pharmacist):
+    price_to_pharmacist = to_decimal(price_to_pharmacist)
+    schedule = active_schedule()
+
+    if price_to_pharmacist < schedule.ahi_tier1_cap:
+        return schedule.ahi_base
+    elif price_to_pharmacist <= schedule.ahi_tier2_cap:
+        return schedule.ahi_base + (price_to_pharmacist - schedule.ahi_tier1_cap) * schedule.ahi_rate
+    else:
+        return schedule.ahi_max_fee
+
+# Forward: DPMQ = PtP + AHI + Dispensing + [Dangerous]
+@pricing_context
+def calculate_dpmq(price_to_pharmacist, ahi_fee, include_dangerous=False):
+    schedule = active_schedule()
+    dangerous_fee = schedule.dangerous_fee if include_dangerous else Decimal("0.00")
+    return to_decimal(price_to_pharmacist) + to_decimal(ahi_fee) + schedule.dispensing_fee + dangerous_fee
+
+# ----------------------
+# 🔹 INVERSE TIER LOGIC
+# ----------------------
+
+def get_wholesale_tier(dpmq):
+    dpmq = to_decimal(dpmq)
+    schedule = active_schedule()
+
+    if dpmq <= schedule.tier1_dpmq_cap:
+        return "Tier1"
+    elif dpmq <= schedule.tier2_dpmq_cap:
+        return "Tier2"
+    else:
+        return "Tier3"
+
+def get_inverse_tier_type(dpmq):
+    return get_wholesale_tier(dpmq)
+
+# ----------------------
+# 🔹 INVERSE CALCULATOR – CLOSED-FORM AEMP LOGIC
+# ----------------------
+
+@pricing_context
+def precise_inverse_aemp_fixed(dpmq, dispensing_fee):
+    """
+    Closed-form inverse AEMP calculation over the piecewise-linear fee schedule.
+
+    Rules for DPMQs that do not map to exactly one AEMP:
+      - Overlaps (the schedule dips at a breakpoint, so two segments reach the
+        same DPMQ): the lowest AEMP wins.
+      - Gaps (the schedule jumps at a breakpoint, so no AEMP reaches the DPMQ):
+        the breakpoint AEMP itself is returned, i.e. the nearest attainable AEMP.
+    The result is left unrounded, like the Tier 1 remainder before display, so
+    half-cent ties are settled once by ROUND_HALF_UP when the breakdown is shown.
+    """
+    dpmq = to_decimal(dpmq)
+    dispensing_fee = to_decimal(dispensing_fee)
+    schedule = active_schedule()
+
+    code = inverse_branch(schedule, dpmq, dispensing_fee)
+    if code != TIER1_BRANCH:
+        count("solver.gap_snap" if code % 2 else f"solver.segment_{code // 2}")
+    return branch_aemp(schedule, code, dpmq, dispensing_fee)
+
+
+# Inverse controller (Tier-aware)
+@memoise(persist=True)
+@pricing_context
+def calculate_inverse_aemp_max(dpmq, dispensing_fee, tier):
+    dpmq = to_decimal(dpmq)
+    dispensing_fee = to_decimal(dispensing_fee)
+    schedule = active_schedule()
+
+    if tier == "Tier1":
+        count("solver.tier1_closed_form")
+        result = dpmq - dispensing_fee - schedule.ahi_base - schedule.wholesale_fixed_fee
+        return result.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    elif tier in ("Tier2", "Tier3"):
+        # O(1) read from the precomputed table; solve directly if it has no entry
+        aemp_max_qty = lookup_inverse_aemp_max(dpmq, dispensing_fee)
+        if aemp_max_qty is None:
+            count("solver.lookup_miss")
+            aemp_max_qty = precise_inverse_aemp_fixed(dpmq, dispensing_fee)
+        else:
+            count("solver.lookup_hit")
+        return aemp_max_qty
+
+    return Decimal("0.00")
+
+# ----------------------
+# 🔹 HELPER CALCULATIONS
+# ----------------------
+
+# AEMP (max qty) → Unit AEMP
+@pricing_context
+def calculate_unit_aemp(aemp_max_qty, pricing_qty, max_qty):
+    if max_qty == 0:
+        return Decimal("0.00")
+    result = (to_decimal(aemp_max_qty) * to_decimal(pricing_qty)) / to_decimal(max_qty)
+    return result.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+# Forward: Wholesale markup from AEMP
+@pricing_context
+def calculate_wholesale_markup(aemp_max_qty):
+    aemp_max_qty = to_decimal(aemp_max_qty)
+    schedule = active_schedule()
+
+    if aemp_max_qty <= schedule.wholesale_aemp_threshold:
+        return schedule.wholesale_fixed_fee
+    elif aemp_max_qty <= schedule.wholesale_tier2_cap:
+        return (aemp_max_qty * schedule.wholesale_markup_rate).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    else:
+        return schedule.wholesale_flat_fee
+
+# Inverse: Wholesale markup from AEMP (delayed rounding)
+@pricing_context
+def calculate_inverse_wholesale_markup(aemp_max_qty):
+    aemp_max_qty = to_decimal(aemp_max_qty)
+    schedule = active_schedule()
+
+    if aemp_max_qty <= schedule.wholesale_aemp_threshold:
+        return schedule.wholesale_fixed_fee
+    elif aemp_max_qty <= schedule.wholesale_tier2_cap:
+        return aemp_max_qty * schedule.wholesale_markup_rate  # full precision, no rounding
+    else:
+        return schedule.wholesale_flat_fee
+
+# AEMP + markup = PTP (delayed rounding)
+@pricing_context
+def calculate_price_to_pharmacist(aemp_max_qty, wholesale_markup):
+    result = to_decimal(aemp_max_qty) + to_decimal(wholesale_markup)
+    return result  # Delay quantization until final DPMQ
+
+# Inverse: AHI Fee – based on PtP (delayed rounding)
+@pricing_context
+def calculate_inverse_ahi_fee(price_to_pharmacist):
+    price_to_pharmacist = to_decimal(price_to_pharmacist)
+    schedule = active_schedule()
+
+    if price_to_pharmacist < schedule.ahi_tier1_cap:
+        return schedule.ahi_base
+    elif price_to_pharmacist <= schedule.ahi_tier2_cap:
+        result = schedule.ahi_base + (price_to_pharmacist - schedule.ahi_tier1_cap) * schedule.ahi_rate
+        return result  # Delay quantization
+    else:
+        return schedule.ahi_max_fee
+
+# Final DPMQ – used in inverse check (final rounding)
+@pricing_context
+def calculate_inverse_dpmq(price_to_pharmacist, ahi_fee, dispensing_fee, include_dangerous=False):
+    dangerous_fee = active_schedule().dangerous_fee if include_dangerous else Decimal("0.00")
+    result = to_decimal(price_to_pharmacist) + to_decimal(ahi_fee) + to_decimal(dispensing_fee) + dangerous_fee
+    return result.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+# ----------------------
+# 🔹 FULL CHAINS
+# ----------------------
+
+# Forward: unit AEMP → every breakdown component (keyed like display_cost_breakdown)
+@memoise()
+@pricing_context
+def calculate_section85_forward(input_price, pricing_qty, max_qty, include_dangerous=False):
+    schedule = active_schedule()
+    with stage("forward_pricing"):
+        aemp_max_qty = calculate_aemp_max_qty(input_price, pricing_qty, max_qty)
+        wholesale_markup = calculate_wholesale_markup(aemp_max_qty)
+        price_to_pharmacist = calculate_price_to_pharmacist(aemp_max_qty, wholesale_markup)
+        ahi_fee = calculate_ahi_fee(price_to_pharmacist)
+    return {
+        "aemp_max_qty": aemp_max_qty,
+        "wholesale_markup": wholesale_markup,
+        "price_to_pharmacist": price_to_pharmacist,
+        "ahi_fee": ahi_fee,
+        "dispensing_fee": schedule.dispensing_fee,
+        "dangerous_fee": schedule.dangerous_fee if include_dangerous else Decimal("0.00"),
+        "final_price": calculate_dpmq(price_to_pharmacist, ahi_fee, include_dangerous),
+    }
+
+# Inverse: DPMQ → every breakdown component; final_price is the reconstructed DPMQ
+@memoise()
+@pricing_context
+def calculate_section85_inverse(dpmq, pricing_qty, max_qty, include_dangerous=False):
+    dpmq = to_decimal(dpmq)
+    schedule = active_schedule()
+    dispensing_fee = schedule.dispensing_fee
+    dangerous_fee = schedule.dangerous_fee if include_dangerous else Decimal("0.00")
+    with stage("tier_classification"):
+        tier = get_inverse_tier_type(dpmq)
+    with stage("solve"):
+        aemp_max_qty = calculate_inverse_aemp_max(dpmq - dangerous_fee, dispensing_fee, tier)
+    with stage("reconstruction"):
+        wholesale_markup = calculate_inverse_wholesale_markup(aemp_max_qty)
+        price_to_pharmacist = calculate_price_to_pharmacist(aemp_max_qty, wholesale_markup)
+        ahi_fee = calculate_inverse_ahi_fee(price_to_pharmacist)
+        unit_aemp = calculate_unit_aemp(aemp_max_qty, pricing_qty, max_qty)
+    return {
+        "aemp_max_qty": aemp_max_qty,
+        "unit_aemp": unit_aemp,
+        "wholesale_markup": wholesale_markup,
+        "price_to_pharmacist": price_to_pharmacist,
+        "ahi_fee": ahi_fee,
+        "dispensing_fee": dispensing_fee,
+        "dangerous_fee": dangerous_fee,
+        "final_price": price_to_pharmacist + ahi_fee + dispensing_fee + dangerous_fee,
+    }
+
+# ----------------------
+# 🔹 INPUT VALIDATION
+# ----------------------
+
+def minimum_dpmq(include_dangerous=False):
+    """Smallest DPMQ that still covers the dispensing and AHI fees."""
+    schedule = active_schedule()
+    return schedule.minimum_dpmq + schedule.dangerous_fee if include_dangerous else schedule.minimum_dpmq
+
+def validate_dpmq_covers_fees(dpmq, include_dangerous=False):
+    if to_decimal(dpmq) < minimum_dpmq(include_dangerous):
+        raise DPMQBelowFeesError("DPMQ too low to cover PBS fees.")
+
+def validate_quantities(pricing_qty, max_qty):
+    if pricing_qty == 0 or max_qty == 0:
+        raise InvalidInputError("Pricing quantity and maximum quantity must be greater than zero.")
@@ -0,0 +1,122 @@
+# pbs_calc/segments.py
+
+from __future__ import annotations
+
+from decimal import ROUND_HALF_UP, Decimal, localcontext
+
+# ==============================
+# Section 85 – Piecewise-linear fee schedule
+# ==============================
+
+
+def build_inverse_segments(schedule) -> tuple:
+    """
+    Map a Section 85 fee schedule (pbs_calc.schedule.FeeSchedule) into DPMQ
+    space; done once per schedule, when it is compiled.
+
+    Every combination of wholesale tier (fixed / percentage / flat) and AHI tier
+    (base / percentage / capped) is linear in AEMP, so DPMQ - dispensing fee is
+    ``slope * aemp + intercept`` on each AEMP interval (aemp_low, aemp_high].
+    Returns a tuple of (aemp_low, aemp_high, slope, intercept) in AEMP order;
+    the first segment is open below and the last is open above.
+    """
+    ahi_base = schedule.ahi_base
+    ahi_tier1_cap = schedule.ahi_tier1_cap
+    ahi_tier2_cap = schedule.ahi_tier2_cap
+    ahi_rate = schedule.ahi_rate
+    threshold = schedule.wholesale_aemp_threshold
+    tier2_cap = schedule.wholesale_tier2_cap
+
+    # Wholesale pieces: markup = rate * aemp + fixed on (aemp_low, aemp_high]
+    wholesale_pieces = (
+        (None, threshold, Decimal("0"), schedule.wholesale_fixed_fee),
+        (threshold, tier2_cap, schedule.wholesale_markup_rate, Decimal("0")),
+        (tier2_cap, None, Decimal("0"), schedule.wholesale_flat_fee),
+    )
+    # AHI pieces: ahi = rate * ptp + fixed on PtP (ptp_low, ptp_high]
+    ahi_pieces = (
+        (None, ahi_tier1_cap, Decimal("0"), ahi_base),
+        (ahi_tier1_cap, ahi_tier2_cap, ahi_rate, ahi_base - ahi_tier1_cap * ahi_rate),
+        (ahi_tier2_cap, None, Decimal("0"), schedule.ahi_max_fee),
+    )
+
+    segments = []
+    for w_low, w_high, w_rate, w_fixed in wholesale_pieces:
+        for a_low, a_high, a_rate, a_fixed in ahi_pieces:
+            # PtP caps translated back into AEMP for this wholesale piece
+            low = None if a_low is None else (a_low - w_fixed) / (1 + w_rate)
+            high = None if a_high is None else (a_high - w_fixed) / (1 + w_rate)
+            if w_low is not None and (low is None or low < w_low):
+                low = w_low
+            if w_high is not None and (high is None or high > w_high):
+                high = w_high
+            if low is not None and high is not None and low >= high:
+                continue  # this AHI tier is unreachable inside the wholesale piece
+
+            slope = (1 + w_rate) * (1 + a_rate)
+            intercept = w_fixed * (1 + a_rate) + a_fixed
+            segments.append((low, high, slope, intercept))
+
+    return tuple(segments)
+
+
+# ==============================
+# Section 85 – Inverse branches
+# ==============================
+
+# Branch codes: TIER1_BRANCH for the Tier 1 closed form, 2 * index to solve on
+# segment index, 2 * index + 1 to snap to that segment's low breakpoint (gap)
+TIER1_BRANCH = -1
+
+
+def inverse_branch(schedule, dpmq: Decimal, dispensing_fee: Decimal) -> int:
+    """
+    Branch code the closed-form inverse takes for dpmq (see branch_aemp).
+
+    Overlaps go to the lowest AEMP: the first segment that reaches the DPMQ
+    wins. A DPMQ at or below a segment's start, but above the previous
+    segment's end, fell into a gap and snaps to the breakpoint.
+    """
+    if dpmq <= schedule.tier1_dpmq_cap:
+        return TIER1_BRANCH
+    target = dpmq - dispensing_fee
+    for index, (low, high, slope, intercept) in enumerate(schedule.inverse_segments):
+        if low is not None and target <= slope * low + intercept:
+            return 2 * index + 1
+        if high is None or target <= slope * high + intercept:
+            return 2 * index
+    return 2 * (len(schedule.inverse_segments) - 1)
+
+
+def branch_aemp(schedule, code: int, dpmq: Decimal, dispensing_fee: Decimal) -> Decimal:
+    """AEMP(max) for dpmq on the branch inverse_branch chose."""
+    if code == TIER1_BRANCH:
+        result = dpmq - dispensing_fee - schedule.ahi_base - schedule.wholesale_fixed_fee
+        return result.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    low, _, slope, intercept = schedule.inverse_segments[code // 2]
+    if code % 2:
+        return low
+    return (dpmq - dispensing_fee - intercept) / slope
+
+
+def branch_bounds(schedule, dispensing_fee: Decimal) -> tuple:
+    """
+    The tests of inverse_branch as DPMQ bounds: ((code, bound), ...) in the
+    order they are tried, so a DPMQ takes the code of the first bound it does
+    not exceed; the last code has no bound (None). Segment ends are evaluated
+    in the current context, as inverse_branch does, and the dispensing fee is
+    then added exactly, so for cent DPMQs (where DPMQ - fee is exact) the
+    bounds decide exactly as inverse_branch would.
+    """
+    ends = []
+    for index, (low, high, slope, intercept) in enumerate(schedule.inverse_segments):
+        if low is not None:
+            ends.append((2 * index + 1, slope * low + intercept))
+        ends.append((2 * index, None if high is None else slope * high + intercept))
+
+    bounds = [(TIER1_BRANCH, schedule.tier1_dpmq_cap)]
+    with localcontext() as context:
+        context.prec = 2 * context.prec + 2
+        for code, end in ends:
+            bounds.append((code, None if end is None else end + dispensing_fee))
+    return tuple(bounds)
@@ -0,0 +1,107 @@
+# pbs_calc/sensitivity.py
+"""
+Section 85 price-sensitivity curves: DPMQ over a dense AEMP(max) grid.
+
+The whole grid goes through section85_forward_batch in one call (wholesale
+markup -> AHI fee -> DPMQ), so a million points take well under a second.
+breakpoints() lists where the fee schedule changes tier, and
+downsample_minmax() thins a curve for drawing while keeping every jump.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Dict
+
+import numpy as np
+
+from pbs_calc.batch import section85_forward_batch
+from pbs_calc.schedule import active_schedule
+
+
+def dpmq_curve(low, high, points: int = 100_000, include_dangerous: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Forward-price points evenly spaced AEMP(max) values from low to high
+    (one unit per pack, so AEMP(max) is the price entered). Returns the
+    section85_forward_batch columns, rounded to cents, plus the exact grid as
+    "aemp".
+    """
+    if points < 2 or float(high) <= float(low):
+        raise ValueError("A sweep needs at least two points and high > low.")
+    aemp = np.linspace(float(low), float(high), int(points))
+    curve = section85_forward_batch(aemp, 1, 1, include_dangerous)
+    curve["aemp"] = aemp
+    return curve
+
+
+def _aemp_for_ptp(schedule, price_to_pharmacist: Decimal) -> Decimal:
+    """AEMP(max) whose price to pharmacist is price_to_pharmacist (unrounded markup)."""
+    aemp = price_to_pharmacist - schedule.wholesale_fixed_fee
+    if aemp <= schedule.wholesale_aemp_threshold:
+        return aemp
+    aemp = price_to_pharmacist / (1 + schedule.wholesale_markup_rate)
+    if aemp <= schedule.wholesale_tier2_cap:
+        return aemp
+    return price_to_pharmacist - schedule.wholesale_flat_fee
+
+
+def _percent(rate: Decimal) -> str:
+    return f"{(rate * 100).normalize():f}%"
+
+
+def breakpoints(include_dangerous: bool = False) -> list:
+    """
+    Tier boundaries of the active fee schedule in AEMP(max) terms, in AEMP
+    order: the two wholesale thresholds and the AEMPs at which the price to
+    pharmacist reaches the AHI caps. Each entry carries the DPMQ at the
+    boundary and one cent above it.
+    """
+    schedule = active_schedule()
+    rate = _percent(schedule.wholesale_markup_rate)
+    marks = [
+        (schedule.wholesale_aemp_threshold,
+         f"Wholesale: ${schedule.wholesale_fixed_fee} fixed → {rate} (AEMP ${schedule.wholesale_aemp_threshold})"),
+        (schedule.wholesale_tier2_cap,
+         f"Wholesale: {rate} → ${schedule.wholesale_flat_fee} flat (AEMP ${schedule.wholesale_tier2_cap})"),
+        (_aemp_for_ptp(schedule, schedule.ahi_tier1_cap),
+         f"AHI: ${schedule.ahi_base} base → +{_percent(schedule.ahi_rate)} (PtP ${schedule.ahi_tier1_cap})"),
+        (_aemp_for_ptp(schedule, schedule.ahi_tier2_cap),
+         f"AHI: +{_percent(schedule.ahi_rate)} → ${schedule.ahi_max_fee} cap (PtP ${schedule.ahi_tier2_cap})"),
+    ]
+    marks.sort(key=lambda mark: mark[0])
+
+    aemp = np.array([float(value) for value, _ in marks])
+    at = section85_forward_batch(aemp, 1, 1, include_dangerous)["dpmq"]
+    above = section85_forward_batch(aemp + 0.01, 1, 1, include_dangerous)["dpmq"]
+    return [
+        {"aemp": float(round(value, 2)), "label": label, "dpmq_at": float(dpmq_at), "dpmq_above": float(dpmq_above)}
+        for (value, label), dpmq_at, dpmq_above in zip(marks, at, above)
+    ]
+
+
+def downsample_minmax(x: np.ndarray, y: np.ndarray, max_points: int = 2_000) -> tuple:
+    """
+    Thin (x, y) to at most max_points for drawing by keeping, in each of
+    max_points / 2 equal runs of points, the lowest and highest y (plus the
+    first and last point). Steps and dips survive, unlike plain striding.
+    """
+    x, y = np.asarray(x), np.asarray(y, dtype=np.float64)
+    size = len(y)
+    if size <= max_points:
+        return x, y
+
+    buckets = max(1, (max_points - 2) // 2)
+    width = -(-size // buckets)
+    padded = np.full(buckets * width, np.nan)
+    padded[:size] = y
+    runs = padded.reshape(buckets, width)
+    used = ~np.isnan(runs).all(axis=1)
+    offsets = np.arange(buckets)[used] * width
+    runs = runs[used]
+    keep = np.concatenate([
+        [0, size - 1],
+        offsets + np.nanargmin(runs, axis=1),
+        offsets + np.nanargmax(runs, axis=1),
+    ])
+    keep = np.unique(keep)
+    return x[keep], y[keep]
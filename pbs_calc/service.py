@@ -0,0 +1,360 @@
+# pbs_calc/service.py
+"""
+Self-hosted HTTP/JSON pricing service (standard library only, works offline).
+
+    python -m pbs_calc serve --port 8585
+
+    POST /v1/section85/forward        {"price": 12.5, "pricing_qty": 30, "max_qty": 60, "dangerous": false}
+    POST /v1/section85/inverse        {"price": 900.00, "pricing_qty": 30, "max_qty": 60}
+    POST /v1/efc/forward              {"price": 310.5, "pricing_qty": 1, "vial_content": 100,
+                                       "max_amount": 250, "wastage": true, "setting": "Private"}
+    POST /v1/efc/inverse              (same fields, price is the DPMA)
+    POST /v1/<section>/<direction>/bulk   {"items": [{...}, ...]}
+    GET  /metrics                     request counts, p50/p99 latency, micro-batch sizes
+    GET  /health
+
+Items use the Batch-mode column names (pbs_calc.reprice.BATCH_COLUMNS) and
+are priced by price_chunk, the same vectorised path as the app's Batch mode
+and the reprice CLI. Concurrent single-item requests for the same endpoint are
+coalesced into micro-batches: the first request waits at most max_wait for
+company, then the whole batch is priced in one call. Add "effective_date"
+(YYYY-MM-DD) to an item or bulk body to price with an earlier fee schedule.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import pandas as pd
+
+from pbs_calc.errors import InvalidInputError, PricingError
+from pbs_calc.reprice import BATCH_COLUMNS, RESULT_ORDER, SECTION_85, SECTION_100_EFC, TRUE_VALUES, price_chunk
+
+# /v1/<section>/<direction> -> (section, known price type)
+ROUTES = {
+    ("section85", "forward"): (SECTION_85, "AEMP"),
+    ("section85", "inverse"): (SECTION_85, "DPMQ"),
+    ("efc", "forward"): (SECTION_100_EFC, "AEMP"),
+    ("efc", "inverse"): (SECTION_100_EFC, "DPMQ"),
+}
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_WAIT = 0.002  # seconds
+
+# Requests per bulk call
+MAX_BULK_ITEMS = 100_000
+
+# Latency samples kept per endpoint for the percentiles
+LATENCY_WINDOW = 10_000
+
+_STOP = object()
+
+
+# ==============================
+# Request items
+# ==============================
+
+def parse_item(item: dict, selected_section: str, price_type: str) -> dict:
+    """
+    Batch-mode row for one JSON item, validated like the single-item UI.
+    Raises InvalidInputError for missing, non-numeric or out-of-range fields.
+    """
+    from pbs_calc.section85 import validate_dpmq_covers_fees, validate_quantities
+    from pbs_calc.section100_efc import validate_positive
+
+    if not isinstance(item, dict):
+        raise InvalidInputError("Each item must be a JSON object.")
+    spec = BATCH_COLUMNS[selected_section]
+    missing = [name for name in spec["required"] if name not in item]
+    if missing:
+        raise InvalidInputError(f"Missing field(s): {', '.join(missing)}")
+
+    row = {}
+    for name in spec["required"]:
+        try:
+            row[name] = float(item[name])
+        except (TypeError, ValueError):
+            raise InvalidInputError(f"{name} must be a number.") from None
+        if not math.isfinite(row[name]):
+            raise InvalidInputError(f"{name} must be a finite number.")
+    for name, default in spec["optional"].items():
+        row[name] = item.get(name, default)
+
+    if selected_section == SECTION_85:
+        validate_quantities(row["pricing_qty"], row["max_qty"])
+        if price_type == "DPMQ":
+            dangerous = str(row["dangerous"]).strip().lower() in TRUE_VALUES
+            validate_dpmq_covers_fees(str(row["price"]), dangerous)
+    else:
+        validate_positive("Pricing quantity", row["pricing_qty"])
+        validate_positive("Vial content (mg)", row["vial_content"])
+        validate_positive("Maximum amount (mg)", row["max_amount"])
+    return row
+
+
+def _records(priced: pd.DataFrame) -> list:
+    """Breakdown columns of each priced row as JSON-ready dicts (NaN -> null)."""
+    columns = [col for col in RESULT_ORDER if col in priced]
+    records = []
+    for values in priced[columns].itertuples(index=False, name=None):
+        record = {}
+        for name, value in zip(columns, values):
+            if hasattr(value, "item"):
+                value = value.item()
+            if isinstance(value, float) and math.isnan(value):
+                value = None
+            record[name] = value
+        records.append(record)
+    return records
+
+
+def price_items(rows: list, selected_section: str, price_type: str, effective_date: Optional[str] = None) -> list:
+    return _records(price_chunk(pd.DataFrame(rows), selected_section, price_type, effective_date))
+
+
+# ==============================
+# Metrics
+# ==============================
+
+class LatencyStats:
+    """Thread-safe rolling latency samples and counters per endpoint."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._window = window
+        self._samples = {}
+        self._counts = {}
+        self._batch_sizes = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(endpoint, deque(maxlen=self._window)).append(seconds)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+    def record_batch(self, size: int) -> None:
+        with self._lock:
+            self._batch_sizes.append(size)
+
+    @staticmethod
+    def _percentile(ordered: list, fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(math.ceil(fraction * len(ordered))) - 1)]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+            counts = dict(self._counts)
+            batches = list(self._batch_sizes)
+        endpoints = {
+            name: {
+                "requests": counts[name],
+                "p50_ms": round(self._percentile(ordered, 0.50) * 1000, 3),
+                "p99_ms": round(self._percentile(ordered, 0.99) * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3),
+            }
+            for name, ordered in samples.items()
+        }
+        return {
+            "endpoints": endpoints,
+            "micro_batches": {
+                "batches": len(batches),
+                "mean_size": round(sum(batches) / len(batches), 2) if batches else 0,
+                "max_size": max(batches, default=0),
+            },
+        }
+
+
+# ==============================
+# Micro-batching
+# ==============================
+
+class MicroBatcher:
+    """
+    Coalesce single items into batches per (section, price type, effective
+    date). Each key gets one daemon thread that takes the first waiting item,
+    collects more for up to max_wait seconds (or until max_batch), prices them
+    with one price_chunk call and resolves every caller's Future.
+    """
+
+    def __init__(self, max_batch: int = DEFAULT_MAX_BATCH, max_wait: float = DEFAULT_MAX_WAIT,
+                 stats: Optional[LatencyStats] = None):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = stats
+        self._queues = {}
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, row: dict, selected_section: str, price_type: str,
+               effective_date: Optional[str] = None) -> Future:
+        key = (selected_section, price_type, effective_date)
+        pending = self._queues.get(key)
+        if pending is None:
+            with self._lock:
+                pending = self._queues.get(key)
+                if pending is None:
+                    pending = self._queues[key] = queue.SimpleQueue()
+                    thread = threading.Thread(target=self._run, args=(key, pending), daemon=True,
+                                              name=f"micro-batch-{selected_section}-{price_type}")
+                    thread.start()
+                    self._threads.append(thread)
+        future = Future()
+        pending.put((row, future))
+        return future
+
+    def _run(self, key: tuple, pending: queue.SimpleQueue) -> None:
+        while True:
+            entry = pending.get()
+            if entry is _STOP:
+                return
+            batch = [entry]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    entry = pending.get(timeout=timeout) if timeout > 0 else pending.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._price(key, batch)
+            if stop:
+                return
+
+    def _price(self, key: tuple, batch: list) -> None:
+        selected_section, price_type, effective_date = key
+        try:
+            records = price_items([row for row, _ in batch], selected_section, price_type, effective_date)
+        except Exception as exc:  # every waiting caller gets the failure
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        if self.stats is not None:
+            self.stats.record_batch(len(batch))
+        for (_, future), record in zip(batch, records):
+            future.set_result(record)
+
+    def close(self) -> None:
+        with self._lock:
+            for pending in self._queues.values():
+                pending.put(_STOP)
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout=1)
+
+
+# ==============================
+# HTTP
+# ==============================
+
+class PricingHandler(BaseHTTPRequestHandler):
+    server_version = "pbs-calc"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, {"error": message})
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._send(200, self.server.stats.snapshot())
+        else:
+            self._error(404, f"Unknown path {self.path}")
+
+    def do_POST(self) -> None:
+        started = time.perf_counter()
+        parts = self.path.strip("/").split("/")
+        bulk = len(parts) == 4 and parts[3] == "bulk"
+        route = ROUTES.get(tuple(parts[1:3])) if parts[0] == "v1" and len(parts) in (3, 4) else None
+        if route is None or (len(parts) == 4 and not bulk):
+            self._error(404, f"Unknown path {self.path}")
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, UnicodeDecodeError):
+            self._error(400, "Request body must be JSON.")
+            return
+        if not isinstance(body, dict):
+            self._error(400, "Request body must be a JSON object.")
+            return
+
+        selected_section, price_type = route
+        effective_date = body.get("effective_date")
+        try:
+            if effective_date is not None:
+                from pbs_calc.schedule import schedule_for
+
+                schedule_for(effective_date)
+            if bulk:
+                items = body.get("items")
+                if not isinstance(items, list):
+                    raise InvalidInputError("Bulk requests need an \"items\" list.")
+                if len(items) > MAX_BULK_ITEMS:
+                    raise InvalidInputError(f"At most {MAX_BULK_ITEMS:,} items per bulk request.")
+                rows = [parse_item(item, selected_section, price_type) for item in items]
+                response = {"results": price_items(rows, selected_section, price_type, effective_date) if rows else [],
+                            "count": len(rows)}
+            else:
+                row = parse_item(body, selected_section, price_type)
+                future = self.server.batcher.submit(row, selected_section, price_type, effective_date)
+                response = {"result": future.result()}
+        except PricingError as exc:
+            self._error(422, str(exc))
+            return
+        except Exception as exc:
+            self._error(500, f"Pricing failed: {exc}")
+            return
+
+        self._send(200, response)
+        self.server.stats.record("/".join(parts[1:]), time.perf_counter() - started)
+
+
+class PricingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # bursts of concurrent clients, not the default 5
+
+    def __init__(self, address: tuple, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait: float = DEFAULT_MAX_WAIT, verbose: bool = False):
+        super().__init__(address, PricingHandler)
+        self.verbose = verbose
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(max_batch, max_wait, self.stats)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.batcher.close()
+
+
+def serve(host: str = "127.0.0.1", port: int = 8585, max_batch: int = DEFAULT_MAX_BATCH,
+          max_wait: float = DEFAULT_MAX_WAIT, verbose: bool = False) -> None:
+    """Run the service until interrupted."""
+    with PricingServer((host, port), max_batch, max_wait, verbose) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,400 @@
+# pbs_calc/store.py
+"""
+Optional on-disk result cache shared by every process on the machine.
+
+    PBS_RESULT_CACHE=1              .pbs_cache/results.sqlite (or PBS_CALC_CACHE_DIR)
+    PBS_RESULT_CACHE=/path/to/db    that file
+    PBS_RESULT_CACHE_ENTRIES        most results kept (default 1,000,000)
+
+Calculators memoised with @memoise(persist=True) look here after a miss in
+their in-process LRU and before calculating. A result solved by yesterday's
+CLI run or another worker is then read rather than solved again. That is
+the Section 85 DPMQ -> AEMP solve (calculate_inverse_aemp_max), which the
+app's single-item path calls, and the EFC breakdowns; the batch engines
+consult the store for the rows they hand to those calculators.
+Keys are the calculator, the fee-schedule version and the normalised inputs.
+Values are Decimals (or dicts of them) stored as exact strings.
+
+SQLite runs in WAL mode, so readers do not wait for a writer: each thread
+reads through its own connection, without the store's lock, which only guards
+the write buffers. New results, and the last-used time of hits, are buffered
+and written in one transaction per WRITE_BATCH (or FLUSH_SECONDS, and at
+process exit).
+Past the entry limit the least recently used results are evicted, plus a
+tenth of the limit so eviction does not run on every write. Any SQLite error
+disables the store for the process; pricing carries on without it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from decimal import Decimal
+from typing import Optional
+
+from pbs_calc.diagnostics import count
+from pbs_calc.lookup import lookup_dir
+from pbs_calc.precision import PRICING_CONTEXT
+
+DEFAULT_ENTRIES = 1_000_000
+
+# Buffered results written per transaction, and the longest they wait
+WRITE_BATCH = 256
+FLUSH_SECONDS = 2.0
+
+# Share of the entry limit evicted beyond the excess, once the limit is passed
+EVICT_FRACTION = 0.1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    calculator TEXT NOT NULL,
+    schedule TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (calculator, schedule, key)
+);
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+"""
+
+
+# ==============================
+# Configuration
+# ==============================
+
+def default_store_path() -> str:
+    return os.path.join(lookup_dir(), "results.sqlite")
+
+
+def store_path() -> Optional[str]:
+    """Database file from PBS_RESULT_CACHE, or None when the store is off (the default)."""
+    setting = os.environ.get("PBS_RESULT_CACHE", "").strip()
+    if setting in ("", "0"):
+        return None
+    if setting == "1":
+        return default_store_path()
+    return setting
+
+
+def store_entries() -> int:
+    return int(os.environ.get("PBS_RESULT_CACHE_ENTRIES", DEFAULT_ENTRIES))
+
+
+# ==============================
+# Encoding
+# ==============================
+
+def key_text(args: tuple, kwargs: tuple) -> str:
+    """Normalised arguments (see pbs_calc.cache.normalise) as JSON; 900 and 900.00 give the same key."""
+    def plain(value):
+        return str(value.normalize(PRICING_CONTEXT)) if isinstance(value, Decimal) else value
+
+    return json.dumps([[plain(arg) for arg in args], [[name, plain(arg)] for name, arg in kwargs]])
+
+
+def encode(value) -> Optional[str]:
+    """Exact JSON for a Decimal or a dict of Decimals; None for anything else (not stored)."""
+    if isinstance(value, Decimal):
+        return json.dumps(str(value))
+    if isinstance(value, dict) and all(isinstance(item, Decimal) for item in value.values()):
+        return json.dumps({name: str(item) for name, item in value.items()})
+    return None
+
+
+def decode(text: str):
+    value = json.loads(text)
+    if isinstance(value, dict):
+        return {name: Decimal(item) for name, item in value.items()}
+    return Decimal(value)
+
+
+# ==============================
+# Store
+# ==============================
+
+class ResultStore:
+    """One SQLite file of results. Thread-safe; a forked child opens its own connections."""
+
+    def __init__(self, path: str, max_entries: Optional[int] = None):
+        import sqlite3  # only when the store is on
+
+        self.path = path
+        self.max_entries = max_entries or store_entries()
+        self.disabled = False
+        self.hits = self.misses = self.writes = self.evictions = 0
+        self._sqlite3 = sqlite3
+        self._errors = (OSError, sqlite3.Error)
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._local = threading.local()  # per-thread read connection: (pid, connection)
+        self._pending = {}  # (calculator, schedule, key) -> value text
+        self._touched = set()
+        self._last_flush = time.monotonic()
+        self._rows = 0
+
+    def _connect(self):
+        if self._pid != os.getpid():
+            from multiprocessing import util
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = self._sqlite3.connect(self.path, timeout=5.0, isolation_level=None,
+                                               check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._rows = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            # After a fork the parent still owns (and writes) what it had buffered
+            if self._pid is not None:
+                self._pending.clear()
+                self._touched.clear()
+            self._connection, self._pid = connection, os.getpid()
+            # Run at exit by the main process and by pool workers alike; a forked
+            # child starts with none, so each process registers its own
+            util.Finalize(self, self.flush, exitpriority=10)
+        return self._connection
+
+    def _reader(self):
+        """This thread's read connection, opened (after the writer set up the file) on first use."""
+        reader = getattr(self._local, "reader", None)
+        if reader is None or reader[0] != os.getpid():
+            with self._lock:
+                self._connect()
+            connection = self._sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            reader = self._local.reader = (os.getpid(), connection)
+        return reader[1]
+
+    def _disable(self) -> None:
+        count("store.error")
+        self.disabled = True
+        self._pending.clear()
+        self._touched.clear()
+
+    def get(self, calculator: str, schedule: str, key: str):
+        """Cached value, or None."""
+        entry = (calculator, schedule, key)
+        if self.disabled:
+            return None
+        text = self._pending.get(entry)
+        stored = text is None
+        try:
+            if stored:
+                row = self._reader().execute(
+                    "SELECT value FROM results WHERE calculator = ? AND schedule = ? AND key = ?", entry,
+                ).fetchone()
+                if row is None:
+                    with self._lock:
+                        self.misses += 1
+                    return None
+                text = row[0]
+            with self._lock:
+                if self.disabled:
+                    return None
+                if stored:
+                    self._touched.add(entry)
+                self.hits += 1
+                self._flush_if_due()
+        except self._errors:
+            with self._lock:
+                self._disable()
+            return None
+        return decode(text)
+
+    def put(self, calculator: str, schedule: str, key: str, value) -> None:
+        text = encode(value)
+        if text is None:
+            return
+        with self._lock:
+            if self.disabled:
+                return
+            self._pending[(calculator, schedule, key)] = text
+            try:
+                self._flush_if_due()
+            except self._errors:
+                self._disable()
+
+    def _flush_if_due(self) -> None:
+        if (len(self._pending) + len(self._touched) >= WRITE_BATCH
+                or time.monotonic() - self._last_flush >= FLUSH_SECONDS):
+            self._flush()
+
+    def _flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._pending and not self._touched:
+            return
+        connection = self._connect()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                                   [(*entry, text, now) for entry, text in self._pending.items()])
+            connection.executemany(
+                "UPDATE results SET used = ? WHERE calculator = ? AND schedule = ? AND key = ?",
+                [(now, *entry) for entry in self._touched],
+            )
+            self._rows += len(self._pending)  # an upper bound: replaced rows are counted again
+            if self._rows > self.max_entries:
+                self._evict(connection)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        if self._pending:
+            self.writes += len(self._pending)
+            count("store.written", len(self._pending))
+        self._pending.clear()
+        self._touched.clear()
+
+    def _evict(self, connection) -> None:
+        self._rows = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = self._rows - self.max_entries
+        if excess <= 0:
+            return
+        evict = excess + int(self.max_entries * EVICT_FRACTION)
+        deleted = connection.execute(
+            "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY used LIMIT ?)", (evict,),
+        ).rowcount
+        self._rows -= deleted
+        self.evictions += deleted
+        count("store.evicted", deleted)
+
+    def flush(self) -> None:
+        """Write everything buffered now."""
+        with self._lock:
+            if self.disabled:
+                return
+            try:
+                self._flush()
+            except self._errors:
+                self._disable()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = self._pid = None
+            # Other threads' read connections close with their threads
+            reader = getattr(self._local, "reader", None)
+            if reader is not None and reader[0] == os.getpid():
+                reader[1].close()
+            self._local.reader = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._rows
+            if not self.disabled:
+                try:
+                    entries = self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                except self._errors:
+                    self._disable()
+            return {"path": self.path, "entries": entries, "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses, "writes": self.writes,
+                    "pending": len(self._pending), "evictions": self.evictions, "disabled": self.disabled}
+
+
+# ==============================
+# Process-wide store
+# ==============================
+
+_store = None
+_configured = False
+_store_lock = threading.Lock()
+
+
+def _open(path: Optional[str], max_entries: Optional[int] = None) -> Optional[ResultStore]:
+    return None if path is None else ResultStore(path, max_entries)
+
+
+def active_store() -> Optional[ResultStore]:
+    """The store PBS_RESULT_CACHE configures (opened on first use), or None when it is off."""
+    global _store, _configured
+    if not _configured:
+        with _store_lock:
+            if not _configured:
+                _store = _open(store_path())
+                _configured = True
+    return _store
+
+
+def use_store(path: Optional[str], max_entries: Optional[int] = None) -> Optional[ResultStore]:
+    """Replace the process-wide store (None turns it off); returns the new one."""
+    global _store, _configured
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = _open(path, max_entries)
+        _configured = True
+    return _store
+
+
+# ==============================
+# Warm-up
+# ==============================
+
+def _plain(value):
+    return value.item() if hasattr(value, "item") else value  # NumPy scalars from the file
+
+
+def warm_store(input_path: str, selected_section: str, price_type: str,
+               effective_date: Optional[str] = None, progress=None) -> dict:
+    """
+    Price every row of an items file (the reprice columns) through the stored
+    calculators, so the active store holds their results before the app or a
+    job needs them. Rows the single-item UI would reject (a DPMQ below the
+    fees, zero quantities) or the calculators cannot price are skipped, not
+    stored. Returns the rows priced and skipped plus the store's stats.
+    """
+    from pbs_calc import section85, section100_efc
+    from pbs_calc.errors import PricingError
+    from pbs_calc.reprice import (
+        SECTION_85, flag_values, missing_columns, pricing_columns, read_chunks, setting_values,
+    )
+    from pbs_calc.schedule import using_schedule
+
+    store = active_store()
+    if store is None:
+        raise ValueError("The result store is off; set PBS_RESULT_CACHE or pass a database path.")
+    if selected_section == SECTION_85 and price_type != "DPMQ":
+        raise ValueError("Only the Section 85 DPMQ -> AEMP solve is stored; warm it with DPMQs (inverse).")
+
+    def section85_row(price, pricing_qty, max_qty, dangerous):
+        section85.validate_quantities(pricing_qty, max_qty)
+        section85.validate_dpmq_covers_fees(price, dangerous)
+        section85.calculate_section85_inverse(price, pricing_qty, max_qty, dangerous)
+
+    def efc_row(price, pricing_qty, vial_content, max_amount, wastage, setting):
+        section100_efc.validate_positive("Pricing quantity", pricing_qty)
+        section100_efc.validate_positive("Vial content (mg)", vial_content)
+        section100_efc.validate_positive("Maximum amount (mg)", max_amount)
+        calculate = (section100_efc.calculate_efc_inverse if price_type == "DPMQ"
+                     else section100_efc.calculate_efc_forward)
+        calculate(price, pricing_qty, vial_content, max_amount, wastage, setting)
+
+    priced = skipped = 0
+    with using_schedule(effective_date):
+        for chunk in read_chunks(input_path, 50_000, pricing_columns(selected_section)):
+            missing = missing_columns(chunk, selected_section)
+            if missing:
+                raise ValueError(f"Missing column(s): {', '.join(missing)}")
+            if selected_section == SECTION_85:
+                price_row = section85_row
+                rows = zip(chunk["price"], chunk["pricing_qty"], chunk["max_qty"],
+                           flag_values(chunk, "dangerous", False))
+            else:
+                price_row = efc_row
+                rows = zip(chunk["price"], chunk["pricing_qty"], chunk["vial_content"], chunk["max_amount"],
+                           flag_values(chunk, "wastage", False), setting_values(chunk))
+            for row in rows:
+                try:
+                    price_row(*(_plain(value) for value in row))
+                    priced += 1
+                except (PricingError, ArithmeticError):
+                    skipped += 1
+            if progress:
+                progress(priced + skipped)
+    store.flush()
+    return {"priced": priced, "skipped": skipped, **store.stats()}
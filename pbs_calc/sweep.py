@@ -0,0 +1,187 @@
+# pbs_calc/sweep.py
+"""
+Exhaustive round-trip verification over every cent of a price range.
+
+    python -m pbs_calc sweep --low 13.79 --high 5000.00 --output drift.csv
+
+For each cent, and each variant (Section 85 with and without the dangerous
+drug fee, Section 100 EFC for every setting / wastage combination at each of
+EFC_QUANTITIES):
+
+  *_dpmq   forward(inverse(DPMQ)): the unrounded AEMP the inverse finds is
+           priced forward again and the DPMQ, rounded to cents, compared with
+           the one entered (what validate_calculation_precision_enhanced does
+           for the single value on screen).
+  *_aemp   inverse(forward(AEMP)): the DPMQ forward pricing publishes (rounded
+           to cents) is reversed and the AEMP, rounded to cents, compared with
+           the one entered.
+
+Every value whose reconstruction is off by more than the tolerance is
+reported. The range is split into chunks priced across all CPU cores.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import Iterator, Optional
+
+from pbs_calc.cache import bypassing_caches
+from pbs_calc.precision import to_cents
+
+DEFAULT_TOLERANCE = Decimal("0.005")
+
+# Cents per task handed to a worker
+DEFAULT_CHUNK_CENTS = 20_000
+
+# Quantities used for every case. Section 85 prices one unit per pack so the
+# unrounded AEMP(max) can be fed straight back in. EFC sweeps each
+# (pricing_qty, vial_content, max_amount): a part-vial dose (2.5 vs 3 vials
+# with wastage), a fractional vial content over a multi-unit price, and a
+# whole number of vials, where wastage changes nothing.
+SECTION85_QUANTITIES = (1, 1)
+EFC_QUANTITIES = (
+    (1, Decimal("100"), Decimal("250")),
+    (10, Decimal("12.5"), Decimal("70")),
+    (100, Decimal("500"), Decimal("1000")),
+)
+
+SECTION85_VARIANTS = (False, True)
+EFC_VARIANTS = tuple((wastage, setting) for setting in ("Public", "Private") for wastage in (False, True))
+
+DRIFT_COLUMNS = ["check", "variant", "price", "reconstructed", "drift"]
+
+
+def _prices(start_cents: int, stop_cents: int) -> Iterator[Decimal]:
+    for cents in range(start_cents, stop_cents + 1):
+        yield Decimal(cents).scaleb(-2)
+
+
+# ==============================
+# One chunk (runs in a worker)
+# ==============================
+
+def sweep_chunk(start_cents: int, stop_cents: int, tolerance: Decimal = DEFAULT_TOLERANCE,
+                backend: Optional[str] = None, effective_date: Optional[str] = None) -> dict:
+    """
+    Round-trip every cent from start_cents to stop_cents (inclusive) through
+    every check and variant. Returns {"cases": {check: n}, "drifts": [row, ...]}
+    with rows keyed by DRIFT_COLUMNS.
+    """
+    from pbs_calc.backends import efc_backend, section85_backend
+    from pbs_calc.schedule import using_schedule
+
+    section85 = section85_backend(backend)
+    efc = efc_backend(backend)
+    s85_forward = section85.calculate_section85_forward
+    s85_inverse = section85.calculate_section85_inverse
+    efc_forward = efc.calculate_efc_forward
+    efc_inverse = efc.calculate_efc_inverse
+    pricing_qty, max_qty = SECTION85_QUANTITIES
+
+    cases = dict.fromkeys(("section85_dpmq", "section85_aemp", "efc_dpmq", "efc_aemp"), 0)
+    drifts = []
+
+    def check(name, variant, price, reconstructed):
+        cases[name] += 1
+        drift = reconstructed - price
+        if abs(drift) > tolerance:
+            drifts.append({"check": name, "variant": variant, "price": price,
+                           "reconstructed": reconstructed, "drift": drift})
+
+    # Millions of one-off prices would only churn the LRUs and the result store
+    with using_schedule(effective_date) as schedule, bypassing_caches():
+        for include_dangerous in SECTION85_VARIANTS:
+            variant = "dangerous" if include_dangerous else "standard"
+            floor = schedule.minimum_dpmq + (schedule.dangerous_fee if include_dangerous else 0)
+            for price in _prices(start_cents, stop_cents):
+                if price >= floor:
+                    aemp = s85_inverse(price, pricing_qty, max_qty, include_dangerous)["aemp_max_qty"]
+                    dpmq = s85_forward(aemp, pricing_qty, max_qty, include_dangerous)["final_price"]
+                    check("section85_dpmq", variant, price, to_cents(dpmq))
+
+                dpmq = to_cents(s85_forward(price, pricing_qty, max_qty, include_dangerous)["final_price"])
+                aemp = s85_inverse(dpmq, pricing_qty, max_qty, include_dangerous)["aemp_max_qty"]
+                check("section85_aemp", variant, price, to_cents(aemp))
+
+        for wastage, setting in EFC_VARIANTS:
+            ahi_fee = schedule.efc_ahi_private if setting == "Private" else schedule.efc_ahi_public
+            for quantities in EFC_QUANTITIES:
+                variant = f"{setting.lower()}{'_wastage' if wastage else ''}/{'/'.join(map(str, quantities))}"
+                for price in _prices(start_cents, stop_cents):
+                    if price > ahi_fee:
+                        aemp = efc_inverse(price, *quantities, wastage, setting)["aemp_max_qty"]
+                        dpma = efc_forward(aemp, *quantities, wastage, setting)["final_price"]
+                        check("efc_dpmq", variant, price, to_cents(dpma))
+
+                    dpma = to_cents(efc_forward(price, *quantities, wastage, setting)["final_price"])
+                    aemp = efc_inverse(dpma, *quantities, wastage, setting)["aemp_max_qty"]
+                    check("efc_aemp", variant, price, to_cents(aemp))
+
+    return {"cases": cases, "drifts": drifts}
+
+
+# ==============================
+# Whole range (fans out over cores)
+# ==============================
+
+def round_trip_sweep(
+    low: Decimal,
+    high: Decimal,
+    tolerance: Decimal = DEFAULT_TOLERANCE,
+    workers: Optional[int] = None,
+    chunk_cents: int = DEFAULT_CHUNK_CENTS,
+    backend: Optional[str] = None,
+    effective_date: Optional[str] = None,
+    progress=None,
+) -> dict:
+    """
+    Sweep every cent from low to high (inclusive) across a process pool (one
+    worker per core by default). Returns {"cases": {check: n}, "drifts": [...],
+    "seconds": elapsed}, drifts in check / variant / price order; progress, if
+    given, is called with the number of cents done after each chunk.
+    """
+    start, stop = int(Decimal(low) * 100), int(Decimal(high) * 100)
+    if start < 1 or stop < start:
+        raise ValueError("The sweep range must be positive, with low <= high.")
+    workers = workers or os.cpu_count() or 1
+    chunks = [(first, min(first + chunk_cents - 1, stop)) for first in range(start, stop + 1, chunk_cents)]
+
+    cases = {}
+    drifts = []
+    done = 0
+    started = time.perf_counter()
+
+    def collect(result, first, last):
+        nonlocal done
+        for name, count in result["cases"].items():
+            cases[name] = cases.get(name, 0) + count
+        drifts.extend(result["drifts"])
+        done += last - first + 1
+        if progress:
+            progress(done)
+
+    if workers == 1 or len(chunks) == 1:
+        for first, last in chunks:
+            collect(sweep_chunk(first, last, tolerance, backend, effective_date), first, last)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(pool.submit(sweep_chunk, first, last, tolerance, backend, effective_date), first, last)
+                       for first, last in chunks]
+            for future, first, last in futures:
+                collect(future.result(), first, last)
+
+    drifts.sort(key=lambda row: (row["check"], row["variant"], row["price"]))
+    return {"cases": cases, "drifts": drifts, "seconds": time.perf_counter() - started}
+
+
+def drift_summary(result: dict) -> list:
+    """Per check: cases, values beyond tolerance and the largest absolute drift."""
+    rows = []
+    for name, cases in result["cases"].items():
+        drifts = [row["drift"] for row in result["drifts"] if row["check"] == name]
+        rows.append({"check": name, "cases": cases, "drifts": len(drifts),
+                     "max_drift": max((abs(drift) for drift in drifts), default=Decimal("0.00"))})
+    return rows
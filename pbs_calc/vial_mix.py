@@ -0,0 +1,171 @@
+# pbs_calc/vial_mix.py
+"""
+Cheapest mix of vial strengths covering a Section 100 EFC maximum amount.
+
+calculate_vials_needed assumes one vial content and rounds the count up. When
+a product comes in several strengths, the cheapest AEMP(max amount) is the
+whole-vial combination that covers the dose at the lowest cost:
+
+    optimise_vial_mix({100: "310.50", 500: "1420.00"}, max_amount=730)
+    # {"vials": {Decimal("100"): 3, Decimal("500"): 1}, "vial_count": 4,
+    #  "total_content": Decimal("800"), "wastage": Decimal("70"), "aemp_max_qty": Decimal("2351.50000000"), ...}
+
+Ties on cost go to the mix with the least wastage, then the fewest vials.
+
+The solver is a dynamic programme over the amount, in steps of the greatest
+common divisor of the vial contents (no mix can land between steps). The
+table is memoised per set of strengths and only ever extended, so pricing a
+whole catalogue of doses for one product (optimise_vial_mixes) costs one pass
+up to the largest dose.
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+import threading
+from decimal import Decimal
+from typing import Iterable, Mapping, Union
+
+from pbs_calc.errors import InvalidInputError
+from pbs_calc.fixed_point import from_units, to_units
+from pbs_calc.precision import pricing_context
+
+# Largest number of amount steps a single table may hold
+MAX_STEPS = 2_000_000
+
+Vials = Union[Mapping, Iterable]
+
+
+def _decimal(value) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def normalise_vials(vials: Vials) -> tuple:
+    """
+    ((content, price), ...) sorted by content from a {content: price} mapping or
+    (content, price) pairs. Duplicate strengths keep the cheapest price.
+    """
+    pairs = vials.items() if isinstance(vials, Mapping) else vials
+    cheapest = {}
+    for content, price in pairs:
+        content, price = _decimal(content), _decimal(price)
+        if content <= 0:
+            raise InvalidInputError("Vial content must be greater than zero.")
+        if price < 0:
+            raise InvalidInputError("Vial price cannot be negative.")
+        if content not in cheapest or price < cheapest[content]:
+            cheapest[content] = price
+    if not cheapest:
+        raise InvalidInputError("At least one vial strength is required.")
+    return tuple(sorted(cheapest.items()))
+
+
+class _MixTable:
+    """
+    best[n] = (cost, covered steps, vials, last strength index) of the cheapest
+    mix covering n steps; extended under a lock as larger amounts are asked for.
+    """
+
+    __slots__ = ("contents", "sizes", "prices", "step", "best", "lock")
+
+    def __init__(self, vials: tuple):
+        self.contents = [content for content, _ in vials]
+        places = max(-content.as_tuple().exponent for content in self.contents)
+        places = max(places, 0)
+        scaled = [int(content.scaleb(places)) for content in self.contents]
+        divisor = functools.reduce(math.gcd, scaled)
+        self.sizes = [size // divisor for size in scaled]
+        self.step = Decimal(divisor).scaleb(-places)
+        self.prices = [to_units(price) for _, price in vials]
+        self.best = [(0, 0, 0, -1)]
+        self.lock = threading.Lock()
+
+    def steps(self, max_amount: Decimal) -> int:
+        """Steps needed to cover max_amount (a partial step needs a whole one)."""
+        steps = math.ceil(max_amount / self.step)
+        if steps > MAX_STEPS:
+            raise InvalidInputError(
+                f"Maximum amount {max_amount} needs {steps:,} steps of {self.step}; "
+                f"the optimiser is limited to {MAX_STEPS:,}."
+            )
+        return steps
+
+    def extend(self, steps: int) -> None:
+        if steps < len(self.best):
+            return
+        with self.lock:
+            best = self.best
+            options = list(enumerate(zip(self.sizes, self.prices)))
+            for n in range(len(best), steps + 1):
+                winner = None
+                for index, (size, price) in options:
+                    cost, covered, count, _ = best[n - size] if n > size else best[0]
+                    candidate = (cost + price, covered + size, count + 1, index)
+                    if winner is None or candidate[:3] < winner[:3]:
+                        winner = candidate
+                best.append(winner)
+
+    def mix(self, max_amount: Decimal) -> dict:
+        steps = self.steps(max_amount)
+        self.extend(steps)
+        cost, covered, count, _ = self.best[steps]
+
+        counts = [0] * len(self.sizes)
+        n = steps
+        while n > 0:
+            index = self.best[n][3]
+            counts[index] += 1
+            n = max(n - self.sizes[index], 0)
+
+        total_content = covered * self.step
+        return {
+            "max_amount": max_amount,
+            "vials": {content: used for content, used in zip(self.contents, counts) if used},
+            "vial_count": count,
+            "total_content": total_content,
+            "wastage": total_content - max_amount,
+            "aemp_max_qty": from_units(cost),
+        }
+
+
+@functools.lru_cache(maxsize=256)
+def _table(vials: tuple) -> _MixTable:
+    return _MixTable(vials)
+
+
+# ==============================
+# Public API
+# ==============================
+
+@pricing_context
+def optimise_vial_mix(vials: Vials, max_amount) -> dict:
+    """
+    Cheapest whole-vial mix covering max_amount. vials maps vial content (same
+    unit as max_amount, e.g. mg) to the AEMP of one vial. Returns the vial
+    count per strength, the total vials and content, the wastage and the
+    resulting AEMP(max amount).
+    """
+    max_amount = _decimal(max_amount)
+    if max_amount <= 0:
+        raise InvalidInputError("Maximum amount must be greater than zero.")
+    return _table(normalise_vials(vials)).mix(max_amount)
+
+
+@pricing_context
+def optimise_vial_mixes(vials: Vials, max_amounts: Iterable) -> list:
+    """
+    optimise_vial_mix for many dose levels of one product, in input order.
+    The table is built once, up to the largest dose.
+    """
+    max_amounts = [_decimal(amount) for amount in max_amounts]
+    if any(amount <= 0 for amount in max_amounts):
+        raise InvalidInputError("Maximum amount must be greater than zero.")
+    table = _table(normalise_vials(vials))
+    if max_amounts:
+        table.extend(table.steps(max(max_amounts)))
+    return [table.mix(amount) for amount in max_amounts]
+
+
+def clear_vial_mix_cache() -> None:
+    _table.cache_clear()
@@ -0,0 +1,79 @@
+# price_sweep.py
+
+from __future__ import annotations
+
+import pandas as pd
+import streamlit as st
+
+from pbs_calc.cache import fee_schedule_version
+from pbs_calc.diagnostics import stage
+from pbs_calc.sensitivity import breakpoints, downsample_minmax, dpmq_curve
+
+# Grid sizes offered in the UI
+SWEEP_POINTS = [10_000, 100_000, 1_000_000]
+
+# Points actually sent to the browser, whatever the grid size
+CHART_POINTS = 2_000
+
+# ==============================
+# Computation (cached across sessions)
+# ==============================
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _sweep(low: float, high: float, points: int, include_dangerous: bool, schedule_version: str) -> tuple:
+    """Downsampled curve and breakpoint table; only CHART_POINTS rows leave the server."""
+    curve = dpmq_curve(low, high, points, include_dangerous)
+    aemp, dpmq = downsample_minmax(curve["aemp"], curve["dpmq"], CHART_POINTS)
+    marks = [mark for mark in breakpoints(include_dangerous) if low <= mark["aemp"] <= high]
+    return pd.DataFrame({"AEMP": aemp, "DPMQ": dpmq}), pd.DataFrame(marks)
+
+
+# ==============================
+# UI
+# ==============================
+
+def render_sweep_inputs(selected_section: str):
+    """Left-column inputs; returns (low, high, points, include_dangerous) or None."""
+    if selected_section != "Section 85":
+        st.info("Sweeps are available for Section 85.")
+        return None
+    low = st.number_input("AEMP (max qty) from:", min_value=0.01, value=0.01, step=1.0, format="%.2f")
+    high = st.number_input("AEMP (max qty) to:", min_value=0.02, value=2500.00, step=100.0, format="%.2f")
+    points = st.select_slider("Points:", options=SWEEP_POINTS, value=100_000, format_func=lambda n: f"{n:,}")
+    include_dangerous = st.toggle("Include dangerous drug fee?", key="sweep_dangerous")
+    if high <= low:
+        st.error("❌ The upper AEMP must be above the lower one.")
+        return None
+    return low, high, points, include_dangerous
+
+
+def run_price_sweep(params) -> None:
+    """DPMQ against AEMP(max) with the tier breakpoints marked."""
+    if params is None:
+        return
+    import altair as alt
+
+    low, high, points, include_dangerous = params
+    with stage("pricing"):
+        curve, marks = _sweep(low, high, points, include_dangerous, fee_schedule_version())
+
+    st.markdown(f"### 📈 DPMQ SENSITIVITY ({points:,} points)")
+    chart = alt.Chart(curve).mark_line().encode(
+        x=alt.X("AEMP:Q", title="AEMP (max qty)"),
+        y=alt.Y("DPMQ:Q", title="DPMQ"),
+        tooltip=[alt.Tooltip("AEMP:Q", format="$,.2f"), alt.Tooltip("DPMQ:Q", format="$,.2f")],
+    )
+    if not marks.empty:
+        chart += alt.Chart(marks).mark_rule(strokeDash=[4, 4], color="grey").encode(
+            x="aemp:Q", tooltip=["label:N", alt.Tooltip("dpmq_at:Q", format="$,.2f")],
+        )
+    st.altair_chart(chart)
+    st.caption(f"Curve drawn from {len(curve):,} of {points:,} points (lowest and highest DPMQ per "
+               "interval are kept, so every step shows).")
+
+    if not marks.empty:
+        st.dataframe(
+            marks.rename(columns={"aemp": "AEMP", "label": "Breakpoint",
+                                  "dpmq_at": "DPMQ at", "dpmq_above": "DPMQ +1c"}),
+            hide_index=True,
+        )
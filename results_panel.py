@@ -0,0 +1,93 @@
+# results_panel.py
+"""
+Single-item results panel.
+
+Each (section, price type) chain is a pbs_calc.pipeline.Pipeline kept in the
+session, so a widget change recomputes only the stages downstream of the
+inputs that changed: a new maximum quantity reuses the Section 85 AEMP solve,
+a hospital setting change leaves the vial count alone. The export table is a
+stage after the breakdown, so it is rebuilt only when the breakdown changed.
+
+The panel is an st.fragment: the export format picker reruns the panel alone,
+not the whole script.
+"""
+
+from __future__ import annotations
+
+import functools
+from decimal import Decimal
+
+import streamlit as st
+
+from pbs_calc.cache import fee_schedule_version, normalise
+from pbs_calc.diagnostics import stage
+from pbs_calc.pipeline import Pipeline, Stage, new_pipeline, solve_section85_aemp_max
+from streamlit_cache import cached_inverse_aemp_max
+from ui_helpers import display_cost_breakdown, generate_cost_breakdown_df, render_export
+
+# (section, price type) -> breakdown label, export base name, download label, export widget key
+PANELS = {
+    ("Section 85", "DPMQ"): ("DPMQ", "dpmpq_breakdown", "📅 Download DPMQ Breakdown ({format})",
+                             "section85_inverse_export"),
+    ("Section 85", "AEMP"): ("AEMP", "aemp_breakdown", "📅 Download AEMP Breakdown ({format})",
+                             "section85_forward_export"),
+    ("Section 100 – EFC", "DPMQ"): ("DPMQ", "section100_inverse_dpmq", "📥 Download DPMA to AEMP breakdown ({format})",
+                                    "efc_inverse_export"),
+    ("Section 100 – EFC", "AEMP"): ("AEMP", "section100_forward_aemp", "📥 Download AEMP to DPMA breakdown ({format})",
+                                    "efc_forward_export"),
+}
+
+# Session state key holding this session's pipelines
+PIPELINES_KEY = "pricing_pipelines"
+
+ZERO = Decimal("0.00")
+
+
+def _components(breakdown: dict) -> dict:
+    """display_cost_breakdown arguments; fees a chain does not charge are zero, a missing unit AEMP is None."""
+    return {
+        "aemp_max_qty": breakdown["aemp_max_qty"],
+        "unit_aemp": breakdown.get("unit_aemp"),
+        "wholesale_markup": breakdown["wholesale_markup"],
+        "price_to_pharmacist": breakdown["price_to_pharmacist"],
+        "ahi_fee": breakdown["ahi_fee"],
+        "dispensing_fee": breakdown.get("dispensing_fee", ZERO),
+        "dangerous_fee": breakdown.get("dangerous_fee", ZERO),
+        "final_price": breakdown["final_price"],
+    }
+
+
+def _pipeline(selected_section: str, price_type: str) -> Pipeline:
+    """This session's pipeline for the chain, created on first use."""
+    pipelines = st.session_state.setdefault(PIPELINES_KEY, {})
+    key = (selected_section, price_type)
+    if key not in pipelines:
+        pipeline = new_pipeline(selected_section, price_type)
+        if key == ("Section 85", "DPMQ"):
+            # The only expensive stage: solved once across sessions, on the shared pool
+            pipeline.replace("aemp_max_qty", functools.partial(solve_section85_aemp_max, solve=cached_inverse_aemp_max))
+        label = PANELS[key][0]
+        pipeline.add(Stage("export", ("breakdown",),
+                           lambda breakdown: generate_cost_breakdown_df(**_components(breakdown), label=label)))
+        pipelines[key] = pipeline
+    return pipelines[key]
+
+
+@st.fragment
+def render_results(selected_section: str, price_type: str, inputs: dict) -> None:
+    """
+    Cost breakdown and download for one item. inputs are the chain's pipeline
+    inputs (pbs_calc.pipeline.SECTION85_INPUTS / EFC_INPUTS) without "schedule".
+    """
+    label, base_name, download_label, key = PANELS[(selected_section, price_type)]
+    pipeline = _pipeline(selected_section, price_type)
+
+    with stage("pricing"):
+        breakdown = pipeline.values(schedule=fee_schedule_version(),
+                                    **{name: normalise(value) for name, value in inputs.items()})
+
+    with stage("breakdown_display"):
+        display_cost_breakdown(**_components(breakdown), label=label)
+
+    # Breakdown file is built only if the download button is clicked
+    render_export(lambda: pipeline.value("export"), base_name, download_label, key=key)
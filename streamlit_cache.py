@@ -0,0 +1,142 @@
+# streamlit_cache.py
+"""
+Cross-session result caches for the Streamlit app.
+
+st.cache_data is shared by every session on the server, on top of the per-process
+LRU in pbs_calc.cache. Keys carry the fee-schedule version so a schedule change
+never serves stale prices, and the arithmetic backend (PBS_ARITHMETIC) that
+computed them.
+
+The Section 85 inverse solve runs on a shared worker pool (pbs_calc.inflight),
+off the session's script thread; identical solves already in flight in another
+session are awaited rather than repeated. The rest of each single-item chain
+is recomputed stage by stage per session (results_panel).
+"""
+
+from __future__ import annotations
+
+import threading
+
+import streamlit as st
+
+from pbs_calc.backends import arithmetic_backend, section85_backend
+from pbs_calc.cache import cache_stats, fee_schedule_version, normalise
+from pbs_calc.inflight import InFlight
+from pbs_calc.lookup import load_inverse_table
+from pbs_calc.schedule import active_schedule
+from pbs_calc.store import active_store
+
+# Arithmetic backend chosen at startup (PBS_ARITHMETIC=decimal|fixed)
+BACKEND = arithmetic_backend()
+
+# Entries kept per cached calculator (across all sessions)
+SHARED_CACHE_ENTRIES = 10_000
+
+# ==============================
+# Shared hit/miss counters
+# ==============================
+
+@st.cache_resource
+def _shared_counters() -> dict:
+    return {"lock": threading.Lock(), "calls": {}, "misses": {}}
+
+
+def _count(kind: str, name: str) -> None:
+    counters = _shared_counters()
+    with counters["lock"]:
+        counters[kind][name] = counters[kind].get(name, 0) + 1
+
+
+def shared_cache_stats() -> dict:
+    counters = _shared_counters()
+    with counters["lock"]:
+        return {
+            name: {"hits": calls - counters["misses"].get(name, 0),
+                   "misses": counters["misses"].get(name, 0)}
+            for name, calls in counters["calls"].items()
+        }
+
+
+# ==============================
+# Once per server process
+# ==============================
+
+@st.cache_resource
+def warm_inverse_table() -> threading.Thread:
+    """Build / memory-map the DPMQ -> AEMP table off the script thread, so the first paint never waits for it."""
+    thread = threading.Thread(target=load_inverse_table, name="pbs-lookup-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+# ==============================
+# Shared solver pool
+# ==============================
+
+@st.cache_resource
+def _solver() -> InFlight:
+    return InFlight()
+
+
+def _solve(key: tuple, calculate, *args) -> dict:
+    """calculate(*args) on the shared pool; key covers every input plus schedule and backend."""
+    return _solver().submit(key, calculate, *args).result()
+
+
+# ==============================
+# Cached calculators
+# ==============================
+
+@st.cache_data(max_entries=SHARED_CACHE_ENTRIES, show_spinner=False)
+def _inverse_aemp_max(effective_dpmq, dispensing_fee, tier: str, schedule_version: str, backend: str):
+    _count("misses", "section85_inverse")
+    module = section85_backend(backend)
+    # The schedule version fixes the lookup table and fee tiers, so it stands in for them in the key
+    return _solve(("section85_aemp_max", effective_dpmq, dispensing_fee, tier, schedule_version, backend),
+                  module.calculate_inverse_aemp_max, effective_dpmq, dispensing_fee, tier)
+
+
+def cached_inverse_aemp_max(effective_dpmq, dispensing_fee, tier: str):
+    """
+    The Section 85 inverse solve (calculate_inverse_aemp_max) through the
+    cross-session cache; the rest of the chain is cheap and recomputed per
+    session (results_panel). st.spinner only appears if the wait passes half a second.
+    """
+    _count("calls", "section85_inverse")
+    with st.spinner("Solving for AEMP…", show_time=True):
+        return _inverse_aemp_max(normalise(effective_dpmq), normalise(dispensing_fee), tier,
+                                 fee_schedule_version(), BACKEND)
+
+
+# ==============================
+# Debug panel
+# ==============================
+
+def _markdown_table(rows: list) -> str:
+    """Rows of equal-keyed dicts as a Markdown table (st.table would import pandas on every first paint)."""
+    header = list(rows[0])
+    lines = ["| " + " | ".join(header) + " |", "|" + " --- |" * len(header)]
+    lines += ["| " + " | ".join(str(row[name]) for name in header) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def render_cache_debug_panel() -> None:
+    """Collapsed expander with shared (all sessions) and in-process LRU counters."""
+    with st.expander("🛠️ Debug: cache statistics"):
+        schedule = active_schedule()
+        st.caption(f"Fee schedule effective {schedule.effective_from:%d %b %Y} "
+                   f"(version `{schedule.version}`) · arithmetic: `{BACKEND}` · "
+                   f"solves in flight: {_solver().in_flight()}")
+        st.markdown("**Shared cache (all sessions)**")
+        shared = shared_cache_stats()
+        if shared:
+            st.markdown(_markdown_table([{"calculator": name, **stats} for name, stats in sorted(shared.items())]))
+        else:
+            st.caption("No calculations yet.")
+        st.markdown("**In-process LRU (pbs_calc)**")
+        st.markdown(_markdown_table([{"calculator": name.rsplit(".", 1)[-1], **stats}
+                                     for name, stats in sorted(cache_stats().items())]))
+        store = active_store()
+        if store is not None:
+            st.markdown("**On-disk results (this process)**")
+            st.markdown(_markdown_table([store.stats()]))
@@ -0,0 +1,11 @@
+# tests/conftest.py
+"""
+Shared test setup: lookup tables and the result store are written to a
+throwaway directory instead of the repo's .pbs_cache.
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("PBS_CALC_CACHE_DIR", tempfile.mkdtemp(prefix="pbs_calc_tests_"))
+os.environ.setdefault("PBS_RESULT_CACHE", "0")
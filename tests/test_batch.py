@@ -0,0 +1,106 @@
+# tests/test_batch.py
+"""Vectorised batch pricing agrees with the single-item Decimal calculators to the cent."""
+
+import numpy as np
+import pytest
+
+from pbs_calc import batch, section85, section100_efc
+from pbs_calc.cache import bypassing_caches
+from pbs_calc.precision import to_cents
+
+ROWS = 3000
+
+S85_FORWARD = {"aemp_max_qty": "aemp_max_qty", "wholesale_markup": "wholesale_markup",
+               "price_to_pharmacist": "price_to_pharmacist", "ahi_fee": "ahi_fee", "dpmq": "final_price"}
+S85_INVERSE = {"aemp_max_qty": "aemp_max_qty", "unit_aemp": "unit_aemp", "wholesale_markup": "wholesale_markup",
+               "price_to_pharmacist": "price_to_pharmacist", "ahi_fee": "ahi_fee",
+               "reconstructed_dpmq": "final_price"}
+EFC_COLUMNS = {"aemp_max_qty": "aemp_max_qty", "wholesale_markup": "wholesale_markup",
+               "price_to_pharmacist": "price_to_pharmacist", "ahi_fee": "ahi_fee"}
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(20240801)
+
+
+def _quantities(rng):
+    # Pricing quantities that do and do not divide out, so both the fixed-point
+    # rows and the Decimal fallback are exercised
+    pricing_qty = rng.choice([1, 2, 3, 7, 28, 30], ROWS).astype(float)
+    max_qty = rng.choice([1, 2, 28, 30, 60, 90], ROWS).astype(float)
+    return pricing_qty, max_qty, rng.random(ROWS) < 0.5
+
+
+def _assert_agrees(result, i, breakdown, columns):
+    for column, key in columns.items():
+        assert result[column][i] == float(to_cents(breakdown[key])), (i, column)
+
+
+def test_forward_matches_scalar_to_the_cent(rng):
+    prices = np.round(rng.uniform(0.01, 3000, ROWS), 2)
+    pricing_qty, max_qty, dangerous = _quantities(rng)
+    result = batch.section85_forward_batch(prices, pricing_qty, max_qty, dangerous, tiers=True)
+    with bypassing_caches():
+        for i in range(ROWS):
+            breakdown = section85.calculate_section85_forward(prices[i], pricing_qty[i], max_qty[i], bool(dangerous[i]))
+            _assert_agrees(result, i, breakdown, S85_FORWARD)
+
+
+def test_forward_half_cent_ties():
+    # 10.05 * 3 / 2 = 15.075 is an exact half-cent AEMP(max); the AHI fee on an
+    # odd-cent PtP above the Tier 1 cap ends in a half cent as well
+    prices = np.array([19.95, 10.05, 66.65, 100.15])
+    result = batch.section85_forward_batch(prices, 2.0, 3.0, False)
+    for i, price in enumerate(prices):
+        breakdown = section85.calculate_section85_forward(price, 2, 3, False)
+        _assert_agrees(result, i, breakdown, S85_FORWARD)
+
+
+def test_inverse_matches_scalar_to_the_cent(rng):
+    dpmq = np.round(rng.uniform(13.0, 5000, ROWS), 2)
+    pricing_qty, max_qty, dangerous = _quantities(rng)
+    result = batch.section85_inverse_batch(dpmq, pricing_qty, max_qty, dangerous)
+    with bypassing_caches():
+        for i in range(ROWS):
+            if not result["valid"][i]:
+                continue
+            breakdown = section85.calculate_section85_inverse(dpmq[i], pricing_qty[i], max_qty[i], bool(dangerous[i]))
+            _assert_agrees(result, i, breakdown, S85_INVERSE)
+            assert result["tier"][i] == section85.get_inverse_tier_type(dpmq[i])
+
+
+@pytest.mark.parametrize("direction", ["forward", "inverse"])
+def test_efc_matches_scalar_to_the_cent(rng, direction):
+    prices = np.round(rng.uniform(0.01, 3000, ROWS), 2)
+    pricing_qty = rng.choice([1, 3, 10, 100], ROWS).astype(float)
+    vial_content = rng.choice([0.1, 12.5, 50, 100, 500], ROWS)
+    max_amount = rng.choice([0.3, 70, 100, 250, 1000], ROWS)
+    wastage = rng.random(ROWS) < 0.5
+    setting = np.where(rng.random(ROWS) < 0.5, "Private", "Public")
+    if direction == "forward":
+        batch_fn, scalar_fn, final = batch.efc_forward_batch, section100_efc.calculate_efc_forward, "final_price"
+    else:
+        batch_fn, scalar_fn, final = batch.efc_inverse_batch, section100_efc.calculate_efc_inverse, "final_price"
+
+    result = batch_fn(prices, pricing_qty, vial_content, max_amount, wastage, setting)
+    with bypassing_caches():
+        for i in range(ROWS):
+            breakdown = scalar_fn(prices[i], pricing_qty[i], vial_content[i], max_amount[i],
+                                  bool(wastage[i]), setting[i])
+            _assert_agrees(result, i, breakdown, {**EFC_COLUMNS, "dpma": final})
+
+
+def test_invalid_rows_are_flagged():
+    result = batch.section85_forward_batch(np.array([10.0, -1.0, np.nan]), np.array([1.0, 1.0, 1.0]),
+                                           np.array([1.0, 1.0, 1.0]), False)
+    assert result["valid"].tolist() == [True, False, False]
+    assert np.isnan(result["dpmq"][1:]).all()
+
+
+def test_round_half_up_matches_decimal():
+    values = np.array([1.005, 2.675, -0.005, 0.0, 123456.785, 5e10 + 0.25, -9.3e11, np.nan, np.inf])
+    rounded = batch.round_half_up(values)
+    for value, result in zip(values[:-2], rounded[:-2]):
+        assert result == float(to_cents(section85.to_decimal(value)))
+    assert np.isnan(rounded[-2]) and rounded[-1] == np.inf
@@ -0,0 +1,82 @@
+# tests/test_fixed_point.py
+"""The fixed-point backend agrees with the Decimal calculators to the cent over a price grid."""
+
+from decimal import Decimal
+
+import pytest
+
+from pbs_calc import fixed_point, section85, section100_efc
+from pbs_calc.cache import bypassing_caches
+from pbs_calc.precision import to_cents
+from pbs_calc.schedule import current_schedule
+from pbs_calc.segments import branch_bounds
+
+SCHEDULE = current_schedule()
+BREAKPOINTS = [bound for _, bound in branch_bounds(SCHEDULE, SCHEDULE.dispensing_fee) if bound is not None]
+
+# Every tier and segment: steps of $1.37 up to $5,000, plus the cents around each inverse breakpoint
+PRICES = sorted({Decimal(cents).scaleb(-2) for cents in range(1, 500_000, 137)}
+                | {to_cents(bound) + Decimal(step).scaleb(-2) for bound in BREAKPOINTS for step in (-1, 0, 1)})
+QUANTITIES = ((1, 1), (30, 60), (7, 28), (3, 2))
+EFC_SETTINGS = ((1, 100, 250), (10, Decimal("12.5"), 70), (3, 500, 1000))
+
+
+def _cents(breakdown: dict) -> dict:
+    return {key: to_cents(value) for key, value in breakdown.items()}
+
+
+@pytest.fixture(autouse=True)
+def _uncached():
+    with bypassing_caches():
+        yield
+
+
+@pytest.mark.parametrize("pricing_qty, max_qty", QUANTITIES)
+@pytest.mark.parametrize("include_dangerous", [False, True])
+def test_section85_chains_agree(pricing_qty, max_qty, include_dangerous):
+    floor = section85.minimum_dpmq(include_dangerous)
+    for price in PRICES:
+        assert _cents(fixed_point.calculate_section85_forward(price, pricing_qty, max_qty, include_dangerous)) == \
+            _cents(section85.calculate_section85_forward(price, pricing_qty, max_qty, include_dangerous)), price
+        if price >= floor:
+            assert _cents(fixed_point.calculate_section85_inverse(price, pricing_qty, max_qty, include_dangerous)) == \
+                _cents(section85.calculate_section85_inverse(price, pricing_qty, max_qty, include_dangerous)), price
+
+
+def test_section85_stages_agree():
+    fee = SCHEDULE.dispensing_fee
+    for price in PRICES:
+        assert fixed_point.get_inverse_tier_type(price) == section85.get_inverse_tier_type(price), price
+        assert fixed_point.calculate_wholesale_markup(price) == section85.calculate_wholesale_markup(price), price
+        assert fixed_point.calculate_ahi_fee(price) == section85.calculate_ahi_fee(price), price
+        assert fixed_point.calculate_price_to_pharmacist(price, "0.41") == \
+            section85.calculate_price_to_pharmacist(price, "0.41")
+        assert fixed_point.calculate_dpmq(price, "4.79", True) == section85.calculate_dpmq(price, "4.79", True)
+        assert fixed_point.calculate_inverse_dpmq(price, "4.795", fee) == \
+            section85.calculate_inverse_dpmq(price, "4.795", fee)
+        if price > fee:
+            assert to_cents(fixed_point.precise_inverse_aemp_fixed(price, fee)) == \
+                to_cents(section85.precise_inverse_aemp_fixed(price, fee)), price
+
+
+@pytest.mark.parametrize("pricing_qty, vial_content, max_amount", EFC_SETTINGS)
+@pytest.mark.parametrize("wastage", [False, True])
+@pytest.mark.parametrize("setting", ["Public", "Private"])
+def test_efc_chains_agree(pricing_qty, vial_content, max_amount, wastage, setting):
+    for price in PRICES[::5]:
+        args = (price, pricing_qty, vial_content, max_amount, wastage, setting)
+        assert _cents(fixed_point.calculate_efc_forward(*args)) == \
+            _cents(section100_efc.calculate_efc_forward(*args)), price
+        assert _cents(fixed_point.calculate_efc_inverse(*args)) == \
+            _cents(section100_efc.calculate_efc_inverse(*args)), price
+
+
+def test_rounded_quotient_ties_follow_decimal():
+    # $143.65 with the dangerous fee solves on the 1.12896 segment to a unit AEMP of
+    # exactly 171.875: Decimal's 28-digit quotient settles it as 171.88, a 1e-8 one as 171.87
+    assert fixed_point.calculate_section85_inverse(Decimal("143.65"), 3, 2, True)["unit_aemp"] == Decimal("171.88")
+    fee = SCHEDULE.dispensing_fee
+    for price in PRICES:
+        tier = section85.get_inverse_tier_type(price)
+        assert fixed_point.calculate_inverse_aemp_max(price, fee, tier) == \
+            section85.calculate_inverse_aemp_max(price, fee, tier), price
@@ -0,0 +1,46 @@
+# tests/test_impact.py
+"""Fee-schedule impact reports."""
+
+import copy
+from datetime import date
+from decimal import Decimal
+
+import pandas as pd
+
+import config
+from pbs_calc.impact import impact_totals, schedule_impact
+from pbs_calc.schedule import compile_schedule, schedule_for
+
+
+def _schedules():
+    constants = copy.deepcopy(config.PBS_CONSTANTS)
+    constants["EFFECTIVE_FROM"] = date(2025, 7, 1)
+    constants["DISPENSING_FEE"] = Decimal("8.99")
+    return schedule_for("2024-07-01"), compile_schedule(constants)
+
+
+def test_fee_rise_moves_every_dpmq():
+    old, new = _schedules()
+    items = pd.DataFrame({"item_code": ["1A", "2B"], "price": [10.0, 250.0],
+                          "pricing_qty": [1, 1], "max_qty": [1, 1], "dangerous": ["no", "no"]})
+    impact = schedule_impact(items, old, new)
+    assert impact["listing"].tolist() == ["listed", "listed"]
+    assert (impact["dpmq_change"] > 0).all()
+    assert impact_totals(impact)["dpmq_up"] == 2
+
+
+def test_rows_that_fail_to_reverse_are_failed_not_changed():
+    old, new = _schedules()
+    # A DPMQ below the fees, a zero pricing quantity and a non-numeric price cannot be reversed
+    items = pd.DataFrame({"item_code": ["OK", "LOW", "ZERO", "TEXT"], "price": ["900.00", "5.00", "900.00", "n/a"],
+                          "pricing_qty": [1, 1, 0, 1], "max_qty": [1, 1, 1, 1], "dangerous": ["no"] * 4})
+    impact = schedule_impact(items, old, new, price_type="DPMQ")
+    assert impact["listing"].tolist() == ["listed", "failed", "failed", "failed"]
+    failed = impact[impact["listing"] == "failed"]
+    assert failed[["dpmq_old", "dpmq_new", "dpmq_change"]].isna().all().all()
+    assert (failed["tier_change"] == "").all()
+
+    totals = impact_totals(impact)
+    assert (totals["listed"], totals["failed"]) == (1, 3)
+    assert totals["dpmq_up"] + totals["dpmq_down"] + totals["dpmq_unchanged"] == 1
+    assert totals["dpmq_change"] == impact.loc[0, "dpmq_change"]
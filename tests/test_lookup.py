@@ -0,0 +1,96 @@
+# tests/test_lookup.py
+"""The DPMQ -> AEMP(max) table: one per fee schedule, rebuilt when stale, and exact against the solver."""
+
+import os
+from decimal import Decimal
+
+import pytest
+
+from config import PBS_CONSTANTS
+from pbs_calc import lookup, section85
+from pbs_calc.cache import bypassing_caches
+from pbs_calc.precision import pricing_context
+from pbs_calc.schedule import compile_schedule, current_schedule, using_schedule
+from pbs_calc.segments import branch_bounds
+
+SCHEDULE = current_schedule()
+# Same rules with a higher dispensing fee and AHI base: a different version and different breakpoints
+OTHER = compile_schedule({**PBS_CONSTANTS, "DISPENSING_FEE": Decimal("9.12"), "AHI_BASE": Decimal("5.07")})
+CEILING = Decimal("3000.00")
+
+
+@pytest.fixture(autouse=True)
+def tables(tmp_path, monkeypatch):
+    monkeypatch.setenv("PBS_CALC_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("PBS_LOOKUP_CEILING", str(CEILING))
+    monkeypatch.setattr(lookup, "_tables", {})
+    monkeypatch.setattr(lookup, "_disabled", False)
+    return tmp_path
+
+
+def _cents(schedule):
+    # Every cent near a breakpoint, every 7th cent elsewhere, up to the ceiling
+    bounds = [bound for _, bound in branch_bounds(schedule, schedule.dispensing_fee) if bound is not None]
+    start, stop = int(schedule.tier1_dpmq_cap * 100) + 1, int(CEILING * 100)
+    cents = set(range(start, stop + 1, 7))
+    cents |= {int(bound * 100) + step for bound in bounds for step in range(-300, 301)}
+    return [Decimal(cent).scaleb(-2) for cent in sorted(cents) if start <= cent <= stop]
+
+
+@pytest.mark.parametrize("schedule", [SCHEDULE, OTHER], ids=["current", "other"])
+@pricing_context
+def test_table_matches_solver(schedule):
+    with using_schedule(schedule):
+        fee = schedule.dispensing_fee
+        for dpmq in _cents(schedule):
+            assert lookup.lookup_inverse_aemp_max(dpmq, fee) == section85.precise_inverse_aemp_fixed(dpmq, fee), dpmq
+    assert schedule.version in lookup._tables
+
+
+def test_one_table_per_schedule(tables):
+    with using_schedule(OTHER):
+        other = lookup.load_inverse_table()
+    current = lookup.load_inverse_table(SCHEDULE)
+
+    assert set(lookup._tables) == {SCHEDULE.version, OTHER.version}
+    assert lookup._read_header(current[2])[3] == int(SCHEDULE.version, 16)
+    assert lookup._read_header(other[2])[3] == int(OTHER.version, 16)
+    assert current[0] == int(SCHEDULE.minimum_dpmq * 100) and other[0] == int(OTHER.minimum_dpmq * 100)
+    # OTHER is not in the registry, so building the current table removed its file
+    assert os.listdir(tables) == [os.path.basename(lookup.table_path(SCHEDULE.version))]
+
+
+def test_stale_table_is_rebuilt(monkeypatch):
+    path = lookup.table_path(OTHER.version)
+    lookup.build_inverse_table(path=path, schedule=SCHEDULE)  # right file name, wrong constants
+
+    with using_schedule(OTHER):
+        start, stop, data = lookup.load_inverse_table()
+    assert lookup._read_header(data)[2:] == (lookup.TABLE_FORMAT, int(OTHER.version, 16))
+    assert (start, stop) == (int(OTHER.minimum_dpmq * 100), int(CEILING * 100))
+
+    monkeypatch.setattr(lookup, "_tables", {})
+    monkeypatch.setattr(lookup, "TABLE_FORMAT", lookup.TABLE_FORMAT + 1)
+    with using_schedule(OTHER):
+        data = lookup.load_inverse_table()[2]
+    assert lookup._read_header(data)[2] == lookup.TABLE_FORMAT
+
+
+@pricing_context
+def test_misses_fall_back_to_the_solver():
+    fee = SCHEDULE.dispensing_fee
+    assert lookup.lookup_inverse_aemp_max(Decimal("900.005"), fee) is None  # sub-cent
+    assert lookup.lookup_inverse_aemp_max(CEILING + Decimal("0.01"), fee) is None  # above the table
+    assert lookup.lookup_inverse_aemp_max(Decimal("900.00"), fee + 1) is None  # other dispensing fee
+    with bypassing_caches():
+        assert section85.calculate_inverse_aemp_max(CEILING + 1, fee, "Tier3") == \
+            section85.precise_inverse_aemp_fixed(CEILING + 1, fee)
+
+
+def test_inverse_controller_matches_solver():
+    fee = SCHEDULE.dispensing_fee
+    with bypassing_caches():
+        for dpmq in _cents(SCHEDULE):
+            tier = section85.get_inverse_tier_type(dpmq)
+            assert section85.calculate_inverse_aemp_max(dpmq, fee, tier) == \
+                section85.precise_inverse_aemp_fixed(dpmq, fee), dpmq
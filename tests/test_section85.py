@@ -0,0 +1,75 @@
+# tests/test_section85.py
+"""The closed-form inverse agrees with the bisection solver it replaced."""
+
+from decimal import Decimal
+
+import pytest
+
+from pbs_calc import section85
+from pbs_calc.cache import bypassing_caches
+from pbs_calc.precision import pricing_context
+from pbs_calc.schedule import current_schedule
+from pbs_calc.segments import branch_bounds
+
+SCHEDULE = current_schedule()
+TOLERANCE = Decimal("0.00001")
+# The last digits of a 28-digit quotient
+ROUNDING = Decimal("1e-20")
+
+
+def _reconstructed_dpmq(aemp, dispensing_fee):
+    price_to_pharmacist = aemp + section85.calculate_inverse_wholesale_markup(aemp)
+    return price_to_pharmacist + section85.calculate_inverse_ahi_fee(price_to_pharmacist) + dispensing_fee
+
+
+@pricing_context
+def _bisect(dpmq, dispensing_fee):
+    """The original solver: bisection on AEMP until the DPMQ is within 0.00001. Returns (aemp, miss)."""
+    low, high = Decimal("0.01"), Decimal("1000000.00")
+    best_aemp, best_diff = None, None
+    for _ in range(1000):
+        mid = (low + high) / 2
+        reconstructed = _reconstructed_dpmq(mid, dispensing_fee)
+        diff = abs(reconstructed - dpmq)
+        if best_diff is None or diff < best_diff:
+            best_aemp, best_diff = mid, diff
+        if diff <= TOLERANCE:
+            break
+        if reconstructed < dpmq:
+            low = mid + Decimal("0.000001")
+        elif reconstructed > dpmq:
+            high = mid - Decimal("0.000001")
+        else:
+            break
+    return best_aemp, best_diff
+
+
+def _grid(dispensing_fee):
+    # Steps of $9.97 over Tier 2 and 3, plus the five cents either side of each breakpoint
+    bounds = [bound for _, bound in branch_bounds(SCHEDULE, dispensing_fee) if bound is not None]
+    cents = set(range(int(SCHEDULE.tier1_dpmq_cap * 100) + 1, 1_000_000, 997))
+    cents |= {int(bound * 100) + step for bound in bounds for step in range(-5, 6)}
+    return [Decimal(cent).scaleb(-2) for cent in sorted(cents) if cent > SCHEDULE.tier1_dpmq_cap * 100]
+
+
+@pytest.fixture(autouse=True)
+def _uncached():
+    with bypassing_caches():
+        yield
+
+
+@pytest.mark.parametrize("dispensing_fee", [SCHEDULE.dispensing_fee, Decimal("0"), Decimal("5.55")])
+@pricing_context
+def test_closed_form_matches_bisection(dispensing_fee):
+    for dpmq in _grid(dispensing_fee):
+        expected, miss = _bisect(dpmq, dispensing_fee)
+        aemp = section85.precise_inverse_aemp_fixed(dpmq, dispensing_fee)
+        error = abs(_reconstructed_dpmq(aemp, dispensing_fee) - dpmq)
+        if miss <= TOLERANCE:
+            # Reached: to the last digit, and never above the AEMP bisection found (overlaps take the lowest)
+            assert error <= ROUNDING, dpmq
+            assert aemp <= expected + TOLERANCE, dpmq
+        else:
+            # A gap in the schedule: no AEMP reaches the DPMQ, the breakpoint is the nearest
+            assert error <= miss + ROUNDING, dpmq
+
@@ -0,0 +1,91 @@
+# tests/test_service.py
+"""price_items and the micro-batcher return the single-item breakdowns, and failures reach every caller."""
+
+import threading
+from decimal import Decimal
+
+import pytest
+
+from pbs_calc import section85, service
+from pbs_calc.cache import bypassing_caches
+from pbs_calc.errors import InvalidInputError, PricingError
+from pbs_calc.precision import to_cents
+from pbs_calc.reprice import SECTION_85
+from pbs_calc.service import LatencyStats, MicroBatcher, parse_item, price_items
+
+FORWARD_ITEMS = [{"price": price, "pricing_qty": pricing_qty, "max_qty": max_qty, "dangerous": dangerous}
+                 for price in (0.5, 12.5, 143.65, 700, 2500.01)
+                 for pricing_qty, max_qty in ((1, 1), (30, 60), (3, 2))
+                 for dangerous in (False, True)]
+INVERSE_ITEMS = [{**item, "price": dpmq} for item, dpmq in zip(FORWARD_ITEMS, (20.0, 121.69, 900.0, 821.64, 5000.0) * 6)]
+
+
+@pytest.fixture
+def batcher():
+    batcher = MicroBatcher(max_batch=8, max_wait=0.05, stats=LatencyStats())
+    yield batcher
+    batcher.close()
+
+
+def _expected(item, price_type):
+    calculator = section85.calculate_section85_forward if price_type == "AEMP" else section85.calculate_section85_inverse
+    with bypassing_caches():
+        breakdown = calculator(str(item["price"]), item["pricing_qty"], item["max_qty"], item["dangerous"])
+    return {key: to_cents(value) for key, value in breakdown.items() if key != "dispensing_fee"}
+
+
+def _assert_matches(record, item, price_type):
+    for key, cents in _expected(item, price_type).items():
+        assert Decimal(str(record[key])) == cents, (item, key)
+
+
+@pytest.mark.parametrize("price_type, items", [("AEMP", FORWARD_ITEMS), ("DPMQ", INVERSE_ITEMS)])
+def test_price_items_matches_scalar(price_type, items):
+    records = price_items([parse_item(item, SECTION_85, price_type) for item in items], SECTION_85, price_type)
+    assert len(records) == len(items)
+    for record, item in zip(records, items):
+        _assert_matches(record, item, price_type)
+
+
+def test_micro_batches_return_each_callers_result(batcher):
+    start = threading.Barrier(len(INVERSE_ITEMS))
+    futures = [None] * len(INVERSE_ITEMS)
+
+    def submit(i, item):
+        start.wait()
+        futures[i] = batcher.submit(parse_item(item, SECTION_85, "DPMQ"), SECTION_85, "DPMQ")
+
+    threads = [threading.Thread(target=submit, args=pair) for pair in enumerate(INVERSE_ITEMS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for future, item in zip(futures, INVERSE_ITEMS):
+        _assert_matches(future.result(timeout=10), item, "DPMQ")
+    batches = batcher.stats.snapshot()["micro_batches"]
+    assert batches["max_size"] <= 8
+    assert batches["batches"] < len(INVERSE_ITEMS)  # requests were coalesced
+
+
+def test_batch_failure_reaches_every_caller(batcher, monkeypatch):
+    failure = PricingError("pricing failed")
+
+    def fail(*args):
+        raise failure
+
+    monkeypatch.setattr(service, "price_items", fail)
+    futures = [batcher.submit(parse_item(item, SECTION_85, "AEMP"), SECTION_85, "AEMP") for item in FORWARD_ITEMS[:3]]
+    for future in futures:
+        assert future.exception(timeout=10) is failure
+
+
+@pytest.mark.parametrize("item", [
+    {"price": 10, "pricing_qty": 1},  # missing max_qty
+    {"price": "ten", "pricing_qty": 1, "max_qty": 1},
+    {"price": float("nan"), "pricing_qty": 1, "max_qty": 1},
+    {"price": 10, "pricing_qty": 1, "max_qty": 0},
+])
+def test_parse_item_rejects_bad_items(item):
+    with pytest.raises(InvalidInputError):
+        parse_item(item, SECTION_85, "AEMP")
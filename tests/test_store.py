@@ -0,0 +1,101 @@
+# tests/test_store.py
+"""The on-disk result store: round trips, concurrent readers, the persisted calculators and warm-up."""
+
+import threading
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from pbs_calc import batch, diagnostics, section85
+from pbs_calc.cache import clear_caches
+from pbs_calc.reprice import SECTION_85
+from pbs_calc.store import ResultStore, key_text, use_store, warm_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    yield store
+    store.close()
+
+
+def test_results_survive_a_new_store(store):
+    breakdown = {"aemp_max_qty": Decimal("812.3400000000000000000000001"), "final_price": Decimal("900.00")}
+    store.put("calc", "v1", key_text((Decimal("900.00"),), ()), breakdown)
+    assert store.get("calc", "v1", key_text((Decimal("900"),), ())) == breakdown  # buffered
+    store.flush()
+
+    reopened = ResultStore(store.path)
+    try:
+        assert reopened.get("calc", "v1", key_text((Decimal("900.00"),), ())) == breakdown
+        assert reopened.get("calc", "v2", key_text((Decimal("900.00"),), ())) is None
+    finally:
+        reopened.close()
+
+
+def test_concurrent_readers_and_writer(store):
+    values = {key_text((i,), ()): Decimal(i).scaleb(-2) for i in range(2000)}
+    for key, value in list(values.items())[:1000]:
+        store.put("calc", "v1", key, value)
+    store.flush()
+    errors = []
+
+    def read():
+        for key, value in list(values.items())[:1000]:
+            if store.get("calc", "v1", key) != value:
+                errors.append(key)
+
+    def write():
+        for key, value in list(values.items())[1000:]:
+            store.put("calc", "v1", key, value)
+
+    threads = [threading.Thread(target=read) for _ in range(4)] + [threading.Thread(target=write)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.flush()
+    assert not errors and not store.disabled
+    assert all(store.get("calc", "v1", key) == value for key, value in values.items())
+
+
+@pytest.fixture
+def active(tmp_path):
+    store = use_store(str(tmp_path / "results.sqlite"))
+    clear_caches()
+    yield store
+    use_store(None)
+    clear_caches()
+
+
+def test_inverse_solve_is_persisted(active):
+    fee = section85.active_schedule().dispensing_fee
+    expected = section85.calculate_inverse_aemp_max(Decimal("900.00"), fee, "Tier3")
+    clear_caches()
+    with diagnostics.collecting() as collector:
+        assert section85.calculate_section85_inverse(Decimal("900.00"), 30, 60)["aemp_max_qty"] == expected
+    assert collector.counters.get("store_hit.calculate_inverse_aemp_max") == 1
+
+
+def test_batch_decimal_rows_use_the_store(active):
+    # Private rows whose breakdown lands near a half cent go to calculate_efc_forward
+    columns = (np.array([120.57, 1972.59, 2053.03]), np.array([3.0, 1.0, 1.0]), np.array([7.0, 3.0, 3.0]), 250.0)
+    first = batch.efc_forward_batch(*columns, False, "Private")
+    clear_caches()
+    with diagnostics.collecting() as collector:
+        second = batch.efc_forward_batch(*columns, False, "Private")
+    assert collector.counters.get("batch.decimal_rows") == 3
+    assert collector.counters.get("store_hit.calculate_efc_forward") == 3
+    assert all(np.array_equal(first[name], second[name], equal_nan=True) for name in first)
+
+
+def test_warm_store_skips_rows_the_ui_rejects(active, tmp_path):
+    items = tmp_path / "items.csv"
+    items.write_text("price,pricing_qty,max_qty,dangerous\n"
+                     "900.00,30,60,No\n"
+                     "12.00,30,60,No\n"  # below the dispensing fee and AHI base
+                     "15.00,30,60,Yes\n"  # covers those, not the dangerous drug fee as well
+                     "900.00,0,60,No\n")
+    stats = warm_store(str(items), SECTION_85, "DPMQ")
+    assert (stats["priced"], stats["skipped"], stats["entries"]) == (1, 3, 1)
@@ -0,0 +1,78 @@
+# tests/test_vial_mix.py
+"""The vial-mix dynamic programme finds the same optimum as trying every combination."""
+
+import itertools
+import math
+from decimal import Decimal
+
+import pytest
+
+from pbs_calc.errors import InvalidInputError
+from pbs_calc.vial_mix import clear_vial_mix_cache, optimise_vial_mix, optimise_vial_mixes
+
+PRODUCTS = [
+    {100: "310.50", 500: "1420.00"},
+    {10: "45.00", 50: "205.10", 100: "399.99"},
+    {"2.5": "12.34", 4: "19.00", 15: "70.10"},  # fractional strength, step of 0.5
+    {60: "100.00", 90: "150.00", 150: "250.00"},  # price per mg equal: ties go to less wastage, fewer vials
+    {7: "1.00"},
+]
+
+
+def _brute_force(vials, max_amount):
+    """(cost, total content, vial count) of the cheapest covering mix, by enumeration."""
+    (first, first_price), *others = sorted((Decimal(str(content)), Decimal(price)) for content, price in vials.items())
+    best = None
+    for counts in itertools.product(*[range(math.ceil(max_amount / content) + 1) for content, _ in others]):
+        total = sum(count * content for count, (content, _) in zip(counts, others))
+        # Any more of the smallest strength than needed only adds cost and wastage
+        extra = max(math.ceil((max_amount - total) / first), 0)
+        candidate = (sum(count * price for count, (_, price) in zip(counts, others)) + extra * first_price,
+                     total + extra * first, sum(counts) + extra)
+        if best is None or candidate < best:
+            best = candidate
+    return best
+
+
+def _summary(mix):
+    return mix["aemp_max_qty"], mix["total_content"], mix["vial_count"]
+
+
+@pytest.fixture(autouse=True)
+def _fresh_tables():
+    clear_vial_mix_cache()
+    yield
+    clear_vial_mix_cache()
+
+
+@pytest.mark.parametrize("vials", PRODUCTS)
+def test_matches_brute_force(vials):
+    for max_amount in [Decimal(amount).scaleb(-1) for amount in range(5, 4000, 37)]:
+        mix = optimise_vial_mix(vials, max_amount)
+        assert _summary(mix) == _brute_force(vials, max_amount), max_amount
+        # The reported vials add up to the reported totals
+        prices = {Decimal(str(content)): Decimal(price) for content, price in vials.items()}
+        assert sum(mix["vials"].values()) == mix["vial_count"]
+        assert sum(content * used for content, used in mix["vials"].items()) == mix["total_content"]
+        assert sum(prices[content] * used for content, used in mix["vials"].items()) == mix["aemp_max_qty"]
+        assert mix["wastage"] == mix["total_content"] - max_amount
+
+
+def test_catalogue_matches_single_calls():
+    vials = PRODUCTS[1]
+    amounts = [730, 15, 250, "99.5", 1000, 15]
+    mixes = optimise_vial_mixes(vials, amounts)
+    clear_vial_mix_cache()
+    assert mixes == [optimise_vial_mix(vials, amount) for amount in amounts]
+
+
+@pytest.mark.parametrize("vials, max_amount", [
+    ({}, 100),
+    ({0: "1.00"}, 100),
+    ({100: "-1.00"}, 100),
+    ({100: "1.00"}, 0),
+    ({"0.001": "1.00"}, 10_000),  # more steps than the optimiser allows
+])
+def test_rejects_bad_input(vials, max_amount):
+    with pytest.raises(InvalidInputError):
+        optimise_vial_mix(vials, max_amount)
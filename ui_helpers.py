@@ -1,45 +1,52 @@
 # ui_helpers.py
+import time
 from decimal import Decimal, ROUND_HALF_UP
-import pandas as pd
 import streamlit as st
 
-# ----- tiny local helpers -----
-def to_decimal(value):
-    return Decimal(str(value))
+from pbs_calc.section85 import to_decimal, validate_calculation_precision_enhanced
 
-def validate_calculation_precision_enhanced(original_dpmq, reconstructed_dpmq, tolerance=Decimal("0.005")):
-    original_dpmq = to_decimal(original_dpmq)
-    reconstructed_dpmq = to_decimal(reconstructed_dpmq)
-    diff = abs(original_dpmq - reconstructed_dpmq)
-    if diff <= tolerance:
-        return True, f"✅ Precision validated: difference ${diff:.4f}"
-    else:
-        return False, f"❌ Precision warning: difference ${diff:.4f} exceeds tolerance ${tolerance:.4f}"
+# Target for a rerun, from the script starting to the diagnostics panel (ms)
+RERUN_BUDGET_MS = 100
 
 # ----- formatting -----
 def format_currency(amount):
     return f"${to_decimal(amount).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)}"
 
 # ----- data for download -----
+def breakdown_column_names(label="AEMP"):
+    """Component names used in downloads, keyed like the calculator arguments."""
+    return {
+        "aemp_max_qty": "AEMP for max quantity",
+        "unit_aemp": "Unit AEMP",
+        "wholesale_markup": "Wholesale markup",
+        "price_to_pharmacist": "Price to pharmacist",
+        "ahi_fee": "AHI fee",
+        "dispensing_fee": "Dispensing fee",
+        "dangerous_fee": "Dangerous drug fee",
+        "final_price": "DPMQ" if label == "DPMQ" else "Final Price",
+    }
+
 def generate_cost_breakdown_df(
     aemp_max_qty, unit_aemp, wholesale_markup,
     price_to_pharmacist, ahi_fee, dispensing_fee,
     dangerous_fee, final_price, label="AEMP"
 ):
-    data = [["AEMP for max quantity", format_currency(aemp_max_qty)]]
+    import pandas as pd  # only when a download is built
+
+    names = breakdown_column_names(label)
+    data = [[names["aemp_max_qty"], format_currency(aemp_max_qty)]]
     if unit_aemp is not None:
-        data.append(["Unit AEMP", format_currency(unit_aemp)])
+        data.append([names["unit_aemp"], format_currency(unit_aemp)])
     data.extend([
-        ["Wholesale markup", format_currency(wholesale_markup)],
-        ["Price to pharmacist", format_currency(price_to_pharmacist)],
-        ["AHI fee", format_currency(ahi_fee)],
-        ["Dispensing fee", format_currency(dispensing_fee)],
+        [names["wholesale_markup"], format_currency(wholesale_markup)],
+        [names["price_to_pharmacist"], format_currency(price_to_pharmacist)],
+        [names["ahi_fee"], format_currency(ahi_fee)],
+        [names["dispensing_fee"], format_currency(dispensing_fee)],
     ])
     if to_decimal(dangerous_fee) > 0:
-        data.append(["Dangerous drug fee", format_currency(dangerous_fee)])
+        data.append([names["dangerous_fee"], format_currency(dangerous_fee)])
 
-    label_row = "DPMQ" if label == "DPMQ" else "Final Price"
-    data.append([label_row, format_currency(final_price)])
+    data.append([names["final_price"], format_currency(final_price)])
 
     return pd.DataFrame(data, columns=["Component", "Amount"])
 
@@ -68,3 +75,67 @@ def display_cost_breakdown(
         original_dpmq = st.session_state.get("original_input_price", final_price)
         is_valid, message = validate_calculation_precision_enhanced(original_dpmq, final_price)
         (st.success if is_valid else st.error)(message)
+
+# ----- diagnostics -----
+@st.cache_resource
+def _cold_start() -> dict:
+    """Script and import time of the first run in this server process."""
+    return {}
+
+
+def render_diagnostics_panel(collector, run_started=None, imports_seconds=0.0):
+    """
+    Diagnostics toggle, plus per-stage timings and counters for this run when
+    on. run_started / imports_seconds (perf_counter start of the script and time
+    spent importing) give this run's latency against RERUN_BUDGET_MS and the
+    server's cold start.
+    """
+    from pbs_calc.diagnostics import env_enabled
+
+    if run_started is not None:
+        run_seconds = time.perf_counter() - run_started
+        _cold_start().setdefault("first_run", (run_seconds, imports_seconds))
+        if collector is not None:
+            collector.add("script_imports", imports_seconds)
+            collector.add("script_run", run_seconds)
+
+    st.toggle("Collect diagnostics", value=env_enabled(), key="show_diagnostics",
+              help="Times each pricing stage and counts solver and cache events for this run.")
+    if collector is None:
+        return
+    snapshot = collector.snapshot()
+    with st.expander("🩺 Diagnostics", expanded=True):
+        if run_started is not None:
+            run_ms = run_seconds * 1000
+            status = "✅ within" if run_ms <= RERUN_BUDGET_MS else "⚠️ over"
+            st.markdown(f"**This run:** {run_ms:,.1f} ms to this panel, {imports_seconds * 1000:,.1f} ms of it "
+                        f"imports ({status} the {RERUN_BUDGET_MS} ms budget)")
+            first_run, first_imports = _cold_start()["first_run"]
+            st.caption(f"Cold start (first run in this server process): {first_run * 1000:,.0f} ms, "
+                       f"{first_imports * 1000:,.0f} ms of it imports")
+        if snapshot["stages"]:
+            st.markdown("**Stages (this run)**")
+            st.table([{"stage": name, **stats} for name, stats in snapshot["stages"].items()])
+        else:
+            st.caption("No stages ran.")
+        if snapshot["counters"]:
+            st.markdown("**Counters**")
+            st.table([{"counter": name, "count": value} for name, value in sorted(snapshot["counters"].items())])
+
+# ----- downloads -----
+def render_export(frame, base_name, label, key, sheet_name="Cost Breakdown"):
+    """
+    Format picker plus a download button that builds the file only when clicked.
+    frame may be a DataFrame or a zero-argument callable returning one.
+    """
+    from pbs_calc.export import available_formats, export_bytes, export_file_name, export_mime
+
+    export_format = st.radio("Export format:", available_formats(), horizontal=True, key=f"{key}_format")
+    st.download_button(
+        label=label.format(format=export_format),
+        data=lambda: export_bytes(frame, export_format, sheet_name),
+        file_name=export_file_name(base_name, export_format),
+        mime=export_mime(export_format),
+        key=key,
+        on_click="ignore",
+    )